@@ -1,46 +1,174 @@
-import os, asyncio, logging
+import os, math, time, asyncio, logging
 import discord
+from discord import app_commands
 from discord.ext import commands
 from aiohttp import web
-from py.log_config import logger
+from py import db, metrics
+from py.log_config import logger, log_queue_stats
+from py.permissions import editor_cache
+from py.snapshot import stats_cache
+from py.render import page_cache
+from py.write_queue import write_queue
+from py.watchdog import start_watchdog
+from py.command_sync import sync_commands
+from py.warm_start import warm_start
+from py.supervisor import SHARD_WORKERS, SHARD_WORKER, SHARD_COUNT, shard_ids, attach_worker
 from commands.show_table    import setup as setup_show
 from commands.ping          import setup as setup_ping
 from commands.update_table  import setup as setup_update
 from commands.manage_row    import setup as setup_row
 from commands.manage_editor import setup as setup_editor
+from commands.bulk_update   import setup as setup_bulk
+from commands.find          import setup as setup_find
+from commands.rank          import setup as setup_rank
 
+class InstrumentedTree(app_commands.CommandTree):
+    """CommandTree that timestamps every interaction for the latency histograms."""
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        metrics.mark_received(interaction)
+        return True
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError) -> None:
+        metrics.mark_finished(interaction, "error")
+        await super().on_error(interaction, error)
+
+
+# Shard workers (started by py/supervisor.py) run only their share of the shards
+BotBase = commands.Bot if SHARD_WORKER is None else commands.AutoShardedBot
+shard_options = {} if SHARD_WORKER is None else {
+    "shard_count": SHARD_COUNT,
+    "shard_ids": shard_ids(int(SHARD_WORKER)),
+}
+
+class StatsBot(BotBase):
+    async def setup_hook(self) -> None:
+        # Runs once after login, before the gateway connects (not on reconnects);
+        # commands are global, so one shard worker syncing them is enough
+        if SHARD_WORKER in (None, "0"):
+            try:
+                await sync_commands(self, self.tree)
+            except Exception as exc:
+                # Discord keeps serving the last synced tree; a failed sync must not stop the bot
+                logger.error("Command sync failed, keeping the registered commands: %s", exc, exc_info=True)
+
+
+STARTED_AT = time.monotonic()
 logger.info("✨ Starting Discord Bot…")
 intents = discord.Intents.default()
-bot = commands.Bot(command_prefix="!", intents=intents)
+bot = StatsBot(command_prefix="!", intents=intents, tree_cls=InstrumentedTree, **shard_options)
 
 # Register slash commands
-for fn in (setup_show, setup_ping, setup_update, setup_row, setup_editor):
+for fn in (setup_show, setup_ping, setup_update, setup_row, setup_editor, setup_bulk, setup_find, setup_rank):
     fn(bot)
 
 @bot.event
 async def on_ready():
-    await bot.tree.sync()
+    # Fires again after every reconnect; only the first one measures start-up
+    global STARTED_AT
+    if STARTED_AT is not None:
+        logger.info("⏱️ Startup to ready: %.2fs", time.monotonic() - STARTED_AT)
+        STARTED_AT = None
     logger.info(f"✅ Bot ready: {bot.user} ({bot.user.id})")
 
+@bot.event
+async def on_app_command_completion(interaction: discord.Interaction, command):
+    metrics.mark_finished(interaction)
+
+# ─── Metrics read at scrape time ───
+metrics.registry.callback(
+    "discord_gateway_latency_seconds", "Heartbeat round trip to the Discord gateway",
+    lambda: bot.latency if math.isfinite(bot.latency) else None
+)
+metrics.registry.callback(
+    "cache_requests_total", "Cache lookups by cache and outcome",
+    lambda: {
+        ("stats", "hit"):   stats_cache.hits,
+        ("stats", "stale"): stats_cache.stale_hits,
+        ("stats", "miss"):  stats_cache.misses,
+        ("page", "hit"):    page_cache.hits,
+        ("page", "miss"):   page_cache.misses,
+        ("editor", "hit"):  editor_cache.hits,
+        ("editor", "miss"): editor_cache.misses,
+    },
+    labels=("cache", "result"), kind="counter"
+)
+metrics.registry.callback(
+    "supabase_circuit_state", "Supabase circuit breaker: 0 closed, 1 half-open, 2 open",
+    lambda: db.breaker.state
+)
+metrics.registry.callback(
+    "supabase_circuit_rejections_total", "Supabase calls refused while the circuit was open",
+    lambda: db.breaker.rejected, kind="counter"
+)
+metrics.registry.callback(
+    "supabase_hedges_denied_total", "Hedges skipped because the hedge budget was spent",
+    lambda: db.hedge_budget.denied, kind="counter"
+)
+metrics.registry.callback(
+    "stats_snapshot_rows", "Rows in the cached stats snapshot",
+    lambda: len(stats_cache.current) if stats_cache.current is not None else None
+)
+metrics.registry.callback("write_queue_depth", "Updates waiting for the next batch", lambda: len(write_queue))
+metrics.registry.callback(
+    "write_queue_batches_total", "Batched stats writes", lambda: write_queue.batches, kind="counter"
+)
+metrics.registry.callback(
+    "log_records_dropped_total", "Log records dropped because the log queue was full",
+    lambda: log_queue_stats()["dropped"], kind="counter"
+)
+
 # Simple health-check endpoint
 async def handle_health(req):
     return web.Response(text="OK")
 
+async def handle_metrics(req):
+    return web.Response(
+        text=metrics.registry.render(),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+    )
+
 async def start_health():
     app = web.Application()
     app.router.add_get("/", handle_health)
+    app.router.add_get("/metrics", handle_metrics)
     runner = web.AppRunner(app)
     await runner.setup()
-    site = web.TCPSite(runner, "0.0.0.0", int(os.getenv("PORT", 5000)))
+    site = web.TCPSite(runner, os.getenv("HEALTH_HOST", "0.0.0.0"), int(os.getenv("PORT", 5000)))
     await site.start()
     logger.info("🌐 Health server running")
 
+async def warm_stats():
+    # Serves the warm-start snapshot (if any) and refreshes it in the background
+    try:
+        await stats_cache.get()
+    except Exception as exc:
+        logger.warning("Could not warm stats cache: %s", exc)
+
 async def main():
-    # Run health server and bot in parallel
-    await asyncio.gather(
-        start_health(),
-        bot.start(os.environ["DIS_TOKEN"])
-    )
+    # Opt-in: LOOP_WATCHDOG_MS=500 logs the stack of anything blocking the loop that long
+    watchdog = start_watchdog()
+    # Last known stats & editors from disk, before the first interaction can arrive;
+    # shard workers read the supervisor's shared snapshot instead
+    if SHARD_WORKER is not None:
+        attach_worker()
+    warm_start.restore()
+    # Run health server, cache warm-up and bot in parallel; shard workers take
+    # the editor list from the shared snapshot (loaded by warm_stats)
+    startup = [start_health(), warm_stats(), bot.start(os.environ["DIS_TOKEN"])]
+    if SHARD_WORKER is None:
+        startup.append(editor_cache.warm())
+    try:
+        await asyncio.gather(*startup)
+    finally:
+        # Commit queued /update_table writes before the process goes away
+        await write_queue.close()
+        await warm_start.flush()
+        if watchdog is not None:
+            watchdog.stop()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if SHARD_WORKERS > 1 and SHARD_WORKER is None:
+        from py.supervisor import run
+        run(__file__)
+    else:
+        asyncio.run(main())
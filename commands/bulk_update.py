@@ -0,0 +1,203 @@
+# commands/bulk_update.py
+
+import io, csv, math, asyncio, tempfile
+from aiohttp import ClientSession, ClientTimeout
+from discord import app_commands, Interaction, Attachment, errors
+from discord.ext import commands
+
+from py.helpers import is_admin
+from py.permissions import is_editor
+from py.rowstream import iter_rows, CHUNK_SIZE
+from py.snapshot import stats_cache, StatsSnapshot
+from py.write_queue import write_queue, QueueFull
+from py.log_config import logger
+from py import metrics
+
+FIELDS = {"sing": int, "dance": int, "rally": float}
+MAX_ATTACHMENT_BYTES = 2_000_000
+SPOOL_MAX_BYTES      = 256_000   # larger uploads are spooled to disk while downloading
+DOWNLOAD_TIMEOUT     = 30
+MAX_LISTED  = 15     # diff / problem lines shown in the reply
+REPLY_LIMIT = 1850   # summary length, leaves room for the result line (Discord: 2000)
+
+
+# ─── Validation ─────────────────────────────────────────────────────────────────
+def _parse_value(raw, kind):
+    if raw is None or raw == "":
+        return None
+    if isinstance(raw, bool):
+        raise ValueError("boolean is not a number")
+    value = float(raw)
+    if not math.isfinite(value):
+        # float() takes "nan"/"inf", which JSON (and so PostgREST) cannot carry
+        raise ValueError(f"{raw} is not a finite number")
+    if kind is int:
+        if not value.is_integer():
+            raise ValueError(f"{raw} is not a whole number")
+        return int(value)
+    return value
+
+
+def plan_changes(records, snapshot: StatsSnapshot):
+    """
+    Compare uploaded records with the snapshot.
+
+    Returns (changes, diff_lines, problems, unchanged) where `changes` maps
+    name -> only the fields that actually differ (later records win).
+    """
+    changes: dict[str, dict] = {}
+    diff_lines, problems = [], []
+    unchanged = 0
+    for n, rec in enumerate(records, start=1):
+        if not isinstance(rec, dict):
+            problems.append(f"row {n}: not an object")
+            continue
+        name = str(rec.get("name") or "").strip()
+        if not name:
+            problems.append(f"row {n}: missing name")
+            continue
+        current = snapshot.get(name)
+        if current is None:
+            problems.append(f"row {n}: unknown name `{name}`")
+            continue
+        try:
+            values = {f: _parse_value(rec.get(f), kind) for f, kind in FIELDS.items()}
+        except (TypeError, ValueError):
+            problems.append(f"row {n}: invalid number for `{name}`")
+            continue
+        payload = {f: v for f, v in values.items() if v is not None and v != current.get(f)}
+        if not payload:
+            unchanged += 1
+            continue
+        changes.setdefault(name, {}).update(payload)
+        diff_lines.append(
+            f"{name}: " + ", ".join(f"{f} {current.get(f)}→{v}" for f, v in payload.items())
+        )
+    return changes, diff_lines, problems, unchanged
+
+
+def _listing(lines: list[str], budget: int) -> str:
+    """Up to MAX_LISTED of `lines`, as many as fit in `budget` characters with the "… N more" line."""
+    shown, used = [], 0
+    for line in lines[:MAX_LISTED]:
+        more = f"\n… {len(lines) - len(shown) - 1} more" if len(shown) + 1 < len(lines) else ""
+        if used + len(line) + 1 + len(more) > budget:
+            break
+        shown.append(line)
+        used += len(line) + 1
+    more = len(lines) - len(shown)
+    return "\n".join(shown + ([f"… {more} more"] if more else []))
+
+
+def _summary(filename: str, changes, diff_lines, problems, unchanged, dry_run: bool) -> str:
+    head = (
+        f"📋 `{filename}`: {len(changes)} row(s) to change, "
+        f"{unchanged} unchanged, {len(problems)} skipped"
+        + (" (dry run)" if dry_run else "")
+    )
+    # Lists are cut line by line, so the code fence always stays closed
+    budget = REPLY_LIMIT - len(head)
+    fence = len("\n```\n") + len("\n```")
+    if diff_lines and problems:
+        budget //= 2
+    parts = [head]
+    if diff_lines:
+        parts.append("```\n" + _listing(diff_lines, budget - fence) + "\n```")
+    if problems:
+        parts.append(_listing(["⚠️ " + p for p in problems], budget - 1))
+    return "\n".join(parts)
+
+
+def _plan_file(spool, filename: str, snapshot: StatsSnapshot):
+    """Parse and validate the spooled upload row by row (runs in a worker thread)."""
+    with io.TextIOWrapper(spool, encoding="utf-8-sig") as fp:
+        return plan_changes(iter_rows(fp, filename), snapshot)
+
+
+async def _download(file: Attachment) -> tempfile.SpooledTemporaryFile:
+    """Stream the attachment in chunks into a spooled temporary file."""
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    try:
+        size = 0
+        async with ClientSession(timeout=ClientTimeout(total=DOWNLOAD_TIMEOUT)) as session:
+            async with session.get(file.url) as resp:
+                resp.raise_for_status()
+                async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > MAX_ATTACHMENT_BYTES:
+                        raise ValueError(f"larger than {MAX_ATTACHMENT_BYTES // 1000} kB")
+                    spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
+
+
+# ─── bulk_update ────────────────────────────────────────────────────────────────
+@app_commands.command(
+    name="bulk_update",
+    description="Apply a CSV/JSON file of name/sing/dance/rally in one batch (admin/editor only)"
+)
+@app_commands.describe(
+    file="CSV with a header row, JSON array or JSON Lines",
+    dry_run="Only show the diff, don't write (default False)"
+)
+async def bulk_update(interaction: Interaction, file: Attachment, dry_run: bool = False):
+    # 1) Authorization
+    user = interaction.user
+    if not (is_admin(user) or await is_editor(user.id)):
+        return await interaction.response.send_message(
+            "❌ You don’t have permission to update stats.",
+            ephemeral=True
+        )
+    if file.size > MAX_ATTACHMENT_BYTES:
+        return await interaction.response.send_message(
+            f"❌ File too large (max {MAX_ATTACHMENT_BYTES // 1000} kB).",
+            ephemeral=True
+        )
+
+    # 2) Defer
+    try:
+        await interaction.response.defer(thinking=True)
+        metrics.mark_deferred(interaction)
+    except errors.InteractionResponded:
+        pass
+
+    # 3) Download in chunks, then parse & validate against the cached snapshot
+    #    row by row off the event loop (the snapshot is immutable)
+    try:
+        snapshot = await stats_cache.get()
+        spool = await _download(file)
+        plan = await asyncio.to_thread(_plan_file, spool, file.filename, snapshot)
+    except (ValueError, UnicodeDecodeError, csv.Error) as exc:
+        return await interaction.followup.send(f"❌ Could not parse `{file.filename}`: {exc}")
+    except Exception as exc:
+        logger.error("Bulk update prepare failed: %s", exc, exc_info=True)
+        return await interaction.followup.send("❌ Could not read data. Please try again later.")
+    changes, diff_lines, problems, unchanged = plan
+    summary = _summary(file.filename, changes, diff_lines, problems, unchanged, dry_run)
+
+    if dry_run or not changes:
+        return await interaction.followup.send(summary)
+
+    # 4) Through the write queue: merged with pending /update_table writes and
+    #    ordered with them; the queue patches the cache
+    try:
+        committed, failed = await write_queue.update_many(changes)
+    except QueueFull:
+        logger.warning("Write queue full, rejected bulk update of %d rows", len(changes))
+        return await interaction.followup.send(
+            summary + "\n❌ Too many pending updates, nothing was changed. Please try again in a moment."
+        )
+
+    missing = len(changes) - len(committed) - len(failed)
+    result = f"\n✅ Updated {len(committed)} row(s)" + (f", {missing} vanished meanwhile" if missing else "")
+    if failed:
+        result += f"\n❌ {len(failed)} row(s) could not be written, please retry them."
+    await interaction.followup.send(summary + result)
+
+
+# ─── Registration ───────────────────────────────────────────────────────────────
+def setup(bot: commands.Bot):
+    bot.tree.add_command(bulk_update)
@@ -0,0 +1,65 @@
+# commands/find.py
+
+from discord import app_commands, Interaction, errors
+from discord.ext import commands
+
+from py.helpers import is_admin
+from py.permissions import is_editor
+from py.snapshot import stats_cache
+from py.names import search, autocomplete_name
+from py.render import build_block
+from py.log_config import logger
+from py import metrics
+
+MAX_RESULTS = 15
+
+
+# ─── find ───────────────────────────────────────────────────────────────────────
+@app_commands.command(
+    name="find",
+    description="Find members by name, tolerating typos (editor)"
+)
+@app_commands.describe(query="Name or the start of a name")
+@app_commands.autocomplete(query=autocomplete_name)
+async def find(interaction: Interaction, query: str):
+    # 1) Authorization
+    user = interaction.user
+    if not (is_admin(user) or await is_editor(user.id)):
+        return await interaction.response.send_message(
+            "❌ You don’t have permission to view stats.",
+            ephemeral=True
+        )
+
+    # 2) Defer (a cold or expired snapshot has to be fetched first)
+    try:
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        metrics.mark_deferred(interaction)
+    except errors.NotFound:
+        pass
+
+    # 3) Snapshot (cached; only the very first call after start-up fetches)
+    try:
+        snapshot = await stats_cache.get()
+    except Exception as exc:
+        logger.error("Failed to fetch stats: %s", exc, exc_info=True)
+        return await interaction.followup.send(
+            "❌ Could not fetch data. Please try again later.",
+            ephemeral=True
+        )
+
+    # 4) Search & reply
+    hits = search(snapshot, query, MAX_RESULTS)
+    if not hits:
+        return await interaction.followup.send(
+            f"ℹ️ No member matches `{query}`.",
+            ephemeral=True
+        )
+    rows = [snapshot.row(i) for i in hits]
+    exact = any(r["name"].casefold() == query.strip().casefold() for r in rows)
+    head = f"🔎 {len(rows)} match(es) for `{query}`" + ("" if exact else " (closest names)")
+    await interaction.followup.send(f"{head}\n{build_block(rows)}", ephemeral=True)
+
+
+# ─── Registration ───────────────────────────────────────────────────────────────
+def setup(bot: commands.Bot):
+    bot.tree.add_command(find)
@@ -4,8 +4,11 @@ from datetime import datetime
 from discord import app_commands, Interaction, Member, errors
 from discord.ext import commands
 
-from py.helpers import is_admin, admin_supabase
+from py.helpers import is_admin
+from py import db
+from py.permissions import editor_cache
 from py.log_config import logger
+from py import metrics
 
 # ─── view_editors ────────────────────────────────────────────────────────────────
 @app_commands.command(
@@ -24,15 +27,13 @@ async def view_editors(interaction: Interaction):
     # 2) Defer (ephemeral)
     try:
         await interaction.response.defer(thinking=True, ephemeral=True)
+        metrics.mark_deferred(interaction)
     except errors.InteractionResponded:
         pass
 
     # 3) Fetch & sort
     try:
-        res = admin_supabase.table("stats_editors_rights") \
-                           .select("discord_id, discord_name, added_at") \
-                           .execute()
-        rows = res.data or []
+        rows = await db.fetch_editors()
         rows.sort(key=lambda r: r["added_at"], reverse=True)
     except Exception as exc:
         logger.error("Error fetching editors list: %s", exc, exc_info=True)
@@ -79,18 +80,16 @@ async def add_editor(interaction: Interaction, member: Member):
     # 2) Defer
     try:
         await interaction.response.defer(thinking=True, ephemeral=True)
+        metrics.mark_deferred(interaction)
     except errors.InteractionResponded:
         pass
 
     # 3) Insert
     try:
-        res = admin_supabase.table("stats_editors_rights") \
-                            .insert({
-                                "discord_id": member.id,
-                                "discord_name": member.name
-                            }).execute()
-        if not res.data:
+        data = await db.insert_editor(member.id, member.name)
+        if not data:
             raise RuntimeError("No rows inserted")
+        editor_cache.grant(member.id)
     except Exception as exc:
         logger.error("Error adding editor %s: %s", member.id, exc, exc_info=True)
         return await interaction.followup.send(
@@ -122,16 +121,15 @@ async def delete_editor(interaction: Interaction, member: Member):
     # 2) Defer
     try:
         await interaction.response.defer(thinking=True, ephemeral=True)
+        metrics.mark_deferred(interaction)
     except errors.InteractionResponded:
         pass
 
     # 3) Delete
     try:
-        res = admin_supabase.table("stats_editors_rights") \
-                            .delete() \
-                            .eq("discord_id", member.id) \
-                            .execute()
-        if not res.data:
+        data = await db.delete_editor(member.id)
+        editor_cache.revoke(member.id)
+        if not data:
             return await interaction.followup.send(
                 f"❌ {member.mention} was not an editor.",
                 ephemeral=True
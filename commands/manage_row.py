@@ -3,14 +3,19 @@
 from discord import app_commands, Interaction, errors
 from discord.ext import commands
 
-from py.helpers import is_admin, admin_supabase
+from py.helpers import is_admin
+from py import db
+from py.snapshot import stats_cache
+from py.names import autocomplete_name
 from py.log_config import logger
+from py import metrics
 
 # ─── add_row ────────────────────────────────────────────────────────────────────
 @app_commands.command(
     name="add_row",
     description="Add a new stats row (admin only)"
 )
+@app_commands.autocomplete(name=autocomplete_name)   # shows existing look-alikes before a duplicate is added
 async def add_row(
     interaction: Interaction,
     name: str,
@@ -28,20 +33,21 @@ async def add_row(
     # Defer so we can follow up
     try:
         await interaction.response.defer(thinking=True)
+        metrics.mark_deferred(interaction)
     except errors.InteractionResponded:
         pass
 
     # Insert
     try:
-        res = admin_supabase.table("stats") \
-                            .insert({
-                                "name": name,
-                                "sing": sing,
-                                "dance": dance,
-                                "rally": rally
-                            }).execute()
-        if not res.data:
+        data = await db.insert_stats({
+            "name": name,
+            "sing": sing,
+            "dance": dance,
+            "rally": rally
+        })
+        if not data:
             raise RuntimeError("No rows inserted")
+        stats_cache.apply_upsert(data)
     except Exception as exc:
         logger.error("Error inserting row %s: %s", name, exc, exc_info=True)
         return await interaction.followup.send(
@@ -57,6 +63,7 @@ async def add_row(
     name="delete_row",
     description="Delete a stats row (admin only)"
 )
+@app_commands.autocomplete(name=autocomplete_name)
 async def delete_row(
     interaction: Interaction,
     name: str
@@ -70,19 +77,18 @@ async def delete_row(
 
     try:
         await interaction.response.defer(thinking=True)
+        metrics.mark_deferred(interaction)
     except errors.InteractionResponded:
         pass
 
     try:
-        res = admin_supabase.table("stats") \
-                            .delete() \
-                            .eq("name", name) \
-                            .execute()
-        if not res.data:
+        data = await db.delete_stats(name)
+        if not data:
             return await interaction.followup.send(
                 f"❌ No entry found for `{name}`.",
                 ephemeral=True
             )
+        stats_cache.apply_delete(r["name"] for r in data)
     except Exception as exc:
         logger.error("Error deleting row %s: %s", name, exc, exc_info=True)
         return await interaction.followup.send(
@@ -0,0 +1,73 @@
+# commands/rank.py
+
+from discord import app_commands, Interaction, errors
+from discord.ext import commands
+
+from py.helpers import is_admin, format_number
+from py.permissions import is_editor
+from py.snapshot import stats_cache, VALUE_COLUMNS
+from py.ranking import rank_index
+from py.names import autocomplete_name
+from py.render import LABELS
+from py.log_config import logger
+from py import metrics
+
+
+# ─── rank ───────────────────────────────────────────────────────────────────────
+@app_commands.command(
+    name="rank",
+    description="Show a member's position on sing, dance and rally (editor)"
+)
+@app_commands.describe(name="Exact member name")
+@app_commands.autocomplete(name=autocomplete_name)
+async def rank(interaction: Interaction, name: str):
+    # 1) Authorization
+    user = interaction.user
+    if not (is_admin(user) or await is_editor(user.id)):
+        return await interaction.response.send_message(
+            "❌ You don’t have permission to view stats.",
+            ephemeral=True
+        )
+
+    # 2) Defer (a cold or expired snapshot has to be fetched first)
+    try:
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        metrics.mark_deferred(interaction)
+    except errors.NotFound:
+        pass
+
+    # 3) Snapshot (cached; only the very first call after start-up fetches)
+    try:
+        snapshot = await stats_cache.get()
+    except Exception as exc:
+        logger.error("Failed to fetch stats: %s", exc, exc_info=True)
+        return await interaction.followup.send(
+            "❌ Could not fetch data. Please try again later.",
+            ephemeral=True
+        )
+
+    # 4) Positions from the rank index
+    name = name.strip()
+    ranks = rank_index.rank(snapshot, name)
+    if ranks is None:
+        return await interaction.followup.send(
+            f"ℹ️ No member named `{name}`. Try `/find {name}`.",
+            ephemeral=True
+        )
+
+    # 5) Reply
+    row = snapshot.get(name)
+    lines = [f"🏅 **{name}**"]
+    for c in VALUE_COLUMNS:
+        if c not in ranks:
+            lines.append(f"{LABELS[c]}: —")
+            continue
+        pos, total = ranks[c]
+        top = 100 * pos / total
+        lines.append(f"{LABELS[c]}: {format_number(row[c])} — #{pos} of {total} (top {format_number(round(top, 1))}%)")
+    await interaction.followup.send("\n".join(lines), ephemeral=True)
+
+
+# ─── Registration ───────────────────────────────────────────────────────────────
+def setup(bot: commands.Bot):
+    bot.tree.add_command(rank)
@@ -1,9 +1,19 @@
+import os
 from discord import app_commands, Interaction, errors
 from discord.ext import commands
-from py.helpers import is_admin, is_editor, admin_supabase
-from py.helpers import ROWS_PER_PAGE, HEADER, SEP, sort_data, format_row, blank_row
+from py import db
+from py.helpers import is_admin, ROWS_PER_PAGE
+from py.permissions import is_editor
+from py.snapshot import stats_cache
+from py.helpers import SORT_COLUMNS
 from py.log_config import logger
-from py.paginator import TablePaginator
+from py import metrics
+from py.paginator import TablePaginator, KeysetPaginator, DYNAMIC_ITEMS
+from py.render import render_page, build_block, LAYOUTS, TABLE_LAYOUT
+
+# "snapshot" serves pages from the in-process stats cache; "keyset" lets
+# PostgREST sort and slice so only one page is ever downloaded (huge tables)
+SHOW_TABLE_MODE = os.getenv("SHOW_TABLE_MODE", "snapshot")
 
 @app_commands.command(
     name="show_table",
@@ -12,17 +22,19 @@ from py.paginator import TablePaginator
 @app_commands.describe(
     sort_by='name | sing | dance | rally',
     sort_desc='Descending order? (default True)',
-    page='Page number (default 1)'
+    page='Page number (default 1)',
+    layout='compact | spaced (empty line between rows)'
 )
 async def show_table(
     interaction: Interaction,
     sort_by: str = None,
     sort_desc: bool = True,
-    page: int = 1
+    page: int = 1,
+    layout: str = None
 ):
     # Permission check
     user = interaction.user
-    if not (is_admin(user) or is_editor(user.id)):
+    if not (is_admin(user) or await is_editor(user.id)):
         return await interaction.response.send_message(
             "❌ You don’t have permission to view stats.",
             ephemeral=True
@@ -31,50 +43,66 @@ async def show_table(
     # Defer reply
     try:
         await interaction.response.defer(thinking=True)
+        metrics.mark_deferred(interaction)
     except errors.NotFound:
         pass
 
     # Validate sort
     sort_by = sort_by.lower() if sort_by else None
-    if sort_by and sort_by not in ("name", "sing", "dance", "rally"):
+    if sort_by and sort_by not in SORT_COLUMNS:
         return await interaction.followup.send("❌ Invalid sort column")
+    layout = layout.lower() if layout else TABLE_LAYOUT
+    if layout not in LAYOUTS:
+        return await interaction.followup.send("❌ Invalid layout")
 
-    # Choose client
-    client = admin_supabase
+    if SHOW_TABLE_MODE == "keyset":
+        return await _show_keyset(interaction, sort_by, sort_desc, page, layout)
 
     # Fetch data
     try:
-        res = client.table("stats").select("*").execute()
-        rows = res.data or []
+        snapshot = await stats_cache.get()
     except Exception as exc:
         logger.error("Failed to fetch stats: %s", exc, exc_info=True)
         return await interaction.followup.send(
             "❌ Could not fetch data. Please try again later."
         )
 
-    # Sort & paginate
-    if sort_by:
-        rows = sort_data(rows, sort_by, sort_desc)
-    start = (page - 1) * ROWS_PER_PAGE
-    page_data = rows[start : start + ROWS_PER_PAGE]
-    if not page_data:
+    # Sort, pack as many rows as fit & render (served from the page cache when hot)
+    block = render_page(snapshot, sort_by, sort_desc, page, layout)
+    if block is None:
         return await interaction.followup.send("❌ Page out of range")
 
-    # Build table block
-    lines = [HEADER, SEP]
-    for r in page_data:
-        lines.append(format_row(r))
-        lines.append(blank_row())
-
-    # **fixed**: assemble the block without a backslash inside the {}
-    text = "\n".join(lines)
-    block = f"```css\n{text}\n```"
-    # block = f"```css\n{chr(10).join(lines)}\n```"
-
     # Paginator
-    view = TablePaginator(rows, sort_by, sort_desc, page)
+    view = TablePaginator(snapshot, sort_by, sort_desc, page, layout)
     await interaction.followup.send(content=block, view=view)
 
 
+async def _show_keyset(interaction: Interaction, sort_by: str | None, sort_desc: bool, page: int, layout: str):
+    # Same answer as the snapshot path, instead of quietly serving page 1
+    if page < 1:
+        return await interaction.followup.send("❌ Page out of range")
+
+    # Fetch one page (+1 row to know if there is a next one); only a direct
+    # jump to page N pays an OFFSET, page turns after that seek by key
+    try:
+        rows = await db.fetch_stats_page(
+            sort_by, sort_desc, ROWS_PER_PAGE + 1,
+            offset=(page - 1) * ROWS_PER_PAGE
+        )
+    except Exception as exc:
+        logger.error("Failed to fetch stats page: %s", exc, exc_info=True)
+        return await interaction.followup.send(
+            "❌ Could not fetch data. Please try again later."
+        )
+    if not rows:
+        return await interaction.followup.send("❌ Page out of range")
+
+    page_rows = rows[:ROWS_PER_PAGE]
+    view = KeysetPaginator(page_rows, sort_by, sort_desc, page, has_next=len(rows) > ROWS_PER_PAGE, layout=layout)
+    await interaction.followup.send(content=build_block(page_rows, layout), view=view)
+
+
 def setup(bot: commands.Bot):
     bot.tree.add_command(show_table)
+    # Page buttons are routed by custom_id, so old table messages keep working
+    bot.add_dynamic_items(*DYNAMIC_ITEMS)
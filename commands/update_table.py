@@ -1,7 +1,11 @@
 from discord import app_commands, Interaction
 from discord.ext import commands
-from py.helpers import is_admin, is_editor, admin_supabase
+from py.helpers import is_admin
+from py.permissions import is_editor
+from py.write_queue import write_queue, QueueFull
+from py.names import autocomplete_name
 from py.log_config import logger
+from py import metrics
 
 @app_commands.command(
     name="update_table",
@@ -13,6 +17,7 @@ from py.log_config import logger
     dance="New dance value",
     rally="New rally value"
 )
+@app_commands.autocomplete(name=autocomplete_name)
 async def update_table(
     interaction: Interaction,
     name: str,
@@ -23,7 +28,7 @@ async def update_table(
     user = interaction.user
 
     # Permission check
-    if not (is_admin(user) or is_editor(user.id)):
+    if not (is_admin(user) or await is_editor(user.id)):
         return await interaction.response.send_message(
             "❌ You don’t have permission to update stats.",
             ephemeral=True
@@ -31,26 +36,28 @@ async def update_table(
 
     # Defer
     await interaction.response.defer(thinking=True)
-
-    # Choose client
-    client = admin_supabase
+    metrics.mark_deferred(interaction)
 
     # Build payload
     payload = {k: v for k, v in {"sing": sing, "dance": dance, "rally": rally}.items() if v is not None}
     if not payload:
         return await interaction.followup.send("❌ Nothing to update.")
 
-    # Execute
+    # Queue (merged with other updates and committed in one batched upsert)
     try:
-        res = client.table("stats").update(payload).eq("name", name).execute()
-        data = res.data or []
+        row = await write_queue.update(name, payload)
+    except QueueFull:
+        logger.warning("Write queue full, rejected update for %s", name)
+        return await interaction.followup.send(
+            "❌ Too many pending updates. Please try again in a moment."
+        )
     except Exception as exc:
         logger.error("Failed to update stats for %s: %s", name, exc, exc_info=True)
         return await interaction.followup.send(
             "❌ Could not update row. Please try again later."
         )
 
-    if not data:
+    if row is None:
         return await interaction.followup.send(f"❌ No entry found for `{name}`")
 
     feedback = " ".join(f"{k}={v}" for k, v in payload.items())
@@ -0,0 +1,88 @@
+# py/command_sync.py
+"""
+Sync the slash-command tree only when it changed. The payload Discord would
+receive (`cmd.to_dict(tree)` for every command) is hashed and the hash is
+kept in COMMAND_HASH_FILE per application and scope; a redeploy with the
+same commands skips the slow, rate-limited sync call entirely.
+"""
+import os
+import json
+import hashlib
+
+import discord
+from discord import app_commands
+
+from py.log_config import logger
+
+
+# ─── Config ─────────────────────────────────────────────────────────────────────
+COMMAND_SYNC      = os.getenv("COMMAND_SYNC", "auto")          # "auto" (on hash change) | "always" | "off"
+COMMAND_HASH_FILE = os.getenv("COMMAND_HASH_FILE", "data/command_tree.json")
+DEV_GUILD_ID      = int(os.getenv("DEV_GUILD_ID", 0))          # sync to this guild only (instant, for testing)
+
+
+# ─── Hashing ────────────────────────────────────────────────────────────────────
+def tree_hash(tree: app_commands.CommandTree, guild: discord.abc.Snowflake | None = None) -> str:
+    """Stable SHA-256 of the commands `tree.sync(guild=guild)` would upload."""
+    payload = sorted(
+        (cmd.to_dict(tree) for cmd in tree.get_commands(guild=guild)),
+        key=lambda d: (d.get("type", 1), d["name"])
+    )
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def _load_hashes() -> dict:
+    try:
+        with open(COMMAND_HASH_FILE, encoding="utf-8") as f:
+            hashes = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as exc:
+        logger.warning("Ignoring unreadable %s: %s", COMMAND_HASH_FILE, exc)
+        return {}
+    if not isinstance(hashes, dict):
+        logger.warning("Ignoring malformed %s", COMMAND_HASH_FILE)
+        return {}
+    return hashes
+
+
+def _save_hashes(hashes: dict) -> None:
+    os.makedirs(os.path.dirname(COMMAND_HASH_FILE) or ".", exist_ok=True)
+    tmp = f"{COMMAND_HASH_FILE}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(hashes, f, indent=2, sort_keys=True)
+    os.replace(tmp, COMMAND_HASH_FILE)
+
+
+# ─── Sync ───────────────────────────────────────────────────────────────────────
+async def sync_commands(client: discord.Client, tree: app_commands.CommandTree) -> bool:
+    """
+    Sync `tree` globally (or to DEV_GUILD_ID) if its hash differs from the
+    last successful sync. Returns True when Discord was called.
+    """
+    if COMMAND_SYNC == "off":
+        return False
+
+    guild = None
+    scope = "global"
+    if DEV_GUILD_ID:
+        guild = discord.Object(id=DEV_GUILD_ID)
+        tree.copy_global_to(guild=guild)
+        scope = f"guild:{DEV_GUILD_ID}"
+    key = f"{client.application_id}/{scope}"
+
+    digest = tree_hash(tree, guild)
+    hashes = _load_hashes()
+    if COMMAND_SYNC != "always" and hashes.get(key) == digest:
+        logger.info("Command tree unchanged (%s…), skipping %s sync", digest[:12], scope)
+        return False
+
+    synced = await tree.sync(guild=guild)
+    logger.info("🔄 Synced %d commands (%s, %s…)", len(synced), scope, digest[:12])
+    hashes[key] = digest
+    try:
+        _save_hashes(hashes)
+    except OSError as exc:
+        logger.warning("Could not store command hash in %s: %s", COMMAND_HASH_FILE, exc)
+    return True
@@ -0,0 +1,330 @@
+# py/db.py
+import os, time, asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from py.helpers import anon_supabase, admin_supabase
+from py.log_config import logger
+from py import metrics
+from py.resilience import CircuitBreaker, LatencyWindow, HedgeBudget, is_transient, backoff
+
+
+# ─── Config ─────────────────────────────────────────────────────────────────────
+DB_MAX_CONCURRENCY = int(os.getenv("DB_MAX_CONCURRENCY", 8))
+DB_TIMEOUT         = float(os.getenv("DB_TIMEOUT", 8.0))  # seconds per call (retries included)
+DB_RETRIES         = int(os.getenv("DB_RETRIES", 2))      # extra attempts for reads after transient errors
+DB_HEDGE           = os.getenv("DB_HEDGE", "1") == "1"    # duplicate reads that run past their p95
+DB_INTERACTIVE_DEADLINE = float(os.getenv("DB_INTERACTIVE_DEADLINE", 2.5))  # calls made before a defer
+NAME_CHUNK         = 200                                  # names per in.(…) filter, keeps URLs short
+
+# Idempotent operations: safe to retry and to send twice
+READ_OPS = ("select", "count")
+
+# supabase-py only ships a blocking client, so every `.execute()` runs on this
+# bounded pool instead of the event loop. The httpx client inside each supabase
+# client is shared by all threads, which gives us connection pooling for free.
+_executor  = ThreadPoolExecutor(max_workers=DB_MAX_CONCURRENCY, thread_name_prefix="supabase")
+_semaphore = asyncio.Semaphore(DB_MAX_CONCURRENCY)
+_jobs      = 0   # pool jobs submitted and not finished, abandoned ones included
+
+# Shared by anon_supabase and admin_supabase: both talk to the same PostgREST
+breaker = CircuitBreaker()
+latency = LatencyWindow()
+hedge_budget = HedgeBudget()
+
+
+# ─── Core runner ────────────────────────────────────────────────────────────────
+async def execute(query, table: str, op: str, timeout: float = DB_TIMEOUT, deadline: float | None = None):
+    """
+    Run a prepared supabase query builder off the event loop.
+
+    `table` and `op` label the call for logging and metrics. Reads (READ_OPS)
+    are retried with jittered backoff after transient errors and hedged once
+    they run past their recent p95; writes are attempted once. Everything,
+    retries included, has to finish within `deadline` seconds (default:
+    `timeout`), otherwise asyncio.TimeoutError is raised; worker threads of
+    abandoned attempts finish in the background. While the circuit breaker
+    is open, CircuitOpenError is raised without a request.
+    """
+    end = time.monotonic() + (timeout if deadline is None else deadline)
+    read = op in READ_OPS
+    attempt = 0
+    while True:
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            raise asyncio.TimeoutError()
+        breaker.before()
+        try:
+            if read:
+                res = await _hedged(query, table, op, min(timeout, remaining))
+            else:
+                res = await _attempt(query, table, op, min(timeout, remaining))
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        except Exception as exc:
+            breaker.failure(exc)
+            attempt += 1
+            pause = backoff(attempt)
+            if not read or attempt > DB_RETRIES or not is_transient(exc) or time.monotonic() + pause >= end:
+                raise
+            metrics.supabase_retries.inc(table, op)
+            logger.info("Retrying Supabase %s on %s in %.2fs (attempt %d): %s", op, table, pause, attempt + 1, exc)
+            await asyncio.sleep(pause)
+            continue
+        breaker.success()
+        return res
+
+
+def _submit(query, table: str, op: str) -> asyncio.Future:
+    """
+    Start `query.execute()` on the pool. The job counts as busy and is timed
+    until its thread is done, even if the caller stopped waiting for it.
+    """
+    global _jobs
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    job = _executor.submit(query.execute)
+    _jobs += 1
+    job.add_done_callback(lambda f: _on_loop(loop, _job_done, f, (table, op), time.perf_counter() - started))
+    return asyncio.wrap_future(job, loop=loop)
+
+
+def _on_loop(loop: asyncio.AbstractEventLoop, fn, *args) -> None:
+    try:
+        loop.call_soon_threadsafe(fn, *args)
+    except RuntimeError:   # loop already closed (shutdown)
+        pass
+
+
+def _job_done(job, key: tuple, elapsed: float) -> None:
+    global _jobs
+    _jobs -= 1
+    if job.cancelled():
+        return   # never left the queue: no round trip to learn from
+    exc = job.exception()
+    if exc is None or is_transient(exc):
+        latency.observe(key, elapsed)
+
+
+async def _attempt(query, table: str, op: str, timeout: float):
+    """One round trip on the pool, timed and counted."""
+    async with _semaphore:
+        started = time.perf_counter()
+        try:
+            res = await asyncio.wait_for(_submit(query, table, op), timeout)
+        except asyncio.TimeoutError:
+            metrics.supabase_errors.inc(table, op)
+            logger.warning("Supabase %s on %s timed out after %.1fs", op, table, timeout)
+            raise
+        except Exception:
+            metrics.supabase_errors.inc(table, op)
+            raise
+        finally:
+            metrics.supabase_call_seconds.observe(time.perf_counter() - started, table, op)
+    return res
+
+
+async def _hedged(query, table: str, op: str, timeout: float):
+    """
+    A read that gets a duplicate request once it runs longer than the p95 of
+    its (table, op) — if a pool thread is free (abandoned jobs still hold
+    theirs) and the hedge budget allows. The first success wins.
+    """
+    hedge_budget.read()
+    delay = latency.hedge_delay((table, op)) if DB_HEDGE else None
+    first = asyncio.ensure_future(_attempt(query, table, op, timeout))
+    if delay is None or delay >= timeout:
+        return await first
+
+    tasks = {first}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done or _jobs >= DB_MAX_CONCURRENCY or not hedge_budget.take():
+            return await first
+        metrics.supabase_hedges.inc(table, op)
+        tasks.add(asyncio.ensure_future(_attempt(query, table, op, timeout - delay)))
+        error = None
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+# ─── stats ──────────────────────────────────────────────────────────────────────
+async def fetch_stats() -> list[dict]:
+    res = await execute(admin_supabase.table("stats").select("*"), "stats", "select")
+    return res.data or []
+
+
+async def fetch_stats_since(cursor: str, column: str = "updated_at") -> list[dict]:
+    """Rows whose `column` is newer than `cursor` (an ISO timestamp), oldest first."""
+    res = await execute(
+        admin_supabase.table("stats").select("*").gt(column, cursor).order(column),
+        "stats", "select"
+    )
+    return res.data or []
+
+
+async def fetch_stats_names() -> list[str]:
+    res = await execute(admin_supabase.table("stats").select("name"), "stats", "select")
+    return [r["name"] for r in res.data or []]
+
+
+async def count_stats() -> int:
+    res = await execute(
+        admin_supabase.table("stats").select("name", count="exact", head=True),
+        "stats", "count"
+    )
+    return res.count or 0
+
+
+# ─── Keyset pagination ──────────────────────────────────────────────────────────
+PAGE_COLUMNS = "name, sing, dance, rally"
+
+
+def _pg_literal(value) -> str:
+    """Quote a value for use inside a PostgREST or=(...) or in.(...) expression."""
+    if isinstance(value, str):
+        escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+        return f'"{escaped}"'
+    return repr(value)
+
+
+def _seek_filter(column: str, desc: bool, nulls_last: bool, name_desc: bool, key: tuple) -> str:
+    """
+    PostgREST condition selecting rows strictly after `key` = (value, name) in
+    the ordering `column` (desc, nulls_last) then `name` (name_desc).
+    """
+    value, name = key
+    name_op = "lt" if name_desc else "gt"
+    if column == "name":
+        return f"name.{name_op}.{_pg_literal(name)}"
+    if value is None:
+        parts = [f"and({column}.is.null,name.{name_op}.{_pg_literal(name)})"]
+        if not nulls_last:
+            parts.append(f"{column}.not.is.null")
+    else:
+        col_op = "lt" if desc else "gt"
+        parts = [
+            f"{column}.{col_op}.{_pg_literal(value)}",
+            f"and({column}.eq.{_pg_literal(value)},name.{name_op}.{_pg_literal(name)})"
+        ]
+        if nulls_last:
+            parts.append(f"{column}.is.null")
+    return ",".join(parts)
+
+
+async def fetch_stats_page(
+    sort_by: str | None,
+    descending: bool,
+    limit: int,
+    after: tuple | None = None,
+    before: tuple | None = None,
+    offset: int = 0
+) -> list[dict]:
+    """
+    One page of stats ordered and sliced by PostgREST (keyset/seek pagination).
+
+    Missing values sort lowest (as in StatsSnapshot.order), names break ties. `after` and
+    `before` are (sort value, name) keys of the neighbouring page's last/first
+    row; `offset` is only used to jump to a page without a key.
+    """
+    column = sort_by or "name"
+    desc = descending if sort_by else False
+    nulls_last = desc
+    name_desc = desc if column == "name" else False
+    backwards = before is not None
+    if backwards:
+        desc, nulls_last, name_desc = not desc, not nulls_last, not name_desc
+
+    query = admin_supabase.table("stats").select(PAGE_COLUMNS)
+    key = before if backwards else after
+    if key is not None:
+        query = query.or_(_seek_filter(column, desc, nulls_last, name_desc, key))
+    if column != "name":
+        query = query.order(column, desc=desc, nullsfirst=not nulls_last)
+    query = query.order("name", desc=name_desc)
+    query = query.range(offset, offset + limit - 1) if offset else query.limit(limit)
+
+    res = await execute(query, "stats", "select")
+    rows = res.data or []
+    return rows[::-1] if backwards else rows
+
+
+async def insert_stats(row: dict) -> list[dict]:
+    res = await execute(admin_supabase.table("stats").insert(row), "stats", "insert")
+    return res.data or []
+
+
+async def update_stats(name: str, payload: dict) -> list[dict]:
+    res = await execute(
+        admin_supabase.table("stats").update(payload).eq("name", name),
+        "stats", "update"
+    )
+    return res.data or []
+
+
+async def update_stats_many(names: list[str], payload: dict) -> list[dict]:
+    """Set the same partial `payload` on every row in `names` (at most NAME_CHUNK); unknown names are skipped."""
+    # in_() only quotes names containing ,:() and never escapes " or \
+    names_in = ",".join(map(_pg_literal, names))
+    res = await execute(
+        admin_supabase.table("stats").update(payload).filter("name", "in", f"({names_in})"),
+        "stats", "update"
+    )
+    return res.data or []
+
+
+async def delete_stats(name: str) -> list[dict]:
+    res = await execute(
+        admin_supabase.table("stats").delete().eq("name", name),
+        "stats", "delete"
+    )
+    return res.data or []
+
+
+# ─── stats_editors_rights ───────────────────────────────────────────────────────
+async def fetch_editors(columns: str = "discord_id, discord_name, added_at") -> list[dict]:
+    res = await execute(
+        admin_supabase.table("stats_editors_rights").select(columns),
+        "stats_editors_rights", "select"
+    )
+    return res.data or []
+
+
+async def insert_editor(discord_id: int, discord_name: str) -> list[dict]:
+    res = await execute(
+        admin_supabase.table("stats_editors_rights").insert({
+            "discord_id": discord_id,
+            "discord_name": discord_name
+        }),
+        "stats_editors_rights", "insert"
+    )
+    return res.data or []
+
+
+async def delete_editor(discord_id: int) -> list[dict]:
+    res = await execute(
+        admin_supabase.table("stats_editors_rights").delete().eq("discord_id", discord_id),
+        "stats_editors_rights", "delete"
+    )
+    return res.data or []
+
+
+async def editor_exists(user_id: int) -> bool:
+    """Return True if user is in stats_editors_rights table (raises on failure)."""
+    res = await execute(
+        anon_supabase.table("stats_editors_rights")
+                     .select("discord_id")
+                     .eq("discord_id", user_id),
+        "stats_editors_rights", "select",
+        deadline=DB_INTERACTIVE_DEADLINE   # runs before commands defer
+    )
+    return bool(res.data)
+
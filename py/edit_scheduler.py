@@ -0,0 +1,198 @@
+# py/edit_scheduler.py
+"""
+Coalescing, rate-limited message edits for paginator clicks.
+
+A click is acknowledged at once (deferred update) and only records what the
+message should show next; one task per message renders the newest pending
+state when the message's token bucket allows and skips the edit when the
+result equals what is already on screen. Rapid clicks therefore cost one
+render and one edit, not one edit each.
+
+discord.py does not hand rate-limit headers to callers, and it waits out a
+429 itself and retries the request (unless the wait exceeds the client's
+max_ratelimit_timeout). Each bucket therefore starts from EDIT_RATE/EDIT_BURST;
+while discord.py sleeps inside an edit, newer clicks keep replacing the
+pending state. Only a 429 that reaches us (discord.RateLimited, or a 429
+after discord.py gave up retrying) pauses that message's bucket by its
+Retry-After and re-queues the edit behind any newer click.
+"""
+import os, time, asyncio
+from collections import OrderedDict
+
+import discord
+from py import metrics
+from py.log_config import logger
+
+
+# ─── Config ─────────────────────────────────────────────────────────────────────
+EDIT_RATE       = float(os.getenv("EDIT_RATE", 1))        # sustained edits per second and message
+EDIT_BURST      = int(os.getenv("EDIT_BURST", 3))         # edits allowed back to back
+EDIT_STATE_SIZE = int(os.getenv("EDIT_STATE_SIZE", 1024)) # messages whose bucket/last content is remembered
+
+
+RENDER_FAILED = "❌ Could not update the table. Please try again later."
+
+
+class RenderError(Exception):
+    """Raised by a render function; the message is shown to the clicking user."""
+
+
+# ─── Per-message state ──────────────────────────────────────────────────────────
+class _Bucket:
+    """Token bucket plus the digest of the last content sent to one message."""
+    __slots__ = ("tokens", "stamp", "paused_until", "last")
+
+    def __init__(self, burst: int):
+        self.tokens = float(burst)
+        self.stamp = time.monotonic()
+        self.paused_until = 0.0
+        self.last: int | None = None
+
+    def wait_time(self, rate: float, burst: int) -> float:
+        now = time.monotonic()
+        self.tokens = min(burst, self.tokens + (now - self.stamp) * rate)
+        self.stamp = now
+        if now < self.paused_until:
+            return self.paused_until - now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / rate
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+    def pause(self, seconds: float) -> None:
+        self.tokens = 0.0
+        self.paused_until = time.monotonic() + seconds
+
+
+def _digest(edit: dict) -> int:
+    view = edit.get("view")
+    return hash((edit.get("content"), repr(view.to_components()) if view is not None else None))
+
+
+def _retry_after(exc: Exception) -> float | None:
+    """Seconds Discord asked us to wait, or None if `exc` is not a rate limit."""
+    if isinstance(exc, discord.RateLimited):
+        return exc.retry_after
+    if isinstance(exc, discord.HTTPException) and exc.status == 429:
+        headers = getattr(exc.response, "headers", {}) or {}
+        for name in ("Retry-After", "X-RateLimit-Reset-After"):
+            try:
+                return float(headers[name])
+            except (KeyError, TypeError, ValueError):
+                continue
+        return 1.0
+    return None
+
+
+# ─── Scheduler ──────────────────────────────────────────────────────────────────
+class EditScheduler:
+    def __init__(self, rate: float = EDIT_RATE, burst: int = EDIT_BURST, size: int = EDIT_STATE_SIZE):
+        self.rate = rate
+        self.burst = burst
+        self.size = size
+        self._pending: dict[int, tuple] = {}                  # message id -> (interaction, render, acked)
+        self._workers: dict[int, asyncio.Task] = {}
+        self._buckets: OrderedDict[int, _Bucket] = OrderedDict()
+
+    def _bucket(self, message_id: int) -> _Bucket:
+        bucket = self._buckets.get(message_id)
+        if bucket is None:
+            bucket = self._buckets[message_id] = _Bucket(self.burst)
+            if len(self._buckets) > self.size:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(message_id)
+        return bucket
+
+    async def submit(self, interaction: discord.Interaction, render) -> None:
+        """
+        Acknowledge the click and schedule `await render()` -> edit kwargs
+        (content, view) for its message, replacing any edit still pending.
+        """
+        try:
+            await interaction.response.defer()
+            acked = True
+        except discord.errors.NotFound:
+            acked = False   # token expired: edit the message with the bot token instead
+
+        key = interaction.message.id
+        if key in self._pending:
+            metrics.paginator_skipped_edits.inc("coalesced")
+        self._pending[key] = (interaction, render, acked)
+        if key not in self._workers:
+            self._workers[key] = asyncio.create_task(self._run(key))
+
+    async def drain(self, message_id: int | None = None) -> None:
+        """Wait until the pending edits (of one message, or all) are sent or dropped."""
+        while True:
+            if message_id is None:
+                tasks = list(self._workers.values())
+            else:
+                tasks = [t for t in (self._workers.get(message_id),) if t is not None]
+            if not tasks:
+                return
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, key: int) -> None:
+        try:
+            while key in self._pending:
+                bucket = self._bucket(key)
+                delay = bucket.wait_time(self.rate, self.burst)
+                if delay > 0:
+                    # Clicks arriving meanwhile replace the pending state
+                    await asyncio.sleep(delay)
+                    continue
+
+                interaction, render, acked = self._pending.pop(key)
+                try:
+                    edit = await render()
+                except RenderError as exc:
+                    await self._notify(interaction, acked, str(exc))
+                    continue
+                except Exception as exc:
+                    logger.error("Rendering paginator page failed: %s", exc, exc_info=True)
+                    await self._notify(interaction, acked, RENDER_FAILED)
+                    continue
+                digest = _digest(edit)
+                if digest == bucket.last:
+                    metrics.paginator_skipped_edits.inc("unchanged")
+                    continue
+
+                bucket.take()
+                try:
+                    await self._send(interaction, acked, edit)
+                except Exception as exc:
+                    retry_after = _retry_after(exc)
+                    if retry_after is None:
+                        logger.error("Paginator edit failed: %s", exc)
+                        continue
+                    logger.warning("Paginator edit rate limited, retrying in %.2fs", retry_after)
+                    metrics.paginator_skipped_edits.inc("rate_limited")
+                    bucket.pause(retry_after)
+                    self._pending.setdefault(key, (interaction, render, acked))
+                    continue
+                bucket.last = digest
+        finally:
+            self._workers.pop(key, None)
+
+    @staticmethod
+    async def _notify(interaction: discord.Interaction, acked: bool, text: str) -> None:
+        """Ephemeral note to the user whose click could not be rendered."""
+        if not acked:
+            return   # no valid interaction token left to answer with
+        try:
+            await interaction.followup.send(text, ephemeral=True)
+        except discord.HTTPException as exc:
+            logger.warning("Could not report paginator error: %s", exc)
+
+    @staticmethod
+    async def _send(interaction: discord.Interaction, acked: bool, edit: dict) -> None:
+        if acked:
+            await interaction.edit_original_response(**edit)
+            metrics.paginator_edits.inc("response")
+        else:
+            await interaction.message.edit(**edit)
+            metrics.paginator_edits.inc("message")
+
+
+edit_scheduler = EditScheduler()
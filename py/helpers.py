@@ -19,18 +19,7 @@ anon_supabase = create_client(SUPABASE_URL, SB_ANON_KEY)
 admin_supabase = create_client(SUPABASE_URL, SB_SERVICE_KEY)
 
 # ─── Formatting constants ─────────────────────────────────────────────────────
-NAME_WIDTH = 15
-SING_WIDTH = 7
-DANCE_WIDTH = 7
-RALLY_WIDTH = 7
-ROWS_PER_PAGE = 20
-HEADER = (
-    f"{'Name':<{NAME_WIDTH}} | "
-    f"{'Sing[k]':<{SING_WIDTH}}|"
-    f"{'Dance[k]':<{DANCE_WIDTH}}| "
-    f"{'Rally[Mio]':<{RALLY_WIDTH}}"
-)
-SEP = '-' * len(HEADER)
+ROWS_PER_PAGE = 20   # keyset pages; snapshot pages are sized by py/render.py
 
 # ─── Auth / Admin Check ──────────────────────────────────────────────────────────
 def load_admin_ids(path="data/adms.txt"):
@@ -50,26 +39,38 @@ def load_admin_ids(path="data/adms.txt"):
         pass
     return ids
 
-# Now ADMIN_IDS is initialized from that file:
-ADMIN_IDS = load_admin_ids()
+ADMIN_FILE = "data/adms.txt"
+ADMIN_RELOAD_INTERVAL = 5.0  # seconds between mtime checks
+_admin_state = {"mtime": None, "checked": 0.0}
+
+
+def reload_admin_ids(force: bool = False) -> None:
+    """Re-read ADMIN_FILE when its mtime changed (checked at most every few seconds)."""
+    global ADMIN_IDS
+    now = time.monotonic()
+    if not force and now - _admin_state["checked"] < ADMIN_RELOAD_INTERVAL:
+        return
+    _admin_state["checked"] = now
+    try:
+        mtime = os.stat(ADMIN_FILE).st_mtime_ns
+    except FileNotFoundError:
+        mtime = None
+    if force or mtime != _admin_state["mtime"]:
+        _admin_state["mtime"] = mtime
+        ADMIN_IDS = load_admin_ids(ADMIN_FILE)
+        logger.info("Loaded %d admin IDs from %s", len(ADMIN_IDS), ADMIN_FILE)
+
+
+# Now ADMIN_IDS is initialized from that file (and hot-reloaded by is_admin):
+ADMIN_IDS: set[int] = set()
+reload_admin_ids(force=True)
 
 
 def is_admin(user) -> bool:
+    reload_admin_ids()
     return getattr(user, 'id', None) in ADMIN_IDS
 
 
-def is_editor(user_id: int) -> bool:
-    """Return True if user is in stats_editors_rights table."""
-    try:
-        res = anon_supabase.table("stats_editors_rights") \
-            .select("discord_id") \
-            .eq("discord_id", user_id) \
-            .execute()
-        return bool(res.data)
-    except Exception as e:
-        logger.error("RLS check failed for editor rights: %s", e)
-        return False
-
 # ─── JWT minting & user client ─────────────────────────────────────────────────
 # def mint_discord_user_token(discord_id: int, ttl: int = 3600) -> str:
 #     now = int(time.time())
@@ -84,70 +85,24 @@ def is_editor(user_id: int) -> bool:
 #     return jwt.encode(payload, JWT_SECRET, algorithm="HS256")
 
 
-# ─── In-memory caching ─────────────────────────────────────────────────────────
-_cache = {"data": None, "timestamp": 0}
-CACHE_TTL = 60  # seconds
-
-
-def load_data(use_cache: bool = True) -> list:
-    now = time.time()
-    if use_cache and _cache["data"] and now - _cache["timestamp"] < CACHE_TTL:
-        return _cache["data"]
-    try:
-        res = anon_supabase.table("stats").select("*").execute()
-        data = res.data or []
-    except Exception as e:
-        logger.error("Failed to load stats data: %s", e)
-        return []
-    _cache.update({"data": data, "timestamp": now})
-    return data
-
-
-def invalidate_cache() -> None:
-    _cache["timestamp"] = 0
-
-
-# ─── Data modifications ────────────────────────────────────────────────────────
-def update_row(name: str, **kwargs) -> None:
-    payload = {k: v for k, v in kwargs.items() if v is not None}
-    if not payload:
-        return
-    try:
-        anon_supabase.table("stats").update(payload).eq("name", name).execute()
-    except Exception as e:
-        logger.error("Failed to update row %s: %s", name, e)
-
 # ─── Formatting helpers ─────────────────────────────────────────────────────────
-def format_row(d: dict) -> str:
-    name = d.get("name", "")
-    sing = d.get("sing", 0) or 0
-    dance = d.get("dance", 0) or 0
-    rally = d.get("rally", 0) or 0
-    return (
-        f"{name:<{NAME_WIDTH}} | "
-        f"{sing:<{SING_WIDTH}}| "
-        f"{dance:<{DANCE_WIDTH}}| "
-        f"{rally:<{RALLY_WIDTH}}"
-    )
-
-def blank_row() -> str:
-    return (
-        f"{'':<{NAME_WIDTH}} | "
-        f"{'':<{SING_WIDTH}}| "
-        f"{'':<{DANCE_WIDTH}}| "
-        f"{'':<{RALLY_WIDTH}}"
-    )
+def format_number(value) -> str:
+    """Table cell for a stat: NULL shows as 0, at most two decimals, no trailing zeros."""
+    if value is None:
+        return "0"
+    if isinstance(value, float):
+        if value.is_integer():
+            return str(int(value))
+        return f"{value:.2f}".rstrip("0").rstrip(".")
+    return str(value)
 
 
 # ─── Sorting & pagination ──────────────────────────────────────────────────────
-def sort_data(data: list, column: str, descending: bool = False) -> list:
-    key_fn = lambda row: row.get(column) if row.get(column) is not None else (
-        "" if column == "name" else float('-inf')
-    )
-    return sorted(data, key=key_fn, reverse=descending)
+SORT_COLUMNS = ("name", "sing", "dance", "rally")
 
 
 # Users of this module should import: 
-#   anon_supabase, admin_supabase, is_admin, is_editor, 
-#   user_client_for, load_data, invalidate_cache, update_row,
-#   HEADER, SEP, format_row, blank_row, sort_data, ROWS_PER_PAGE
\ No newline at end of file
+#   anon_supabase, admin_supabase, is_admin, reload_admin_ids,
+#   format_number, SORT_COLUMNS, ROWS_PER_PAGE
+# Anything that talks to Supabase lives in py/db.py (fetch_stats, …),
+# the shared stats snapshot cache in py/snapshot.py, editor checks in py/permissions.py
\ No newline at end of file
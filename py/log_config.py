@@ -1,6 +1,6 @@
 # py/log_config.py
-import logging
-from logging.handlers import RotatingFileHandler
+import os, queue, atexit, logging
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from logging import StreamHandler
 
 # Optional Logflare integration
@@ -10,6 +10,34 @@ try:
 except ImportError:
     _has_logflare = False
 
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10_000))
+LOG_FILE       = os.getenv("LOG_FILE", "discord_bot.log")   # "" disables the file
+
+# Rotation is not safe across processes: shard workers (py/supervisor.py) get their own file
+if LOG_FILE and os.getenv("SHARD_WORKER") is not None:
+    _stem, _ext = os.path.splitext(LOG_FILE)
+    LOG_FILE = f"{_stem}.worker{os.environ['SHARD_WORKER']}{_ext}"
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler for the event loop thread: it never formats and never blocks.
+    Records go to the listener as they are; when the queue is full the record
+    is dropped and counted instead of stalling the caller.
+    """
+    def __init__(self, q: queue.Queue):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
 
 # ─── 1) Configure root logger to INFO level (change to DEBUG if needed) ───
 root = logging.getLogger()
@@ -19,27 +47,55 @@ fmt = logging.Formatter(
     "%(asctime)s [%(levelname)-5s] %(name)s:%(funcName)s:%(lineno)d — %(message)s",
     datefmt="%Y-%m-%d %H:%M:%S"
 )
+handlers = []
 
 # ─── 2) Console Handler ───
 ch = StreamHandler()
 ch.setLevel(logging.INFO)
 ch.setFormatter(fmt)
-root.addHandler(ch)
+handlers.append(ch)
 
-# ─── 3) Rotating File Handler ───
-fh = RotatingFileHandler("discord_bot.log", maxBytes=5_000_000, backupCount=3, encoding="utf-8")
-fh.setLevel(logging.INFO)
-fh.setFormatter(fmt)
-root.addHandler(fh)
+# ─── 3) Rotating File Handler (one file per process) ───
+if LOG_FILE:
+    fh = RotatingFileHandler(LOG_FILE, maxBytes=5_000_000, backupCount=3, encoding="utf-8")
+    fh.setLevel(logging.INFO)
+    fh.setFormatter(fmt)
+    handlers.append(fh)
 
 # ─── 4) Optional: Logflare Handler ───
+lh = None
+_logflare_error = None
 try:
     lh = LogflareHandler()
     lh.setLevel(logging.INFO)
     lh.setFormatter(fmt)
-    root.addHandler(lh)
+    handlers.append(lh)
 except Exception as e:
-    root.warning("LogflareHandler init fehlgeschlagen: %s", e)
+    _logflare_error = e
+
+# ─── 5) Root only enqueues; one listener thread formats, writes and rotates ───
+log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+qh = DroppingQueueHandler(log_queue)
+root.addHandler(qh)
+listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+listener.start()
+atexit.register(listener.stop)
+
+if _logflare_error is not None:
+    root.warning("LogflareHandler init fehlgeschlagen: %s", _logflare_error)
+
+
+def log_queue_stats() -> dict:
+    """Current depth and drop counters of the logging pipeline."""
+    stats = {
+        "queued":   log_queue.qsize(),
+        "capacity": LOG_QUEUE_SIZE,
+        "dropped":  qh.dropped,
+    }
+    if lh is not None:
+        stats.update(logflare_sent=lh.sent, logflare_dropped=lh.dropped, logflare_failed=lh.failed)
+    return stats
+
 
-# ─── 5) Expose a module‐level logger for “app code” ───
-logger = logging.getLogger(__name__)
\ No newline at end of file
+# ─── 6) Expose a module‐level logger for “app code” ───
+logger = logging.getLogger(__name__)
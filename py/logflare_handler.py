@@ -1,31 +1,60 @@
-import os, json, threading, logging, requests
+import os, atexit, threading, logging, requests
+from collections import deque
 from datetime import datetime
 from logging import Handler, LogRecord
 
 
 class LogflareHandler(Handler):
     """
-    Einfache Handler, der jeden LogRecord in einem Hintergrund-Thread
-    an Logflare schickt.
+    Handler, der LogRecords in einer begrenzten Queue sammelt und von einem
+    einzigen Hintergrund-Thread gebündelt an Logflare schickt.
+
+    Gesendet wird, sobald `batch_size` Einträge warten oder spätestens alle
+    `flush_interval` Sekunden. Ist die Queue voll, fliegt der älteste Eintrag
+    raus (`dropped` zählt mit). Beim Beenden des Interpreters wird geleert.
     """
-    def __init__(self):
-        super().__init__()
-        self.setFormatter(logging.Formatter())  # sorgt für formatException()
+    def __init__(self, batch_size: int = 100, flush_interval: float = 2.0, max_queue: int = 5000):
+        # Erst prüfen, dann registrieren: logging.shutdown() ruft flush() auf
+        # jedem je erzeugten Handler auf, auch auf halb initialisierten
         self.api_key   = os.getenv("LOGFLARE_API_KEY")
         self.source_id = os.getenv("LOGFLARE_SOURCE_ID")
         if not self.api_key or not self.source_id:
             raise RuntimeError("LOGFLARE_API_KEY und LOGFLARE_SOURCE_ID müssen gesetzt sein")
-        self.endpoint = f"https://api.logflare.app/logs?api_key={self.api_key}&source={self.source_id}"
+        super().__init__()
+        self.setFormatter(logging.Formatter())  # sorgt für formatException()
+        self.endpoint = "https://api.logflare.app/api/logs"
         self._session = requests.Session()
-        self._session.headers.update({"Content-Type": "application/json"})
+        self._session.headers.update({
+            "Content-Type": "application/json",
+            "X-API-KEY": self.api_key,
+        })
+
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: deque[dict] = deque()
+        self._max_queue = max_queue
+        self._cond = threading.Condition()
+        self._closing = False
+        self._inflight = 0
+        self.sent = self.dropped = self.failed = 0
+
+        self._worker = threading.Thread(target=self._run, name="logflare", daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
 
     def emit(self, record: LogRecord) -> None:
         try:
             payload = self.format_payload(record)
-            # Startet einen kurzen Thread pro Log
-            threading.Thread(target=self._post, args=(payload,), daemon=True).start()
         except Exception:
-            logging.getLogger(__name__).warning("LogflareHandler.emit() Fehler", exc_info=True)
+            self.handleError(record)
+            return
+        with self._cond:
+            if len(self._queue) >= self._max_queue:
+                self._queue.popleft()
+                self.dropped += 1
+            self._queue.append(payload)
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify()
 
     def format_payload(self, record: LogRecord) -> dict:
         ts = datetime.utcfromtimestamp(record.created).isoformat() + "Z"
@@ -44,8 +73,51 @@ class LogflareHandler(Handler):
             base["meta"]["exc_info"] = self.formatter.formatException(record.exc_info)
         return base
 
-    def _post(self, payload: dict):
+    # ─── Worker ─────────────────────────────────────────────────────────────────
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if len(self._queue) < self.batch_size and not self._closing:
+                    self._cond.wait(self.flush_interval)
+                batch = [self._queue.popleft() for _ in range(min(len(self._queue), self.batch_size))]
+                self._inflight = len(batch)
+                if not batch and self._closing:
+                    self._cond.notify_all()
+                    return
+            if batch:
+                self._post(batch)
+            with self._cond:
+                self._inflight = 0
+                self._cond.notify_all()
+
+    def _post(self, batch: list[dict]) -> None:
         try:
-            self._session.post(self.endpoint, json=payload, timeout=3)
+            resp = self._session.post(
+                self.endpoint,
+                params={"source": self.source_id},
+                json={"batch": batch},
+                timeout=5
+            )
+            resp.raise_for_status()
+            self.sent += len(batch)
         except Exception:
-            pass  # still swallow
+            self.failed += len(batch)  # nie selbst loggen, sonst Rekursion
+
+    # ─── Lifecycle ──────────────────────────────────────────────────────────────
+    def flush(self, timeout: float = 5.0) -> None:
+        """Blockiert, bis alles Wartende verschickt ist (höchstens `timeout` s)."""
+        with self._cond:
+            self._cond.notify()
+            self._cond.wait_for(
+                lambda: (not self._queue and not self._inflight) or not self._worker.is_alive(),
+                timeout
+            )
+
+    def close(self) -> None:
+        with self._cond:
+            if self._closing:
+                return
+            self._closing = True
+            self._cond.notify_all()
+        self._worker.join(timeout=5)
+        super().close()
@@ -0,0 +1,230 @@
+# py/metrics.py
+"""
+Tiny in-process metrics registry with Prometheus text exposition.
+
+Metrics are plain Python counters updated on the event loop thread, so an
+observation is a dict lookup plus a bisect; nothing is formatted until
+/metrics is scraped. Values that already live elsewhere (cache hit
+counters, queue depths, gateway latency) are exported through callbacks
+read at scrape time instead of being mirrored on every call.
+"""
+import math, time
+from bisect import bisect_left
+
+
+# Default buckets (seconds) span fast cache hits up to the 3 s interaction deadline
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0)
+
+
+def _fmt(value: float) -> str:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "NaN"
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+# ─── Metric types ───────────────────────────────────────────────────────────────
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, value: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + value
+
+    def samples(self):
+        for key, value in self._values.items():
+            yield self.name, _labels(self.labels, key), value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, *labels, value: float) -> None:
+        self._values[labels] = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, labels
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple, list] = {}   # labels -> [per-bucket counts..., overflow, sum, count]
+
+    def observe(self, value: float, *labels) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 3)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def samples(self):
+        for key, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield f"{self.name}_bucket", _labels(self.labels, key, f'le="{_fmt(bound)}"'), cumulative
+            yield f"{self.name}_bucket", _labels(self.labels, key, 'le="+Inf"'), series[-1]
+            yield f"{self.name}_sum", _labels(self.labels, key), series[-2]
+            yield f"{self.name}_count", _labels(self.labels, key), series[-1]
+
+
+class Callback:
+    """Metric whose samples come from `fn()` at scrape time: a number or {label values: number}."""
+    def __init__(self, name: str, help: str, fn, labels: tuple = (), kind: str = "gauge"):
+        self.name, self.help, self.labels, self.kind = name, help, labels, kind
+        self.fn = fn
+
+    def samples(self):
+        try:
+            result = self.fn()
+        except Exception:
+            return
+        if isinstance(result, dict):
+            for key, value in result.items():
+                key = key if isinstance(key, tuple) else (key,)
+                yield self.name, _labels(self.labels, key), value
+        elif result is not None:
+            yield self.name, "", result
+
+
+# ─── Registry ───────────────────────────────────────────────────────────────────
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, object] = {}
+
+    def _add(self, metric):
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: tuple = ()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: tuple = ()) -> Gauge:
+        return self._add(Gauge(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def callback(self, name: str, help: str, fn, labels: tuple = (), kind: str = "gauge") -> Callback:
+        metric = Callback(name, help, fn, labels, kind)
+        self._metrics[name] = metric   # re-registering replaces the callback
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_fmt(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def merge(expositions: dict[str, str], label: str = "process") -> str:
+    """
+    Combine Prometheus texts of several processes into one: every sample gets
+    `label="<key>"` and each metric family keeps a single HELP/TYPE header.
+    """
+    families: dict[str, dict] = {}   # name -> {"HELP": line, "TYPE": line, "samples": [...]}
+    for key, text in expositions.items():
+        extra = f'{label}="{_escape(key)}"'
+        family = None
+        for line in text.splitlines():
+            if line.startswith(("# HELP ", "# TYPE ")):
+                _, kind, name = line.split(" ", 3)[:3]
+                family = families.setdefault(name, {"samples": []})
+                family.setdefault(kind, line)
+                continue
+            if not line or line.startswith("#") or family is None:
+                continue
+            series, _, value = line.rpartition(" ")
+            if series.endswith("{}"):
+                series = series[:-2]
+            if series.endswith("}"):
+                series = f"{series[:-1]},{extra}}}"
+            else:
+                series = f"{series}{{{extra}}}"
+            family["samples"].append(f"{series} {value}")
+
+    lines = []
+    for family in families.values():
+        lines += [family[k] for k in ("HELP", "TYPE") if k in family]
+        lines += family["samples"]
+    return "\n".join(lines) + "\n"
+
+
+# ─── Shared metrics ─────────────────────────────────────────────────────────────
+command_defer_seconds = registry.histogram(
+    "command_defer_seconds", "Time from receiving an interaction to its defer", ("command",)
+)
+command_response_seconds = registry.histogram(
+    "command_response_seconds", "Time from receiving an interaction to the end of its handler", ("command", "status")
+)
+supabase_call_seconds = registry.histogram(
+    "supabase_call_seconds", "Supabase round trips", ("table", "op")
+)
+supabase_errors = registry.counter(
+    "supabase_errors_total", "Failed or timed out Supabase calls", ("table", "op")
+)
+supabase_retries = registry.counter(
+    "supabase_retries_total", "Supabase reads retried after a transient error", ("table", "op")
+)
+supabase_hedges = registry.counter(
+    "supabase_hedged_requests_total", "Duplicate Supabase reads sent after the first ran past p95", ("table", "op")
+)
+paginator_edits = registry.counter(
+    "paginator_edits_total", "Table message edits from paginator clicks", ("path",)
+)
+paginator_skipped_edits = registry.counter(
+    "paginator_skipped_edits_total", "Paginator edits not sent: coalesced, unchanged or rate limited", ("reason",)
+)
+paginator_stale_clicks = registry.counter(
+    "paginator_stale_clicks_total", "Paginator clicks on a page rendered from an older snapshot"
+)
+
+
+def mark_received(interaction) -> None:
+    interaction.extras["received_at"] = time.perf_counter()
+
+
+def _command_name(interaction) -> str:
+    command = interaction.command
+    return command.qualified_name if command is not None else "unknown"
+
+
+def mark_deferred(interaction) -> None:
+    """Call right after `interaction.response.defer(...)` returns."""
+    started = interaction.extras.get("received_at")
+    if started is not None:
+        command_defer_seconds.observe(time.perf_counter() - started, _command_name(interaction))
+
+
+def mark_finished(interaction, status: str = "ok") -> None:
+    started = interaction.extras.pop("received_at", None)
+    if started is not None:
+        command_response_seconds.observe(time.perf_counter() - started, _command_name(interaction), status)
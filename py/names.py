@@ -0,0 +1,90 @@
+# py/names.py
+"""
+Name lookup on the cached stats snapshot: case-insensitive prefix matches
+via bisect on the snapshot's folded name order, with a difflib fallback for
+typos. Nothing here touches the network, so it is safe for autocomplete.
+"""
+import os
+from bisect import bisect_left
+from difflib import SequenceMatcher
+
+from discord import app_commands, Interaction
+
+from py.snapshot import StatsSnapshot, stats_cache, NAME_FOLDED
+
+
+# ─── Config ─────────────────────────────────────────────────────────────────────
+MAX_CHOICES  = 25                                      # Discord's autocomplete limit
+CHOICE_MAX   = 100                                     # Discord's limit for a choice's name and value
+FUZZY_WINDOW = int(os.getenv("FUZZY_WINDOW", 2000))    # names around the bisect point scored by difflib
+FUZZY_CUTOFF = 0.6
+
+
+# ─── Search ─────────────────────────────────────────────────────────────────────
+def prefix_matches(snapshot: StatsSnapshot, prefix: str, limit: int = MAX_CHOICES) -> list[int]:
+    """Row positions whose name starts with `prefix` (case-insensitive), alphabetical."""
+    perm = snapshot.order(NAME_FOLDED)
+    prefix = prefix.casefold()
+    k = bisect_left(perm, prefix, key=snapshot.folded_name)
+    out = []
+    while k < len(perm) and len(out) < limit:
+        if not snapshot.folded_name(perm[k]).startswith(prefix):
+            break
+        out.append(perm[k])
+        k += 1
+    return out
+
+
+def fuzzy_matches(snapshot: StatsSnapshot, query: str, limit: int = MAX_CHOICES,
+                  exclude: set[int] = frozenset()) -> list[int]:
+    """
+    Closest names by difflib ratio. Only FUZZY_WINDOW names around where
+    `query` would sort are scored (all of them for small tables), so typos
+    after the first letter are found in constant time.
+    """
+    perm = snapshot.order(NAME_FOLDED)
+    query = query.casefold()
+    k = bisect_left(perm, query, key=snapshot.folded_name)
+    lo = max(0, k - FUZZY_WINDOW // 2)
+    window = perm[lo:lo + FUZZY_WINDOW]
+
+    matcher = SequenceMatcher(b=query)
+    scored = []
+    for i in window:
+        if i in exclude:
+            continue
+        matcher.set_seq1(snapshot.folded_name(i))
+        if matcher.real_quick_ratio() >= FUZZY_CUTOFF and matcher.quick_ratio() >= FUZZY_CUTOFF:
+            score = matcher.ratio()
+            if score >= FUZZY_CUTOFF:
+                scored.append((-score, i))
+    scored.sort()
+    return [i for _, i in scored[:limit]]
+
+
+def search(snapshot: StatsSnapshot, query: str, limit: int = MAX_CHOICES) -> list[int]:
+    """Prefix matches first, topped up with fuzzy matches."""
+    query = query.strip()
+    if not query:
+        return list(snapshot.order(NAME_FOLDED)[:limit])
+    found = prefix_matches(snapshot, query, limit)
+    if len(found) < limit:
+        found += fuzzy_matches(snapshot, query, limit - len(found), exclude=set(found))
+    return found
+
+
+# ─── Autocomplete ───────────────────────────────────────────────────────────────
+async def autocomplete_name(interaction: Interaction, current: str) -> list[app_commands.Choice[str]]:
+    """
+    Autocomplete for `name` parameters, served from whatever snapshot is
+    cached. Names longer than CHOICE_MAX are left out: cut short they would
+    name a member that does not exist.
+    """
+    snapshot = stats_cache.current
+    if snapshot is None:
+        return []
+    return [
+        app_commands.Choice(name=n, value=n)
+        for n in (snapshot.name(i) for i in search(snapshot, current))
+        if n and len(n) <= CHOICE_MAX
+    ]
@@ -1,74 +1,226 @@
 # py/paginator.py
+"""
+Persistent, stateless paginators. Every button carries its whole state in
+its custom_id, e.g. `tbl:n:3:sing:d:compact:42` (next → page 3, sorted by
+sing descending, compact layout, rendered from snapshot v42). The button
+classes are registered once with `bot.add_dynamic_items`, so clicks work on
+any table message — after the old 120 s view timeout and across restarts —
+and the bot keeps nothing in memory per message. Clicks only hand a render
+function to py/edit_scheduler.py, which acknowledges them and coalesces the
+edits.
+"""
+import json
+import re
+
 import discord
 from discord import ui
-from py.helpers import HEADER, format_row, blank_row, sort_data, ROWS_PER_PAGE
+from py import db, metrics
+from py.log_config import logger
+from py.helpers import ROWS_PER_PAGE, SORT_COLUMNS
+from py.render import render_page, page_count, build_block, LAYOUTS, TABLE_LAYOUT
+from py.snapshot import StatsSnapshot, stats_cache
+from py.edit_scheduler import edit_scheduler, RenderError
+
+CUSTOM_ID_LIMIT = 100   # Discord's limit for component custom_ids
+
+
+def _state(match: re.Match) -> tuple[str | None, bool, str]:
+    """Sort column, direction and layout from a custom_id; unknown values fall back to defaults."""
+    sort_by = match["sort"] if match["sort"] in SORT_COLUMNS else None
+    layout = match["layout"] if match["layout"] in LAYOUTS else TABLE_LAYOUT
+    return sort_by, match["dir"] == "d", layout
+
+
+def _button(role: str, custom_id: str, disabled: bool) -> ui.Button:
+    label = "◀ Prev" if role == "p" else "Next ▶"
+    return ui.Button(label=label, style=discord.ButtonStyle.primary, custom_id=custom_id, disabled=disabled)
+
+
+# ─── Snapshot tables ────────────────────────────────────────────────────────────
+class TablePageButton(
+    ui.DynamicItem[ui.Button],
+    template=r"tbl:(?P<role>[pn]):(?P<page>\d+):(?P<sort>\w*):(?P<dir>[ad]):(?P<layout>\w+):(?P<version>\d+)"
+):
+    """Prev/Next of a snapshot table; `page` is the page this button leads to."""
+    def __init__(self, role: str, page: int, sort_by: str | None, sort_desc: bool,
+                 layout: str, version: int, disabled: bool = False):
+        self.role = role
+        self.page = page
+        self.sort_by = sort_by
+        self.sort_desc = sort_desc
+        self.layout = layout
+        self.version = version
+        custom_id = f"tbl:{role}:{page}:{sort_by or ''}:{'d' if sort_desc else 'a'}:{layout}:{version}"
+        super().__init__(_button(role, custom_id, disabled))
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: ui.Button, match: re.Match):
+        sort_by, sort_desc, layout = _state(match)
+        return cls(match["role"], int(match["page"]), sort_by, sort_desc, layout, int(match["version"]))
+
+    async def callback(self, interaction: discord.Interaction) -> None:
+        await edit_scheduler.submit(interaction, self.render)
+
+    async def render(self) -> dict:
+        """
+        The target page from the shared snapshot. A click on a page of an
+        older snapshot shows the same page number of the current one.
+        """
+        snapshot = await stats_cache.get()
+        if snapshot.version != self.version:
+            metrics.paginator_stale_clicks.inc()
+        view = TablePaginator(snapshot, self.sort_by, self.sort_desc, self.page, self.layout)
+        # Rendered block from the shared page cache (page size follows the layout)
+        block = (
+            render_page(snapshot, self.sort_by, self.sort_desc, view.page, self.layout)
+            or build_block([], self.layout)
+        )
+        return {"content": block, "view": view}
+
 
 class TablePaginator(ui.View):
+    """
+    Throw-away view holding the two buttons of one snapshot page. It never
+    times out and is not kept by discord.py (all items are dynamic), so an
+    open table costs no memory at all.
+    """
     def __init__(
         self,
-        data: list[dict],
+        snapshot: StatsSnapshot,
         sort_by: str | None = None,
         sort_desc: bool = False,
-        page: int = 1
+        page: int = 1,
+        layout: str = TABLE_LAYOUT
     ):
-        super().__init__(timeout=120)
-        self.data = data
+        super().__init__(timeout=None)
+        self.total = page_count(snapshot, layout)
+        self.page = max(1, min(page, self.total))
+        state = (sort_by, sort_desc, layout, snapshot.version)
+        self.prev_button = TablePageButton("p", max(1, self.page - 1), *state, disabled=self.page <= 1)
+        self.next_button = TablePageButton("n", min(self.page + 1, self.total), *state,
+                                           disabled=self.page >= self.total)
+        self.add_item(self.prev_button)
+        self.add_item(self.next_button)
+
+
+# ─── Keyset tables ──────────────────────────────────────────────────────────────
+def _encode_key(key: tuple | None) -> str:
+    return json.dumps(list(key), separators=(",", ":"), ensure_ascii=False) if key else ""
+
+
+def _decode_key(text: str) -> tuple | None:
+    if not text:
+        return None
+    try:
+        value, name = json.loads(text)
+    except (ValueError, TypeError):
+        return None
+    return value, name
+
+
+class KeysetPageButton(
+    ui.DynamicItem[ui.Button],
+    template=re.compile(
+        r"ks:(?P<role>[pn]):(?P<page>\d+):(?P<sort>\w*):(?P<dir>[ad]):(?P<layout>\w+):(?P<key>.*)",
+        re.DOTALL
+    )
+):
+    """
+    Prev/Next of a server-side (keyset) table. `key` is the (sort value, name)
+    of the row to seek from; when it does not fit into the custom_id (long
+    names) it is left out and the page is fetched by OFFSET instead.
+    """
+    def __init__(self, role: str, page: int, sort_by: str | None, sort_desc: bool,
+                 layout: str, key: tuple | None, disabled: bool = False):
+        self.role = role
+        self.page = page
         self.sort_by = sort_by
         self.sort_desc = sort_desc
-        self.page = page
+        self.layout = layout
+        prefix = f"ks:{role}:{page}:{sort_by or ''}:{'d' if sort_desc else 'a'}:{layout}:"
+        encoded = _encode_key(key)
+        if len(prefix) + len(encoded) > CUSTOM_ID_LIMIT:
+            key, encoded = None, ""
+        self.key = key
+        super().__init__(_button(role, prefix + encoded, disabled))
 
-        # Pre-render header and separator once
-        self.header = HEADER
-        self.sep = '-' * len(self.header)
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: ui.Button, match: re.Match):
+        sort_by, sort_desc, layout = _state(match)
+        return cls(match["role"], int(match["page"]), sort_by, sort_desc, layout, _decode_key(match["key"]))
 
-        self._update_button_states()
+    async def _fetch(self, page: int, limit: int, **seek) -> list[dict]:
+        """One page, by key when we have one, else (or without `seek`) by OFFSET."""
+        if self.key is None or not seek:
+            seek = {"offset": (page - 1) * ROWS_PER_PAGE}
+        try:
+            return await db.fetch_stats_page(self.sort_by, self.sort_desc, limit, **seek)
+        except Exception as exc:
+            logger.error("Failed to fetch stats page: %s", exc, exc_info=True)
+            raise RenderError("❌ Could not fetch data. Please try again later.") from exc
 
-    def _update_button_states(self) -> None:
-        # Compute total pages and enable/disable buttons
-        total = max(1, (len(self.data) - 1) // ROWS_PER_PAGE + 1)
-        self.prev_button.disabled = self.page <= 1
-        self.next_button.disabled = self.page >= total
+    async def callback(self, interaction: discord.Interaction) -> None:
+        if self.page < 1:
+            return await interaction.response.send_message("❌ Page out of range", ephemeral=True)
+        await edit_scheduler.submit(interaction, self.render)
 
+    async def render(self) -> dict:
+        page = self.page
+        if self.role == "n":
+            rows = await self._fetch(page, ROWS_PER_PAGE + 1, after=self.key)
+            if not rows and self.key is not None:
+                # The rows after ours were deleted meanwhile: try the page by position
+                rows = await self._fetch(page, ROWS_PER_PAGE + 1)
+            if not rows:
+                raise RenderError("❌ No more rows")
+            has_next = len(rows) > ROWS_PER_PAGE
+        else:
+            rows = await self._fetch(page, ROWS_PER_PAGE, before=self.key) if page > 1 else []
+            has_next = True
+            if not rows:
+                # Nothing before us any more: this is the first page now
+                page = 1
+                rows = await self._fetch(1, ROWS_PER_PAGE + 1)
+                has_next = len(rows) > ROWS_PER_PAGE
+            if not rows:
+                raise RenderError("❌ The table is empty")
+        rows = rows[:ROWS_PER_PAGE]
+        return {
+            "content": build_block(rows, self.layout),
+            "view": KeysetPaginator(rows, self.sort_by, self.sort_desc, page, has_next, self.layout),
+        }
 
-    @ui.button(label='◀ Prev', style=discord.ButtonStyle.primary, custom_id='table_prev')
-    async def prev_button(self, interaction: discord.Interaction, button: ui.Button) -> None:
-        await self._change_page(interaction, self.page - 1)
 
-    @ui.button(label='Next ▶', style=discord.ButtonStyle.primary, custom_id='table_next')
-    async def next_button(self, interaction: discord.Interaction, button: ui.Button) -> None:
-        await self._change_page(interaction, self.page + 1)
+class KeysetPaginator(ui.View):
+    """
+    Paginator for the server-side path: PostgREST sorts and slices, and the
+    buttons only carry the sort keys of the first and last row on screen.
+    A page turn fetches exactly one page (plus one row to detect the end).
+    """
+    def __init__(
+        self,
+        rows: list[dict],
+        sort_by: str | None = None,
+        sort_desc: bool = False,
+        page: int = 1,
+        has_next: bool = False,
+        layout: str = TABLE_LAYOUT
+    ):
+        super().__init__(timeout=None)
+        self.sort_by = sort_by
+        self.page = page
+        first_key = self._key(rows[0]) if rows else None
+        last_key = self._key(rows[-1]) if rows else None
+        state = (sort_by, sort_desc, layout)
+        self.prev_button = KeysetPageButton("p", max(1, page - 1), *state, first_key,
+                                            disabled=page <= 1 or first_key is None)
+        self.next_button = KeysetPageButton("n", page + 1, *state, last_key, disabled=not has_next)
+        self.add_item(self.prev_button)
+        self.add_item(self.next_button)
 
-    async def _change_page(self, interaction: discord.Interaction, new_page: int) -> None:
-        """
-        Update the current page, re-render the table, and edit the message.
-        """
-        self.page = new_page
-        # Apply sorting if requested
-        rows = sort_data(self.data, self.sort_by, self.sort_desc) if self.sort_by else self.data
-        # Paginate
-        start = (self.page - 1) * ROWS_PER_PAGE
-        page_rows = rows[start:start + ROWS_PER_PAGE]
-        
-        # Render table text
-        lines = [self.header, self.sep]
-        for r in page_rows:
-            lines.append(format_row(r))
-            lines.append(blank_row())
-        
-        text = "\n".join(lines)
-        block = f"```css\n{text}\n```"
-            
-        # block = '```css\n' + '\n'.join(lines) + '\n```'
-       
-        # Update navigation buttons
-        self._update_button_states()
-
-        # Try to edit interaction, fallback to followup
-        try:
-            await interaction.response.edit_message(content=block, view=self)
-        except discord.errors.NotFound:
-            await interaction.followup.edit_message(
-                message_id=interaction.message.id,
-                content=block,
-                view=self
-            )
\ No newline at end of file
+    def _key(self, row: dict) -> tuple:
+        return (row.get(self.sort_by) if self.sort_by else None, row.get("name"))
+
+
+# ─── Registration ───────────────────────────────────────────────────────────────
+DYNAMIC_ITEMS = (TablePageButton, KeysetPageButton)
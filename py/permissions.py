@@ -0,0 +1,153 @@
+# py/permissions.py
+import os, time, asyncio
+
+from py import db
+from py.log_config import logger
+
+
+# ─── Config ─────────────────────────────────────────────────────────────────────
+EDITOR_TTL      = float(os.getenv("EDITOR_TTL", 300))      # seconds a grant is trusted
+EDITOR_DENY_TTL = float(os.getenv("EDITOR_DENY_TTL", 60))  # seconds a denial is trusted
+
+
+# ─── Editor cache ───────────────────────────────────────────────────────────────
+class PermissionCache:
+    """
+    Editor rights keyed by Discord ID. Grants and denials are both cached;
+    a failed lookup is never cached, and while Supabase fails an entry is
+    served for at most one TTL past its expiry. After warm() loads the full editor list,
+    unknown IDs are denied without a lookup for EDITOR_DENY_TTL.
+    """
+    def __init__(self, ttl: float = EDITOR_TTL, deny_ttl: float = EDITOR_DENY_TTL):
+        self.ttl = ttl
+        self.deny_ttl = deny_ttl
+        self._entries: dict[int, tuple[bool, float]] = {}   # id -> (allowed, expires_at)
+        self._inflight: dict[int, asyncio.Task] = {}
+        self._synced: set[int] = set()   # grants that came from a published list (see sync)
+        self._complete_until = 0.0
+        self._listeners: list = []
+        self.hits = self.misses = 0
+
+    async def is_editor(self, user_id: int) -> bool:
+        now = time.monotonic()
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[1] > now:
+            self.hits += 1
+            return entry[0]
+        if entry is None and now < self._complete_until:
+            self.hits += 1
+            return False
+
+        self.misses += 1
+        task = self._inflight.get(user_id)
+        if task is None:
+            task = asyncio.create_task(db.editor_exists(user_id))
+            self._inflight[user_id] = task
+            task.add_done_callback(lambda _: self._inflight.pop(user_id, None))
+        try:
+            allowed = await asyncio.shield(task)
+        except Exception as e:
+            if entry is not None and now - entry[1] <= (self.ttl if entry[0] else self.deny_ttl):
+                # Supabase unhealthy (or circuit open): an answer expired for less
+                # than one more TTL beats a denial; an older one is not trusted
+                logger.warning("Editor check failed, using expired entry for %s: %s", user_id, e)
+                return entry[0]
+            logger.error("RLS check failed for editor rights: %s", e)
+            return False
+        self._store(user_id, allowed)
+        return allowed
+
+    def _store(self, user_id: int, allowed: bool) -> None:
+        ttl = self.ttl if allowed else self.deny_ttl
+        self._entries[user_id] = (allowed, time.monotonic() + ttl)
+        self._synced.discard(user_id)
+
+    def _age(self, entry: tuple[bool, float]) -> float:
+        allowed, expires_at = entry
+        return time.monotonic() - (expires_at - (self.ttl if allowed else self.deny_ttl))
+
+    def editor_ids(self) -> list[int]:
+        """Every ID currently known to be an editor (expired grants included)."""
+        return [k for k, (allowed, _) in self._entries.items() if allowed]
+
+    def subscribe(self, fn) -> None:
+        """Call `fn()` after grants, revocations and full reloads of the editor list."""
+        self._listeners.append(fn)
+
+    def _publish(self) -> None:
+        for fn in self._listeners:
+            try:
+                fn()
+            except Exception as e:
+                logger.error("Editor cache subscriber %r failed: %s", fn, e, exc_info=True)
+
+    # ─── Invalidation ───────────────────────────────────────────────────────────
+    def grant(self, user_id: int) -> None:
+        self._store(user_id, True)
+        self._publish()
+
+    def revoke(self, user_id: int) -> None:
+        self._store(user_id, False)
+        self._publish()
+
+    def invalidate(self, user_id: int | None = None) -> None:
+        if user_id is None:
+            self._entries.clear()
+            self._synced.clear()
+            self._complete_until = 0.0
+        else:
+            self._entries.pop(user_id, None)
+            self._synced.discard(user_id)
+
+    async def warm(self) -> None:
+        """Load the whole editor list so the first checks after startup are local."""
+        try:
+            rows = await db.fetch_editors("discord_id")
+        except Exception as e:
+            logger.warning("Could not warm editor cache: %s", e)
+            return
+        self._entries = {k: v for k, v in self._entries.items() if not v[0]}
+        for r in rows:
+            self._store(int(r["discord_id"]), True)
+        # A full list only proves absence as long as a denial would be trusted
+        self._complete_until = time.monotonic() + self.deny_ttl
+        logger.info("Editor cache warmed with %d editors", len(rows))
+        self._publish()
+
+    def seed(self, user_ids) -> None:
+        """
+        Editors from the warm-start file. They are trusted as the complete
+        list only for EDITOR_DENY_TTL, by which time warm() has replaced them.
+        """
+        for user_id in user_ids:
+            self._store(user_id, True)
+        self._complete_until = time.monotonic() + self.deny_ttl
+
+    def sync(self, user_ids) -> None:
+        """
+        Adopt the complete editor list another process published (shard
+        workers, from the supervisor's file). Grants that came from an earlier
+        list and are missing now are dropped; what this process learned
+        itself within EDITOR_DENY_TTL (lookups, grants, revocations) wins,
+        since the list may be older than that.
+        """
+        listed = set(user_ids)
+        for user_id in self._synced - listed:
+            self._entries.pop(user_id, None)
+        synced = set()
+        for user_id in listed:
+            entry = self._entries.get(user_id)
+            if entry is not None and user_id not in self._synced and self._age(entry) < self.deny_ttl:
+                continue
+            self._store(user_id, True)
+            synced.add(user_id)
+        self._synced = synced
+        self._complete_until = time.monotonic() + self.deny_ttl
+
+
+editor_cache = PermissionCache()
+
+
+async def is_editor(user_id: int) -> bool:
+    """Return True if user is in stats_editors_rights table."""
+    return await editor_cache.is_editor(user_id)
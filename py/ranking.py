@@ -0,0 +1,171 @@
+# py/ranking.py
+"""
+Order-statistics index for /rank.
+
+Every value column is kept as a sorted multiset, split into buckets of about
+BUCKET_SIZE packed floats (the layout of sortedcontainers' SortedList). A
+write moves one value: bisect over the bucket maxima, then insert/delete
+inside one bucket. Rank = number of strictly greater values + 1, where the
+values in later buckets come from a Fenwick tree over the bucket sizes. The
+index follows stats_cache through its subscriber hook and only rebuilds from
+scratch after a full reload or when it lost track of a version.
+"""
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+
+from py.snapshot import StatsSnapshot, stats_cache, VALUE_COLUMNS
+
+# Optional: vectorized sort for the initial build
+try:
+    import numpy as np
+    _has_numpy = True
+except ImportError:
+    _has_numpy = False
+
+BUCKET_SIZE = 1000
+
+
+# ─── Sorted multiset ────────────────────────────────────────────────────────────
+class SortedValues:
+    def __init__(self, ordered: array | None = None):
+        ordered = ordered if ordered is not None else array("d")
+        self._buckets = [ordered[i:i + BUCKET_SIZE] for i in range(0, len(ordered), BUCKET_SIZE)]
+        self._maxes = [b[-1] for b in self._buckets]
+        self._len = len(ordered)
+        self._reindex()
+
+    def __len__(self) -> int:
+        return self._len
+
+    # ─── Bucket sizes (Fenwick tree) ────────────────────────────────────────────
+    def _reindex(self) -> None:
+        """Rebuild the size tree after buckets were split or dropped, O(buckets)."""
+        tree = [0] + [len(b) for b in self._buckets]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._sizes = tree
+
+    def _resize(self, k: int, delta: int) -> None:
+        i = k + 1
+        while i < len(self._sizes):
+            self._sizes[i] += delta
+            i += i & -i
+
+    def _before(self, k: int) -> int:
+        """Number of values in buckets[:k]."""
+        total = 0
+        while k > 0:
+            total += self._sizes[k]
+            k -= k & -k
+        return total
+
+    # ─── Multiset ───────────────────────────────────────────────────────────────
+    def add(self, value: float) -> None:
+        if not self._buckets:
+            self._buckets.append(array("d", [value]))
+            self._maxes.append(value)
+            self._len = 1
+            self._reindex()
+            return
+        k = min(bisect_left(self._maxes, value), len(self._buckets) - 1)
+        bucket = self._buckets[k]
+        bucket.insert(bisect_right(bucket, value), value)
+        self._maxes[k] = bucket[-1]
+        self._len += 1
+        if len(bucket) > 2 * BUCKET_SIZE:
+            self._buckets[k:k + 1] = [bucket[:BUCKET_SIZE], bucket[BUCKET_SIZE:]]
+            self._maxes[k:k + 1] = [bucket[BUCKET_SIZE - 1], bucket[-1]]
+            self._reindex()
+        else:
+            self._resize(k, 1)
+
+    def remove(self, value: float) -> bool:
+        k = bisect_left(self._maxes, value)
+        if k == len(self._buckets):
+            return False
+        bucket = self._buckets[k]
+        j = bisect_left(bucket, value)
+        if j == len(bucket) or bucket[j] != value:
+            return False
+        del bucket[j]
+        self._len -= 1
+        if bucket:
+            self._maxes[k] = bucket[-1]
+            self._resize(k, -1)
+        else:
+            del self._buckets[k], self._maxes[k]
+            self._reindex()
+        return True
+
+    def count_greater(self, value: float) -> int:
+        """Values strictly greater than `value`, O(log n)."""
+        k = bisect_right(self._maxes, value)
+        if k == len(self._buckets):
+            return 0
+        bucket = self._buckets[k]
+        inside = len(bucket) - bisect_right(bucket, value)
+        return inside + self._len - self._before(k + 1)
+
+
+def _sorted_present(col: array) -> array:
+    """Non-NULL values of a snapshot column, ascending."""
+    if _has_numpy:
+        values = np.frombuffer(col, dtype=np.float64)
+        return array("d", np.sort(values[~np.isnan(values)]).tobytes())
+    return array("d", sorted(v for v in col if v == v))
+
+
+# ─── Rank index ─────────────────────────────────────────────────────────────────
+class RankIndex:
+    def __init__(self):
+        self.columns: dict[str, SortedValues] = {}
+        self.version: int | None = None   # snapshot version the index matches
+        self.rebuilds = self.patches = 0
+
+    def rebuild(self, snapshot: StatsSnapshot) -> None:
+        self.columns = {c: SortedValues(_sorted_present(snapshot.columns[c])) for c in VALUE_COLUMNS}
+        self.version = snapshot.version
+        self.rebuilds += 1
+
+    def on_change(self, old: StatsSnapshot | None, new: StatsSnapshot, op: str, arg) -> None:
+        """stats_cache subscriber: move the changed values, or give up and rebuild lazily."""
+        if op == "load" or old is None or self.version != old.version:
+            self.version = None
+            return
+        upsert = op == "upsert"
+        names = {str(r.get("name") or "") for r in arg} if upsert else set(arg)
+        for name in names:
+            # Deleted names are gone from `new`: no lookup needed there
+            i, j = old.index_of(name), new.index_of(name) if upsert else None
+            for c, values in self.columns.items():
+                before = old.columns[c][i] if i is not None else math.nan
+                after = new.columns[c][j] if j is not None else math.nan
+                if before == after:
+                    continue
+                if before == before:
+                    values.remove(before)
+                if after == after:
+                    values.add(after)
+        self.version = new.version
+        self.patches += 1
+
+    def rank(self, snapshot: StatsSnapshot, name: str) -> dict[str, tuple[int, int]] | None:
+        """{column: (rank, ranked members)}, rank 1 = highest; None if the name is unknown."""
+        i = snapshot.index_of(name)
+        if i is None:
+            return None
+        if self.version != snapshot.version:
+            self.rebuild(snapshot)
+        out = {}
+        for c, values in self.columns.items():
+            v = snapshot.columns[c][i]
+            if v == v:
+                out[c] = (values.count_greater(v) + 1, len(values))
+        return out
+
+
+rank_index = RankIndex()
+stats_cache.subscribe(rank_index.on_change)
@@ -0,0 +1,148 @@
+# py/render.py
+import os
+from collections import OrderedDict
+
+from py.helpers import format_number
+from py.snapshot import StatsSnapshot, VALUE_COLUMNS
+
+
+# ─── Config ─────────────────────────────────────────────────────────────────────
+PAGE_CACHE_SIZE = int(os.getenv("PAGE_CACHE_SIZE", 256))
+TABLE_LAYOUT    = os.getenv("TABLE_LAYOUT", "compact")     # "compact" | "spaced" (empty line between rows)
+NAME_MAX_WIDTH  = int(os.getenv("NAME_MAX_WIDTH", 24))     # longer names are cut with "…"
+MESSAGE_LIMIT   = 2000                                      # Discord's limit for message content
+
+LAYOUTS = ("compact", "spaced")
+LABELS = {"name": "Name", "sing": "Sing[k]", "dance": "Dance[k]", "rally": "Rally[Mio]"}
+FENCE_OPEN, FENCE_CLOSE = "```css\n", "\n```"
+
+
+# ─── Page layout ────────────────────────────────────────────────────────────────
+class PageLayout:
+    """
+    Column widths and the resulting page size. Every row line is padded to
+    the same width (then right-stripped), so `per_page` rows always fit in
+    MESSAGE_LIMIT and page N always starts at row (N-1) * per_page.
+    """
+    __slots__ = ("widths", "spaced", "header", "sep", "per_page")
+
+    def __init__(self, widths: dict[str, int], spaced: bool = False):
+        self.widths = {
+            c: max(len(LABELS[c]), min(widths.get(c, 0), NAME_MAX_WIDTH) if c == "name" else widths.get(c, 0))
+            for c in LABELS
+        }
+        self.spaced = spaced
+        full = sum(self.widths.values()) + 3 * (len(self.widths) - 1)   # widest possible line
+        self.header = self._join(LABELS.values())
+        self.sep = "-" * full
+        overhead = len(FENCE_OPEN) + len(self.header) + 1 + len(self.sep) + len(FENCE_CLOSE)
+        row_cost = full + 1 + (1 if spaced else 0)   # line + "\n" (+ empty spacer line)
+        self.per_page = max(1, (MESSAGE_LIMIT - overhead) // row_cost)
+
+    @classmethod
+    def for_snapshot(cls, snapshot: StatsSnapshot, layout: str = TABLE_LAYOUT) -> "PageLayout":
+        return cls(snapshot.widths(), layout == "spaced")
+
+    @classmethod
+    def for_rows(cls, rows: list[dict], layout: str = TABLE_LAYOUT) -> "PageLayout":
+        widths = {"name": max((len(str(r.get("name") or "")) for r in rows), default=0)}
+        for c in VALUE_COLUMNS:
+            widths[c] = max((len(format_number(r.get(c))) for r in rows), default=0)
+        return cls(widths, layout == "spaced")
+
+    def _join(self, cells) -> str:
+        return " | ".join(f"{cell:<{w}}" for cell, w in zip(cells, self.widths.values())).rstrip()
+
+    def line(self, row: dict) -> str:
+        name = str(row.get("name") or "")
+        limit = self.widths["name"]
+        if len(name) > limit:
+            name = name[:limit - 1] + "…"
+        return self._join([name] + [format_number(row.get(c)) for c in VALUE_COLUMNS])
+
+    def block(self, rows: list[dict]) -> str:
+        lines = [self.header, self.sep]
+        for r in rows:
+            lines.append(self.line(r))
+            if self.spaced:
+                lines.append("")
+        text = "\n".join(lines)
+        return f"{FENCE_OPEN}{text}{FENCE_CLOSE}"
+
+
+# ─── Page rendering ─────────────────────────────────────────────────────────────
+def build_block(rows: list[dict], layout: str = TABLE_LAYOUT) -> str:
+    """Block for rows that don't come from a snapshot (keyset pages); widths fit these rows."""
+    return PageLayout.for_rows(rows, layout).block(rows)
+
+
+class PageCache:
+    """
+    Bounded LRU of rendered code blocks keyed by
+    (snapshot version, layout, sort column, direction, page), plus the page
+    layout of the current snapshot.
+
+    Only the newest snapshot version is kept: the first lookup for a newer
+    version drops every page of the older one.
+    """
+    def __init__(self, maxsize: int = PAGE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._pages: OrderedDict[tuple, str] = OrderedDict()
+        self._layouts: dict[str, PageLayout] = {}
+        self._version = 0
+        self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def _sync(self, snapshot: StatsSnapshot) -> None:
+        if snapshot.version > self._version:
+            self._pages.clear()
+            self._layouts.clear()
+            self._version = snapshot.version
+
+    def layout(self, snapshot: StatsSnapshot, layout: str = TABLE_LAYOUT) -> PageLayout:
+        self._sync(snapshot)
+        if snapshot.version != self._version:
+            return PageLayout.for_snapshot(snapshot, layout)
+        cached = self._layouts.get(layout)
+        if cached is None:
+            cached = self._layouts[layout] = PageLayout.for_snapshot(snapshot, layout)
+        return cached
+
+    def render(self, snapshot: StatsSnapshot, sort_by: str | None, sort_desc: bool, page: int,
+               layout: str = TABLE_LAYOUT) -> str | None:
+        """Rendered block for one page, or None when the page is out of range."""
+        self._sync(snapshot)
+        key = (snapshot.version, layout, sort_by or "", bool(sort_desc), page)
+        block = self._pages.get(key)
+        if block is not None:
+            self.hits += 1
+            self._pages.move_to_end(key)
+            return block
+
+        self.misses += 1
+        page_layout = self.layout(snapshot, layout)
+        rows = snapshot.page_rows(sort_by, sort_desc, page, page_layout.per_page)
+        if not rows:
+            return None
+        block = page_layout.block(rows)
+        # Pages of an older snapshot (a view still holding one) are not cached
+        if snapshot.version == self._version:
+            self._pages[key] = block
+            if len(self._pages) > self.maxsize:
+                self._pages.popitem(last=False)
+        return block
+
+
+page_cache = PageCache()
+
+
+def render_page(snapshot: StatsSnapshot, sort_by: str | None, sort_desc: bool, page: int,
+                layout: str = TABLE_LAYOUT) -> str | None:
+    return page_cache.render(snapshot, sort_by, sort_desc, page, layout)
+
+
+def page_count(snapshot: StatsSnapshot, layout: str = TABLE_LAYOUT) -> int:
+    return snapshot.page_count(page_cache.layout(snapshot, layout).per_page)
+
@@ -0,0 +1,158 @@
+# py/resilience.py
+"""
+Building blocks db.execute wraps around every Supabase call, for both the
+anon and the admin client (they talk to the same PostgREST endpoint):
+
+- CircuitBreaker: after BREAKER_FAILURES transient failures in a row, calls
+  fail fast with CircuitOpenError for BREAKER_COOLDOWN seconds; then one
+  probe decides between closing and opening again.
+- LatencyWindow: recent round trips per (table, op); its p95 is the delay
+  after which a read is hedged with a duplicate request.
+- HedgeBudget: caps those duplicates at DB_HEDGE_BUDGET of all reads, so a
+  slow Supabase is not handed extra load exactly when it is struggling.
+- is_transient / backoff: which errors are worth a retry, and full-jitter
+  sleeps between retries.
+"""
+import os, time, random, asyncio
+from collections import deque
+
+import httpx
+from postgrest.exceptions import APIError
+
+
+# ─── Config ─────────────────────────────────────────────────────────────────────
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", 5))      # consecutive transient failures that open it
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", 15))   # seconds open before a probe is let through
+BACKOFF_BASE     = float(os.getenv("DB_BACKOFF_BASE", 0.1))   # first retry waits up to this long
+BACKOFF_MAX      = float(os.getenv("DB_BACKOFF_MAX", 1.0))
+HEDGE_MIN        = float(os.getenv("DB_HEDGE_MIN", 0.05))     # never hedge earlier than this
+HEDGE_BUDGET     = float(os.getenv("DB_HEDGE_BUDGET", 0.05))  # hedges per read, at most
+HEDGE_BURST      = 10                                         # hedges the budget can save up
+LATENCY_SAMPLES  = 200
+LATENCY_MIN      = 20                                         # samples before p95 is trusted
+
+# PostgreSQL error classes that describe the server, not the query
+_TRANSIENT_PG = ("08", "53", "57")
+_TRANSIENT_PGRST = ("PGRST000", "PGRST001", "PGRST002", "PGRST003")
+
+
+class CircuitOpenError(Exception):
+    """Supabase is considered down; the call was not attempted."""
+
+
+# ─── Error classification ───────────────────────────────────────────────────────
+def is_transient(exc: BaseException) -> bool:
+    """Timeouts, connection problems, 5xx/429 and server-side PG errors."""
+    if isinstance(exc, (asyncio.TimeoutError, OSError, httpx.TransportError)):
+        return True
+    if isinstance(exc, APIError):
+        code = str(exc.code or "")
+        if code.isdigit() and len(code) == 3:   # HTTP status of a non-JSON answer
+            return code.startswith("5") or code == "429"
+        return code[:2] in _TRANSIENT_PG or code in _TRANSIENT_PGRST
+    return False
+
+
+def backoff(attempt: int) -> float:
+    """Full-jitter delay before retry number `attempt` (1-based)."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1)))
+
+
+# ─── Circuit breaker ────────────────────────────────────────────────────────────
+class CircuitBreaker:
+    CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+    def __init__(self, failures: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN):
+        self.failures = failures
+        self.cooldown = cooldown
+        self._streak = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.state = self.CLOSED
+        self.rejected = self.opened = 0
+
+    def before(self) -> None:
+        """Raise CircuitOpenError unless a call may go out now."""
+        if self.state == self.CLOSED:
+            return
+        if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return
+        self.rejected += 1
+        raise CircuitOpenError("Supabase circuit open")
+
+    def release(self) -> None:
+        """The call let through by before() was cancelled without an outcome."""
+        self._probing = False
+
+    def success(self) -> None:
+        self._streak = 0
+        self._probing = False
+        self.state = self.CLOSED
+
+    def failure(self, exc: BaseException) -> None:
+        if not is_transient(exc):
+            # The server answered; a bad query says nothing about its health
+            self._probing = False
+            if self.state == self.HALF_OPEN:
+                self.state = self.CLOSED
+            return
+        self._streak += 1
+        if self.state == self.HALF_OPEN or self._streak >= self.failures:
+            if self.state != self.OPEN:
+                self.opened += 1
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._probing = False
+
+
+# ─── Latency window ─────────────────────────────────────────────────────────────
+class LatencyWindow:
+    """
+    Last LATENCY_SAMPLES round trips per key; p95 for hedging. Callers
+    observe every request that reached the server, including the ones
+    nobody waited for any more (hedge losers, timeouts): leaving those out
+    would drop exactly the slow tail and pull the p95 down.
+    """
+    def __init__(self, size: int = LATENCY_SAMPLES):
+        self.size = size
+        self._samples: dict[tuple, deque] = {}
+
+    def observe(self, key: tuple, seconds: float) -> None:
+        window = self._samples.get(key)
+        if window is None:
+            window = self._samples[key] = deque(maxlen=self.size)
+        window.append(seconds)
+
+    def p95(self, key: tuple) -> float | None:
+        window = self._samples.get(key)
+        if window is None or len(window) < LATENCY_MIN:
+            return None
+        ordered = sorted(window)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def hedge_delay(self, key: tuple) -> float | None:
+        p95 = self.p95(key)
+        return None if p95 is None else max(HEDGE_MIN, p95)
+
+
+# ─── Hedge budget ───────────────────────────────────────────────────────────────
+class HedgeBudget:
+    """Token bucket: every read earns `ratio` of a hedge, a hedge spends one."""
+    def __init__(self, ratio: float = HEDGE_BUDGET, burst: float = HEDGE_BURST):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = 0.0
+        self.denied = 0
+
+    def read(self) -> None:
+        self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def take(self) -> bool:
+        if self._tokens < 1:
+            self.denied += 1
+            return False
+        self._tokens -= 1
+        return True
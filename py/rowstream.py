@@ -0,0 +1,88 @@
+# py/rowstream.py
+import csv, json
+from typing import Iterator, TextIO
+
+
+CHUNK_SIZE = 64 * 1024
+_decoder = json.JSONDecoder()
+
+
+# ─── JSON array / JSON Lines ────────────────────────────────────────────────────
+def iter_json_rows(fp: TextIO, chunk_size: int = CHUNK_SIZE) -> Iterator[dict]:
+    """
+    Yield objects from a JSON array or a JSON Lines stream without loading
+    the whole document. The format is picked from the first non-blank char.
+    """
+    buf = fp.read(chunk_size)
+    stripped = buf.lstrip()
+    while not stripped and buf:
+        buf = fp.read(chunk_size)
+        stripped = buf.lstrip()
+    if stripped.startswith("["):
+        yield from _iter_array(fp, stripped[1:], chunk_size)
+    else:
+        yield from _iter_lines(fp, buf)
+
+
+def _iter_lines(fp: TextIO, head: str) -> Iterator[dict]:
+    lines = head.split("\n")
+    tail = lines.pop() + fp.readline()    # finish the line cut by the first read
+    for line in lines + [tail]:
+        if line.strip():
+            yield json.loads(line)
+    for line in fp:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _iter_array(fp: TextIO, buf: str, chunk_size: int) -> Iterator[dict]:
+    pos = 0
+    eof = False
+    while True:
+        # skip whitespace and separators between elements
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buf) and buf[pos] == "]":
+            return
+        if pos >= len(buf):
+            if eof:
+                raise ValueError("Unterminated JSON array")
+            more = fp.read(chunk_size)
+            eof = not more
+            buf, pos = buf[pos:] + more, 0
+            continue
+        try:
+            obj, end = _decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            # element straddles the chunk boundary: read more and retry
+            if eof:
+                raise
+            more = fp.read(chunk_size)
+            eof = not more
+            buf, pos = buf[pos:] + more, 0
+            continue
+        # a number at the very end of the buffer may be cut short
+        if end == len(buf) and not eof and not isinstance(obj, (dict, list, str)):
+            more = fp.read(chunk_size)
+            eof = not more
+            buf, pos = buf[pos:] + more, 0
+            continue
+        yield obj
+        pos = end
+
+
+# ─── CSV ────────────────────────────────────────────────────────────────────────
+def iter_csv_rows(fp: TextIO) -> Iterator[dict]:
+    """Yield CSV records with lower-cased, stripped header names and stripped values."""
+    for record in csv.DictReader(fp):
+        yield {
+            (k or "").strip().lower(): v.strip() if isinstance(v, str) else v
+            for k, v in record.items()
+        }
+
+
+def iter_rows(fp: TextIO, filename: str = "") -> Iterator[dict]:
+    """CSV for *.csv files, JSON array / JSON Lines otherwise."""
+    if filename.lower().endswith(".csv"):
+        return iter_csv_rows(fp)
+    return iter_json_rows(fp)
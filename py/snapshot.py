@@ -0,0 +1,542 @@
+# py/snapshot.py
+import os, math, time, asyncio, operator, itertools
+from array import array
+from bisect import bisect_left
+from itertools import accumulate, islice
+from datetime import datetime, timedelta
+
+from py import db
+from py.helpers import format_number
+from py.log_config import logger
+
+# Optional: vectorized argsort for the numeric columns
+try:
+    import numpy as np
+    _has_numpy = True
+except ImportError:
+    _has_numpy = False
+
+
+# ─── Config ─────────────────────────────────────────────────────────────────────
+STATS_TTL       = float(os.getenv("STATS_TTL", 60))        # seconds a snapshot counts as fresh
+STATS_MAX_STALE = float(os.getenv("STATS_MAX_STALE", 900))  # serve stale (and revalidate) up to this age
+
+# "full" reloads the whole table on every refresh; "delta" only pulls rows whose
+# cursor column moved (needs an `updated_at timestamptz` kept current by a trigger)
+STATS_SYNC          = os.getenv("STATS_SYNC", "full")
+STATS_CURSOR_COLUMN = os.getenv("STATS_CURSOR_COLUMN", "updated_at")
+STATS_CURSOR_OVERLAP = float(os.getenv("STATS_CURSOR_OVERLAP", 5))    # seconds re-read for late commits
+STATS_FULL_RESYNC   = float(os.getenv("STATS_FULL_RESYNC", 3600))     # full reload every N seconds anyway
+
+VALUE_COLUMNS   = ("sing", "dance", "rally")
+NAME_FOLDED     = "name_folded"   # order() key for the case-insensitive name index
+ORDER_PATCH_MAX = 512             # changed rows a cached value order is patched for; more re-sort it
+
+_versions = itertools.count(1)
+
+
+# ─── Snapshot ───────────────────────────────────────────────────────────────────
+class StatsSnapshot:
+    """
+    Immutable, column-oriented view of the stats table. Every new snapshot,
+    whether fetched or patched after a write, gets the next version number so
+    anything derived from it can be keyed by `version`.
+
+    Layout (about 45 bytes per row instead of ~400 for a list of dicts):
+    - names: one UTF-8 blob plus an offsets array, decoded on access
+    - sing/dance/rally: packed float64 arrays, NaN for NULL
+    - sort orders: int32 permutations, built on first use; the ascending name
+      order doubles as the name index (bisect), so there is no dict per row
+    - cell widths for the renderer, computed once and then carried forward
+      through patches
+    Columns other than VALUE_COLUMNS are not kept.
+    """
+    __slots__ = ("version", "_blob", "_offsets", "columns", "_orders", "_widths")
+
+    def __init__(self, rows: list[dict]):
+        encoded = [str(r.get("name") or "").encode() for r in rows]
+        self._build(
+            b"".join(encoded),
+            array("I", accumulate(map(len, encoded), initial=0)),
+            {c: _column([r.get(c) for r in rows]) for c in VALUE_COLUMNS}
+        )
+
+    def _build(self, blob: bytes, offsets: array, columns: dict[str, array],
+               orders: dict | None = None, widths: dict | None = None) -> None:
+        self.version = next(_versions)
+        self._blob = blob
+        self._offsets = offsets
+        self.columns = columns
+        self._orders: dict[tuple[str, bool], array] = orders or {}
+        self._widths = widths
+
+    @classmethod
+    def _derive(cls, blob, offsets, columns, orders=None, widths=None) -> "StatsSnapshot":
+        snap = cls.__new__(cls)
+        snap._build(blob, offsets, columns, orders, widths)
+        return snap
+
+    @classmethod
+    def from_buffers(cls, blob: bytes, offsets: array, columns: dict[str, array]) -> "StatsSnapshot":
+        """Snapshot from the raw column buffers (see buffers()), e.g. read back from disk."""
+        return cls._derive(blob, offsets, columns)
+
+    def buffers(self) -> tuple[bytes, array, dict[str, array]]:
+        """Name blob, name offsets and value columns; treat them as read-only."""
+        return self._blob, self._offsets, self.columns
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    # ─── Row access ─────────────────────────────────────────────────────────────
+    def name(self, i: int) -> str:
+        return self._blob[self._offsets[i]:self._offsets[i + 1]].decode()
+
+    def names(self) -> list[str]:
+        """Every name in table order (decodes the whole column)."""
+        blob, off = self._blob, self._offsets
+        return [blob[a:b].decode() for a, b in zip(off, islice(off, 1, None))]
+
+    def row(self, i: int) -> dict:
+        out = {"name": self.name(i)}
+        for c, col in self.columns.items():
+            out[c] = _from_float(col[i])
+        return out
+
+    def index_of(self, name: str) -> int | None:
+        perm = self.order("name")
+        k = bisect_left(perm, name, key=self.name)
+        if k < len(perm) and self.name(perm[k]) == name:
+            return perm[k]
+        return None
+
+    def get(self, name: str) -> dict | None:
+        i = self.index_of(name)
+        return None if i is None else self.row(i)
+
+    def widths(self) -> dict[str, int]:
+        """
+        Upper bound of every column's cell width (format_number for values,
+        UTF-8 length for names). Patches widen it, they never shrink it.
+        """
+        if self._widths is None:
+            off = self._offsets
+            widths = {"name": max(map(operator.sub, islice(off, 1, None), off), default=0)}
+            for c, col in self.columns.items():
+                widths[c] = _number_width(col)
+            self._widths = widths
+        return self._widths
+
+    # ─── Sorting & pagination ───────────────────────────────────────────────────
+    def order(self, column: str | None, descending: bool = False) -> array | None:
+        """
+        Row positions sorted by `column` (missing values lowest, ties in table
+        order), computed once per (column, direction) and shared by every
+        reader of this snapshot. None means table order. NAME_FOLDED sorts
+        by case-folded name (the search index in py/names.py).
+        """
+        if not column:
+            return None
+        perm = self._orders.get((column, descending))
+        if perm is None:
+            perm = self._orders[(column, descending)] = self._argsort(column, descending)
+        return perm
+
+    def folded_name(self, i: int) -> str:
+        return self.name(i).casefold()
+
+    def _argsort(self, column: str, descending: bool) -> array:
+        n = len(self)
+        if column == "name":
+            return array("i", sorted(range(n), key=self.names().__getitem__, reverse=descending))
+        if column == NAME_FOLDED:
+            folded = [n.casefold() for n in self.names()]
+            return array("i", sorted(range(n), key=folded.__getitem__, reverse=descending))
+        col = self.columns[column]
+        if _has_numpy:
+            keys = np.frombuffer(col, dtype=np.float64)
+            keys = np.where(np.isnan(keys), -np.inf, keys)
+            perm = np.argsort(-keys if descending else keys, kind="stable").astype(np.int32)
+            return array("i", perm.tobytes())
+        keys = col.tolist()
+        if any(map(math.isnan, col)):
+            keys = [-math.inf if v != v else v for v in keys]
+        return array("i", sorted(range(n), key=keys.__getitem__, reverse=descending))
+
+    def page_indices(self, column: str | None, descending: bool, page: int, per_page: int):
+        start = (page - 1) * per_page
+        if start < 0:
+            return range(0)
+        perm = self.order(column, descending)
+        if perm is None:
+            return range(start, min(start + per_page, len(self)))
+        return perm[start:start + per_page]
+
+    def page_rows(self, column: str | None, descending: bool, page: int, per_page: int) -> list[dict]:
+        return [self.row(i) for i in self.page_indices(column, descending, page, per_page)]
+
+    def page_count(self, per_page: int) -> int:
+        return max(1, (len(self) - 1) // per_page + 1)
+
+    # ─── Patching ───────────────────────────────────────────────────────────────
+    def with_upserts(self, changed: list[dict]) -> "StatsSnapshot":
+        """
+        New snapshot with `changed` rows merged in by name (unknown names are
+        appended). Cached sort orders are carried over with the changed rows
+        moved, up to ORDER_PATCH_MAX of them per column.
+        """
+        columns = {c: array("d", col) for c, col in self.columns.items()}
+        offsets = self._offsets
+        added: dict[str, int] = {}
+        updated: set[int] = set()
+        for row in changed:
+            name = str(row.get("name") or "")
+            i = self.index_of(name)
+            if i is None:
+                i = added.get(name)
+            if i is None:
+                if not added:
+                    offsets = array("I", offsets)
+                i = added[name] = len(offsets) - 1
+                offsets.append(offsets[-1] + len(name.encode()))
+                for c, col in columns.items():
+                    col.append(_to_float(row.get(c)))
+                continue
+            if i < len(self):
+                updated.add(i)
+            for c, col in columns.items():
+                if c in row:
+                    col[i] = _to_float(row[c])
+        # Value orders: move the rows whose value changed instead of re-sorting
+        orders = {}
+        for (column, descending), perm in self._orders.items():
+            if column in columns:
+                old, new = self.columns[column], columns[column]
+                moved = [i for i in updated if not _same(old[i], new[i])]
+                if len(moved) + len(added) <= ORDER_PATCH_MAX:
+                    orders[(column, descending)] = _patch_order(
+                        perm, moved, added.values(), old, new, descending
+                    )
+        widths = None
+        if self._widths is not None:
+            widths = dict(self._widths)
+            for row in changed:
+                widths["name"] = max(widths["name"], len(str(row.get("name") or "").encode()))
+                for c in self.columns:
+                    if c in row:
+                        widths[c] = max(widths[c], len(format_number(_from_float(_to_float(row[c])))))
+        if not added:
+            # Value-only patch: names, offsets and name orders are shared
+            orders.update((k, v) for k, v in self._orders.items() if k[0] in ("name", NAME_FOLDED))
+            return StatsSnapshot._derive(self._blob, offsets, columns, orders, widths)
+
+        snap = StatsSnapshot._derive(self._blob + "".join(added).encode(), offsets, columns, orders, widths)
+        # Ascending name orders are patched in place of a re-sort
+        for column, key in (("name", snap.name), (NAME_FOLDED, snap.folded_name)):
+            if column == "name" or (column, False) in self._orders:
+                perm = array("i", self.order(column))
+                for i in added.values():
+                    perm.insert(bisect_left(perm, key(i), key=key), i)
+                snap._orders[(column, False)] = perm
+        return snap
+
+    def without(self, names) -> "StatsSnapshot":
+        """New snapshot without `names`; sort orders are carried over with those rows filtered out."""
+        drop = {i for i in map(self.index_of, names) if i is not None}
+        n = len(self)
+        keep = [i for i in range(n) if i not in drop]
+        blob, off = self._blob, self._offsets
+        encoded = [blob[off[i]:off[i + 1]] for i in keep]
+        orders = {}
+        if self._orders:
+            # old position -> new position, -1 for dropped rows
+            remap = array("i", [-1]) * n
+            for new, old in enumerate(keep):
+                remap[old] = new
+            for k, perm in self._orders.items():
+                orders[k] = _remap(perm, remap)
+        return StatsSnapshot._derive(
+            b"".join(encoded),
+            array("I", accumulate(map(len, encoded), initial=0)),
+            {c: array("d", [col[i] for i in keep]) for c, col in self.columns.items()},
+            orders,
+            widths=self._widths
+        )
+
+
+def _same(a: float, b: float) -> bool:
+    return a == b or (a != a and b != b)
+
+
+def _order_key(col: array, descending: bool):
+    """Sort key of order(): NULL lowest, ties in table order."""
+    if descending:
+        return lambda i: (math.inf if col[i] != col[i] else -col[i], i)
+    return lambda i: (-math.inf if col[i] != col[i] else col[i], i)
+
+
+def _patch_order(perm: array, moved: list[int], added, old: array, new: array, descending: bool) -> array:
+    """`perm` with the `moved` rows re-placed under their new values and `added` rows inserted."""
+    perm = array("i", perm)
+    old_key, new_key = _order_key(old, descending), _order_key(new, descending)
+    for i in moved:
+        del perm[bisect_left(perm, old_key(i), key=old_key)]
+    for i in itertools.chain(moved, added):
+        perm.insert(bisect_left(perm, new_key(i), key=new_key), i)
+    return perm
+
+
+def _remap(perm: array, remap: array) -> array:
+    """`perm` in new positions, without the rows `remap` marks as dropped (order is kept)."""
+    if _has_numpy:
+        moved = np.frombuffer(remap, dtype=np.int32)[np.frombuffer(perm, dtype=np.int32)]
+        return array("i", moved[moved >= 0].tobytes())
+    return array("i", [j for j in map(remap.__getitem__, perm) if j >= 0])
+
+
+def _column(values: list) -> array:
+    try:
+        return array("d", [math.nan if v is None else v for v in values])
+    except TypeError:   # strings or other oddities from the API
+        return array("d", [_to_float(v) for v in values])
+
+
+def _number_width(col: array) -> int:
+    """Widest format_number() cell in `col`, from its range instead of formatting every value."""
+    if _has_numpy:
+        values = np.frombuffer(col, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not values.size:
+            return 1
+        lo, hi = float(values.min()), float(values.max())
+        fraction = bool(np.any(values != np.floor(values)))
+    else:
+        values = [v for v in col if v == v]
+        if not values:
+            return 1
+        lo, hi = min(values), max(values)
+        fraction = not all(v.is_integer() for v in values)
+    whole = max(len(str(int(lo))) + (-1 < lo < 0), len(str(int(hi))))
+    return whole + (3 if fraction else 0)
+
+
+def _to_float(value) -> float:
+    if value is None or value == "":
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _from_float(value: float):
+    """Back to what PostgREST sent: None for NULL, int for whole numbers."""
+    if value != value:
+        return None
+    return int(value) if value.is_integer() else value
+
+
+# ─── Loaders ────────────────────────────────────────────────────────────────────
+# A loader takes the current snapshot (or None) and returns the next one.
+
+async def load_full(current: StatsSnapshot | None) -> StatsSnapshot:
+    return StatsSnapshot(await db.fetch_stats())
+
+
+class DeltaLoader:
+    """
+    Incremental sync keyed on a timestamp cursor.
+
+    Each refresh pulls only rows changed since the cursor (minus a small
+    overlap for transactions that committed late) and merges them into the
+    current snapshot. Deletions are detected by comparing the remote row
+    count with the local one; only on a mismatch is the name column fetched
+    to find the missing rows. If nothing changed the current snapshot (and
+    its version) is returned unchanged.
+    """
+    def __init__(
+        self,
+        column: str = STATS_CURSOR_COLUMN,
+        overlap: float = STATS_CURSOR_OVERLAP,
+        full_every: float = STATS_FULL_RESYNC
+    ):
+        self.column = column
+        self.overlap = timedelta(seconds=overlap)
+        self.full_every = full_every
+        self.cursor: datetime | None = None
+        self._last_full = 0.0
+        self.rows_fetched = 0
+
+    async def __call__(self, current: StatsSnapshot | None) -> StatsSnapshot:
+        now = time.monotonic()
+        if current is None or self.cursor is None or now - self._last_full > self.full_every:
+            rows = await db.fetch_stats()
+            self.rows_fetched += len(rows)
+            self._last_full = now
+            self._advance(rows)
+            return StatsSnapshot(rows)
+
+        since = (self.cursor - self.overlap).isoformat()
+        changed = await db.fetch_stats_since(since, self.column)
+        self.rows_fetched += len(changed)
+        self._advance(changed)
+        changed = [r for r in changed if not self._same(current.get(r.get("name")), r)]
+        snap = current.with_upserts(changed) if changed else current
+
+        if await db.count_stats() != len(snap):
+            live = set(await db.fetch_stats_names())
+            self.rows_fetched += len(live)
+            gone = [n for n in snap.names() if n not in live]
+            if gone:
+                snap = snap.without(gone)
+        return snap
+
+    @staticmethod
+    def _same(known: dict | None, row: dict) -> bool:
+        return known is not None and all(
+            known[c] == _from_float(_to_float(row.get(c))) for c in VALUE_COLUMNS
+        )
+
+    def _advance(self, rows: list[dict]) -> None:
+        for r in rows:
+            value = r.get(self.column)
+            if not value:
+                continue
+            ts = datetime.fromisoformat(value)
+            if self.cursor is None or ts > self.cursor:
+                self.cursor = ts
+
+
+# ─── Cache ──────────────────────────────────────────────────────────────────────
+class SnapshotCache:
+    """
+    Stale-while-revalidate cache around a single snapshot.
+
+    - fresh (age < ttl): returned as is
+    - stale (age < max_stale): returned immediately, one background refresh starts
+    - missing/expired: callers wait, but all of them share one in-flight fetch
+    Writes that land while a fetch is in flight are replayed on its result.
+    Subscribers are told about every swap of the current snapshot.
+    """
+    def __init__(self, loader, ttl: float = STATS_TTL, max_stale: float = STATS_MAX_STALE):
+        self._loader = loader
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._snapshot: StatsSnapshot | None = None
+        self._fetched_at = 0.0
+        self._inflight: asyncio.Task | None = None
+        self._journal: list | None = None
+        self._listeners: list = []
+        self.hits = self.stale_hits = self.misses = 0
+
+    @property
+    def current(self) -> StatsSnapshot | None:
+        return self._snapshot
+
+    async def get(self) -> StatsSnapshot:
+        snap = self._snapshot
+        age = time.monotonic() - self._fetched_at
+        if snap is not None and age < self.ttl:
+            self.hits += 1
+            return snap
+        if snap is not None and age < self.max_stale:
+            self.stale_hits += 1
+            self._revalidate()
+            return snap
+        self.misses += 1
+        try:
+            # shield: a cancelled waiter must not cancel the fetch the others share
+            return await asyncio.shield(self._revalidate())
+        except Exception:
+            if snap is None:
+                raise
+            logger.warning("Serving expired stats snapshot v%s after failed refresh", snap.version)
+            return snap
+
+    def _revalidate(self) -> asyncio.Task:
+        if self._inflight is None or self._inflight.done():
+            self._journal = []
+            self._inflight = asyncio.create_task(self._refresh())
+            self._inflight.add_done_callback(self._log_failure)
+        return self._inflight
+
+    async def _refresh(self) -> StatsSnapshot:
+        try:
+            previous = self._snapshot
+            snap = await self._loader(previous)
+            for op, arg in self._journal or ():
+                snap = snap.with_upserts(arg) if op == "upsert" else snap.without(arg)
+        finally:
+            self._journal = None
+        self._snapshot = snap
+        self._fetched_at = time.monotonic()
+        if snap is not previous:
+            logger.info("Stats snapshot v%s loaded (%d rows)", snap.version, len(snap))
+            self._publish(previous, snap, "load", None)
+        return snap
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Stats snapshot refresh failed: %s", task.exception())
+
+    # ─── Write-through ──────────────────────────────────────────────────────────
+    def apply_upsert(self, rows: list[dict]) -> None:
+        """Patch committed rows (as returned by Supabase) into the snapshot."""
+        if not rows:
+            return
+        if self._journal is not None:
+            self._journal.append(("upsert", rows))
+        old = self._snapshot
+        if old is not None:
+            self._snapshot = old.with_upserts(rows)
+            self._publish(old, self._snapshot, "upsert", rows)
+
+    def apply_delete(self, names) -> None:
+        names = list(names)
+        if not names:
+            return
+        if self._journal is not None:
+            self._journal.append(("delete", names))
+        old = self._snapshot
+        if old is not None:
+            self._snapshot = old.without(names)
+            self._publish(old, self._snapshot, "delete", names)
+
+    def use_loader(self, loader, ttl: float | None = None) -> None:
+        """Swap the loader (and TTL), e.g. for shard workers reading the supervisor's file."""
+        self._loader = loader
+        if ttl is not None:
+            self.ttl = ttl
+
+    def seed(self, snapshot: StatsSnapshot) -> None:
+        """
+        Install a snapshot from elsewhere (the warm-start file) as stale: the
+        first get() serves it at once and refreshes it in the background.
+        """
+        previous = self._snapshot
+        self._snapshot = snapshot
+        self._fetched_at = time.monotonic() - self.ttl
+        self._publish(previous, snapshot, "load", None)
+
+    def invalidate(self) -> None:
+        """Mark the snapshot stale; the next get() serves it once and refreshes."""
+        self._fetched_at = min(self._fetched_at, time.monotonic() - self.ttl)
+
+    # ─── Subscribers ────────────────────────────────────────────────────────────
+    def subscribe(self, fn) -> None:
+        """
+        Call `fn(old, new, op, arg)` after each swap: op "upsert" (arg = rows),
+        "delete" (arg = names) or "load" (arg = None; old may be None).
+        """
+        self._listeners.append(fn)
+
+    def _publish(self, old: StatsSnapshot | None, new: StatsSnapshot, op: str, arg) -> None:
+        for fn in self._listeners:
+            try:
+                fn(old, new, op, arg)
+            except Exception as exc:
+                logger.error("Snapshot subscriber %r failed: %s", fn, exc, exc_info=True)
+
+
+stats_cache = SnapshotCache(DeltaLoader() if STATS_SYNC == "delta" else load_full)
@@ -0,0 +1,231 @@
+# py/supervisor.py
+"""
+Sharded runtime. `SHARD_WORKERS=N python bot.py` starts this supervisor
+instead of a bot:
+
+- N worker processes run bot.py as AutoShardedBots, worker i owning shards
+  i, i+N, i+2N, … of SHARD_COUNT. Crashed workers are restarted with backoff.
+- The supervisor alone syncs stats (every STATS_TTL) and editors (every
+  EDITOR_DENY_TTL) with Supabase and publishes them to SHARED_SNAPSHOT_FILE
+  (the warm-start format, in /dev/shm where available). Workers map that
+  file read-only, so the value columns exist once in memory for all of
+  them, and re-check it every WORKER_POLL seconds. Workers take the editor
+  list from the file too and only ask Supabase about IDs it cannot answer.
+  A worker that starts before any file exists waits WORKER_FILE_WAIT
+  seconds for one, then loads the stats from Supabase itself until it appears.
+- Health and /metrics of all workers are served on the usual PORT; each
+  worker listens on 127.0.0.1 at WORKER_PORT_BASE + i.
+
+A write made by a worker is patched into that worker's snapshot at once (and
+kept there over newer files until they show it) and reaches the other
+workers with the supervisor's next refresh (STATS_TTL). Every process logs
+to its own file (see py/log_config.py).
+"""
+import os, sys, time, signal, asyncio
+
+from aiohttp import web, ClientSession, ClientTimeout
+
+from py import metrics
+from py.log_config import logger
+from py.permissions import editor_cache
+from py.snapshot import stats_cache
+from py.warm_start import warm_start, WarmStartFile, SharedSnapshotLoader
+
+
+# ─── Config ─────────────────────────────────────────────────────────────────────
+PORT                 = int(os.getenv("PORT", 5000))
+SHARD_WORKERS        = int(os.getenv("SHARD_WORKERS", 1))                 # > 1 enables the supervisor
+SHARD_COUNT          = int(os.getenv("SHARD_COUNT", 0)) or SHARD_WORKERS  # total gateway shards
+SHARD_WORKER         = os.getenv("SHARD_WORKER")                          # set for worker processes only
+SHARED_SNAPSHOT_FILE = os.getenv(
+    "SHARED_SNAPSHOT_FILE",
+    "/dev/shm/discord_stats.bin" if os.path.isdir("/dev/shm") else "data/shared_snapshot.bin"
+)
+WORKER_PORT_BASE     = int(os.getenv("WORKER_PORT_BASE", PORT + 1))
+WORKER_POLL          = float(os.getenv("WORKER_POLL", 1))     # seconds a worker trusts its mapped snapshot
+WORKER_FILE_WAIT     = float(os.getenv("WORKER_FILE_WAIT", 10))  # seconds a worker waits for the file at start
+RESTART_BACKOFF_MAX  = 60
+SCRAPE_TIMEOUT       = 2
+
+
+# ─── Worker side ────────────────────────────────────────────────────────────────
+def shard_ids(worker: int, workers: int = SHARD_WORKERS, shards: int = SHARD_COUNT) -> list[int]:
+    return list(range(worker, shards, workers))
+
+
+def attach_worker() -> SharedSnapshotLoader:
+    """Make stats_cache read the supervisor's shared file instead of Supabase."""
+    loader = SharedSnapshotLoader(SHARED_SNAPSHOT_FILE, wait=WORKER_FILE_WAIT)
+    stats_cache.use_loader(loader, ttl=WORKER_POLL)
+    stats_cache.subscribe(loader.on_change)
+    return loader
+
+
+# ─── Supervisor ─────────────────────────────────────────────────────────────────
+class Worker:
+    def __init__(self, index: int):
+        self.index = index
+        self.port = WORKER_PORT_BASE + index
+        self.proc: asyncio.subprocess.Process | None = None
+        self.restarts = 0
+
+    @property
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.returncode is None
+
+
+class Supervisor:
+    def __init__(self, script: str, workers: int = SHARD_WORKERS, shards: int = SHARD_COUNT):
+        self.script = os.path.abspath(script)
+        self.shards = max(shards, workers)
+        self.workers = [Worker(i) for i in range(workers)]
+        self.shared = WarmStartFile(SHARED_SNAPSHOT_FILE, debounce=0)
+        self._stopping = asyncio.Event()
+
+        metrics.registry.callback(
+            "shard_workers_alive", "Worker processes currently running",
+            lambda: sum(w.alive for w in self.workers)
+        )
+        metrics.registry.callback(
+            "shard_worker_restarts_total", "Worker processes restarted after exiting",
+            lambda: {str(w.index): w.restarts for w in self.workers},
+            labels=("worker",), kind="counter"
+        )
+        metrics.registry.callback(
+            "stats_snapshot_rows", "Rows in the cached stats snapshot",
+            lambda: len(stats_cache.current) if stats_cache.current is not None else None
+        )
+        metrics.registry.callback(
+            "shared_snapshot_writes_total", "Snapshots published to the workers",
+            lambda: self.shared.writes, kind="counter"
+        )
+
+    def _env(self, worker: Worker) -> dict:
+        env = dict(os.environ)
+        env.update(
+            SHARD_WORKER=str(worker.index),
+            SHARD_WORKERS=str(len(self.workers)),
+            SHARD_COUNT=str(self.shards),
+            SHARED_SNAPSHOT_FILE=SHARED_SNAPSHOT_FILE,
+            PORT=str(worker.port),
+            HEALTH_HOST="127.0.0.1",
+            WARM_START_FILE="",          # the supervisor keeps the warm-start file
+        )
+        return env
+
+    # ─── Lifecycle ──────────────────────────────────────────────────────────────
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self._stopping.set)
+
+        # 1) Data first, so workers start on a published snapshot
+        stats_cache.subscribe(self.shared.schedule)
+        editor_cache.subscribe(self.shared.schedule)
+        warm_start.restore()
+        await editor_cache.warm()
+        try:
+            await stats_cache.get()
+        except Exception as exc:
+            logger.warning("Could not load stats before starting workers: %s", exc)
+        await self.shared.flush()
+
+        # 2) Health/metrics, sync loop & workers
+        runner = await self._start_health()
+        tasks = [asyncio.create_task(self._sync_loop()), asyncio.create_task(self._editor_loop())]
+        tasks += [asyncio.create_task(self._keep_alive(w)) for w in self.workers]
+        logger.info("🧩 Supervisor running %d workers for %d shards", len(self.workers), self.shards)
+        try:
+            await self._stopping.wait()
+        finally:
+            # 3) Shutdown: stop workers, then persist the last state
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*(self._stop(w) for w in self.workers))
+            await runner.cleanup()
+            await warm_start.flush()
+
+    async def _sync_loop(self) -> None:
+        # get() on a stale snapshot returns at once and refreshes in the background;
+        # every change is published to the workers by the shared-file subscriber
+        while True:
+            await asyncio.sleep(stats_cache.ttl)
+            try:
+                await stats_cache.get()
+            except Exception as exc:
+                logger.warning("Stats refresh failed: %s", exc)
+
+    async def _editor_loop(self) -> None:
+        # A full reload is trusted as complete for EDITOR_DENY_TTL, so refresh at
+        # that pace; warm() logs its own failures and publishes only on success
+        while True:
+            await asyncio.sleep(editor_cache.deny_ttl)
+            await editor_cache.warm()
+
+    async def _keep_alive(self, worker: Worker) -> None:
+        backoff = 1
+        while not self._stopping.is_set():
+            started = time.monotonic()
+            worker.proc = await asyncio.create_subprocess_exec(
+                sys.executable, self.script, env=self._env(worker)
+            )
+            logger.info("Shard worker %d started (pid %d, shards %s)",
+                        worker.index, worker.proc.pid, shard_ids(worker.index, len(self.workers), self.shards))
+            code = await worker.proc.wait()
+            if self._stopping.is_set():
+                return
+            worker.restarts += 1
+            if time.monotonic() - started > RESTART_BACKOFF_MAX:
+                backoff = 1   # it ran for a while: not a crash loop
+            logger.warning("Shard worker %d exited with %s, restarting in %ds", worker.index, code, backoff)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, RESTART_BACKOFF_MAX)
+
+    async def _stop(self, worker: Worker) -> None:
+        if not worker.alive:
+            return
+        worker.proc.terminate()
+        try:
+            await asyncio.wait_for(worker.proc.wait(), 10)
+        except asyncio.TimeoutError:
+            logger.warning("Shard worker %d did not stop, killing it", worker.index)
+            worker.proc.kill()
+            await worker.proc.wait()
+
+    # ─── Health & metrics ───────────────────────────────────────────────────────
+    async def _start_health(self) -> web.AppRunner:
+        app = web.Application()
+        app.router.add_get("/", self.handle_health)
+        app.router.add_get("/metrics", self.handle_metrics)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, "0.0.0.0", PORT).start()
+        logger.info("🌐 Supervisor health server running")
+        return runner
+
+    async def handle_health(self, req):
+        lines = [f"worker {w.index}: {'up' if w.alive else 'down'} (restarts {w.restarts})" for w in self.workers]
+        ok = all(w.alive for w in self.workers)
+        return web.Response(text="\n".join(["OK" if ok else "DEGRADED"] + lines), status=200 if ok else 503)
+
+    async def handle_metrics(self, req):
+        async def scrape(session: ClientSession, worker: Worker) -> str | None:
+            try:
+                async with session.get(f"http://127.0.0.1:{worker.port}/metrics") as resp:
+                    return await resp.text()
+            except Exception:
+                return None
+
+        alive = [w for w in self.workers if w.alive]
+        async with ClientSession(timeout=ClientTimeout(total=SCRAPE_TIMEOUT)) as session:
+            texts = await asyncio.gather(*(scrape(session, w) for w in alive))
+        expositions = {"supervisor": metrics.registry.render()}
+        expositions.update((str(w.index), text) for w, text in zip(alive, texts) if text)
+        return web.Response(
+            text=metrics.merge(expositions),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+        )
+
+
+def run(script: str) -> None:
+    asyncio.run(Supervisor(script).run())
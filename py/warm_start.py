@@ -0,0 +1,308 @@
+# py/warm_start.py
+"""
+Warm-start file: the stats snapshot and the editor set in one binary file,
+written whenever either changes and read before the bot connects, so the
+first commands after a redeploy are served from memory while the caches
+refresh in the background.
+
+Layout (little-endian; every section is a plain array starting on an
+8-byte boundary, so a reader can use the file straight from an mmap):
+
+    header   magic b"STATSNAP", u32 format, u32 crc32(body), u64 len(body), f64 saved_at
+    body     u32 rows, u32 editors, u32 len(blob), u32 reserved
+             u32[rows + 1]  name offsets into blob (padded to 8 bytes)
+             f64[rows]      one array per VALUE_COLUMNS entry, NaN for NULL
+             u64[editors]   editor Discord IDs
+             bytes          UTF-8 name blob
+
+The sharded runtime (py/supervisor.py) publishes the same format to a
+shared-memory file that its workers map read-only (SharedSnapshotLoader).
+"""
+import os, sys, mmap, time, zlib, struct, asyncio
+from array import array
+
+from py.log_config import logger
+from py.permissions import editor_cache
+from py.snapshot import StatsSnapshot, stats_cache, load_full, VALUE_COLUMNS, STATS_TTL
+
+
+# ─── Config ─────────────────────────────────────────────────────────────────────
+WARM_START_FILE     = os.getenv("WARM_START_FILE", "data/warm_start.bin")   # "" disables it
+WARM_START_DEBOUNCE = float(os.getenv("WARM_START_DEBOUNCE", 2))           # seconds to batch changes
+LOCAL_PIN_TTL       = float(os.getenv("LOCAL_PIN_TTL", 3 * STATS_TTL))     # worker writes kept over the shared file
+
+MAGIC   = b"STATSNAP"
+FORMAT  = 2
+HEADER  = struct.Struct("<8sIIQd")
+COUNTS  = struct.Struct("<IIII")
+
+
+class WarmStartError(ValueError):
+    """The file is not a (current, intact) warm-start file."""
+
+
+# ─── Encoding ───────────────────────────────────────────────────────────────────
+def _le(typecode: str, values) -> bytes:
+    """Little-endian bytes of an array (or a memoryview cast to `typecode`)."""
+    if sys.byteorder != "little" or not hasattr(values, "tobytes"):
+        values = array(typecode, values)
+        if sys.byteorder != "little":
+            values.byteswap()
+    return values.tobytes()
+
+
+def _pad(data: bytes) -> bytes:
+    return data + b"\0" * (-len(data) % 8)
+
+
+def _read(typecode: str, buf: memoryview, start: int, count: int, copy: bool = True):
+    """`count` items at `start`: an array, or a read-only view of `buf` when not copying."""
+    size = count * struct.calcsize(typecode)
+    end = start + size + (-size % 8)
+    if not copy:
+        return buf[start:start + size].cast(typecode), end
+    arr = array(typecode)
+    arr.frombytes(buf[start:start + size])
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr, end
+
+
+def encode(snapshot: StatsSnapshot, editors: list[int], saved_at: float | None = None) -> bytes:
+    blob, offsets, columns = snapshot.buffers()
+    body = b"".join([
+        COUNTS.pack(len(snapshot), len(editors), len(blob), 0),
+        _pad(_le("I", offsets)),
+        *(_le("d", columns[c]) for c in VALUE_COLUMNS),
+        _le("Q", editors),
+        blob,
+    ])
+    saved_at = time.time() if saved_at is None else saved_at
+    return HEADER.pack(MAGIC, FORMAT, zlib.crc32(body), len(body), saved_at) + body
+
+
+def decode(buf, copy: bool = True) -> tuple[StatsSnapshot, list[int], float]:
+    """
+    (snapshot, editor IDs, saved_at) from bytes or an mmap; raises
+    WarmStartError. With copy=False the offsets and value columns stay views
+    into `buf` (little-endian hosts only), so several processes mapping the
+    same file share one copy of them.
+    """
+    if len(buf) < HEADER.size:
+        raise WarmStartError("file too short")
+    magic, fmt, crc, length, saved_at = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC or fmt != FORMAT:
+        raise WarmStartError(f"unknown format {magic!r}/{fmt}")
+    body = memoryview(buf)[HEADER.size:HEADER.size + length]
+    if len(body) != length or zlib.crc32(body) != crc:
+        raise WarmStartError("checksum mismatch")
+
+    copy = copy or sys.byteorder != "little"
+    rows, n_editors, blob_len, _ = COUNTS.unpack_from(body, 0)
+    offsets, pos = _read("I", body, COUNTS.size, rows + 1, copy)
+    columns = {}
+    for c in VALUE_COLUMNS:
+        columns[c], pos = _read("d", body, pos, rows, copy)
+    editors, pos = _read("Q", body, pos, n_editors)
+    blob = bytes(body[pos:pos + blob_len])
+    if len(blob) != blob_len or offsets[-1] != blob_len:
+        raise WarmStartError("truncated body")
+    return StatsSnapshot.from_buffers(blob, offsets, columns), editors.tolist(), saved_at
+
+
+def _shown(snapshot: StatsSnapshot, row: dict) -> bool:
+    """True if `snapshot` already holds the values of the committed `row`."""
+    i = snapshot.index_of(str(row.get("name") or ""))
+    if i is None:
+        return False
+    for c in VALUE_COLUMNS:
+        if c not in row:
+            continue
+        have, want = snapshot.columns[c][i], row[c]
+        try:
+            if (have == have) if want is None else have != float(want):
+                return False
+        except (TypeError, ValueError):
+            return False
+    return True
+
+
+class SharedSnapshotLoader:
+    """
+    stats_cache loader for shard workers: maps the file the supervisor
+    publishes and returns the current snapshot unchanged until the file is
+    replaced. The worker's own writes (stats_cache upserts and deletes) are
+    pinned and replayed on every newly mapped file until it shows them, or
+    for at most LOCAL_PIN_TTL (a later write from elsewhere may have
+    replaced them), so a user never reads back an older value.
+
+    Without a file yet (the supervisor could not load the stats), the first
+    load waits up to `wait` seconds for it and then reads Supabase itself;
+    the file is picked up as soon as it appears.
+    """
+    def __init__(self, path: str, pin_ttl: float = LOCAL_PIN_TTL, wait: float = 0.0):
+        self.path = path
+        self.pin_ttl = pin_ttl
+        self.wait = wait
+        self.fallbacks = 0
+        self._stamp: tuple | None = None
+        self._pinned: list[tuple[float, str, list]] = []   # (monotonic time, op, rows or names)
+
+    def on_change(self, old, new, op: str, arg) -> None:
+        """stats_cache subscriber: pin local writes; a later write to a name replaces its pin."""
+        if op not in ("upsert", "delete"):
+            return
+        names = {str(r.get("name") or "") for r in arg} if op == "upsert" else set(arg)
+        pinned = []
+        for stamp, pin_op, items in self._pinned:
+            if pin_op == "upsert":
+                items = [r for r in items if str(r.get("name") or "") not in names]
+            else:
+                items = [n for n in items if n not in names]
+            if items:
+                pinned.append((stamp, pin_op, items))
+        pinned.append((time.monotonic(), op, list(arg)))
+        self._pinned = pinned
+
+    def _replay(self, snapshot: StatsSnapshot) -> StatsSnapshot:
+        cutoff = time.monotonic() - self.pin_ttl
+        pinned = []
+        for stamp, op, items in self._pinned:
+            if stamp < cutoff:
+                continue
+            if op == "upsert":
+                items = [r for r in items if not _shown(snapshot, r)]
+                if items:
+                    snapshot = snapshot.with_upserts(items)
+            else:
+                items = [n for n in items if snapshot.index_of(n) is not None]
+                if items:
+                    snapshot = snapshot.without(items)
+            if items:
+                pinned.append((stamp, op, items))
+        self._pinned = pinned
+        return snapshot
+
+    async def _stat(self) -> os.stat_result | None:
+        deadline = time.monotonic() + self.wait
+        while True:
+            try:
+                return os.stat(self.path)
+            except FileNotFoundError:
+                if time.monotonic() >= deadline:
+                    return None
+            await asyncio.sleep(min(0.1, self.wait))
+
+    async def __call__(self, current: StatsSnapshot | None) -> StatsSnapshot:
+        if current is None:
+            st = await self._stat()
+            if st is None:
+                logger.warning("No shared snapshot at %s, loading stats from Supabase", self.path)
+                self.fallbacks += 1
+                return await load_full(None)
+        else:
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                return current   # until the supervisor publishes one
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if current is not None and stamp == self._stamp:
+            return current
+        with open(self.path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        snapshot, editors, _ = decode(mapped, copy=False)
+        # The supervisor refreshes the editor list on a timer; adopt each version
+        editor_cache.sync(editors)
+        self._stamp = stamp
+        return self._replay(snapshot)
+
+
+# ─── File ───────────────────────────────────────────────────────────────────────
+class WarmStartFile:
+    """
+    Keeps WARM_START_FILE in step with stats_cache and editor_cache. Changes
+    are debounced and the encode + write runs in a worker thread (snapshots
+    are immutable, so that is safe); the file is replaced atomically.
+    """
+    def __init__(self, path: str = WARM_START_FILE, debounce: float = WARM_START_DEBOUNCE):
+        self.path = path
+        self.debounce = debounce
+        self._pending: asyncio.Task | None = None
+        self._written: tuple | None = None
+        self.writes = 0
+
+    def restore(self) -> bool:
+        """
+        Seed both caches from the file (mapped, decoded into private copies);
+        False when there is no usable file. Editors are only taken from a
+        file younger than EDITOR_TTL: an older one may still list editors
+        that were revoked meanwhile, so the cache is left to ask Supabase.
+        """
+        if not self.path:
+            return False
+        try:
+            with open(self.path, "rb") as f:
+                if os.fstat(f.fileno()).st_size < HEADER.size:
+                    raise WarmStartError("file too short")
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    snapshot, editors, saved_at = decode(mapped)
+        except FileNotFoundError:
+            return False
+        except (OSError, WarmStartError) as exc:
+            logger.warning("Ignoring warm-start file %s: %s", self.path, exc)
+            return False
+        age = time.time() - saved_at
+        self._written = (snapshot.version, frozenset(editors))
+        stats_cache.seed(snapshot)
+        if 0 <= age <= editor_cache.ttl:
+            editor_cache.seed(editors)
+        else:
+            # Not even as an empty list: seed() would deny everyone else unasked
+            editors = []
+        logger.info(
+            "Warm start: %d rows, %d editors from %s (%.0fs old)",
+            len(snapshot), len(editors), self.path, age
+        )
+        return True
+
+    def schedule(self, *_) -> None:
+        """Cache subscriber: write the file soon (one write per debounce window)."""
+        if not self.path or (self._pending is not None and not self._pending.done()):
+            return
+        try:
+            self._pending = asyncio.get_running_loop().create_task(self._write_later())
+        except RuntimeError:   # no loop (scripts, tests): nothing to persist into
+            pass
+
+    async def _write_later(self) -> None:
+        await asyncio.sleep(self.debounce)
+        await self.flush()
+
+    async def flush(self) -> None:
+        snapshot = stats_cache.current
+        if snapshot is None or not self.path:
+            return
+        editors = editor_cache.editor_ids()
+        state = (snapshot.version, frozenset(editors))
+        if state == self._written:
+            return
+        try:
+            await asyncio.to_thread(self._write, snapshot, editors)
+        except OSError as exc:
+            logger.warning("Could not write warm-start file %s: %s", self.path, exc)
+            return
+        self._written = state
+        self.writes += 1
+
+    def _write(self, snapshot: StatsSnapshot, editors: list[int]) -> None:
+        data = encode(snapshot, editors)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self.path)
+
+
+warm_start = WarmStartFile()
+stats_cache.subscribe(warm_start.schedule)
+editor_cache.subscribe(warm_start.schedule)
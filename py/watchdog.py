@@ -0,0 +1,95 @@
+# py/watchdog.py
+"""
+Event-loop stall detector.
+
+A heartbeat task on the loop stamps the time every `interval` seconds and
+records how late it woke up. A separate thread watches that stamp; when the
+loop has not come back for `threshold` seconds, the thread grabs the loop
+thread's current stack (the call that is blocking it) and logs it once per
+stall. When the loop recovers, the heartbeat logs how long the stall lasted.
+"""
+import os, sys, time, asyncio, threading, traceback
+
+from py import metrics
+from py.log_config import logger
+
+
+# ─── Config ─────────────────────────────────────────────────────────────────────
+LOOP_WATCHDOG_MS = float(os.getenv("LOOP_WATCHDOG_MS", 0))    # stall threshold; 0 disables the watchdog
+LOOP_WATCHDOG_INTERVAL = float(os.getenv("LOOP_WATCHDOG_INTERVAL", 0.1))  # heartbeat period (s)
+STACK_LIMIT = 25   # innermost frames kept in the log
+
+loop_lag_seconds = metrics.registry.histogram(
+    "event_loop_lag_seconds", "How late the loop heartbeat woke up",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0)
+)
+loop_stalls = metrics.registry.counter(
+    "event_loop_stalls_total", "Times the loop was blocked longer than LOOP_WATCHDOG_MS"
+)
+
+
+class LoopWatchdog:
+    def __init__(self, threshold: float, interval: float = LOOP_WATCHDOG_INTERVAL):
+        self.threshold = threshold
+        self.interval = min(interval, threshold / 2)
+        self.stalls = 0
+        self._beat = time.monotonic()
+        self._reported_beat = None   # heartbeat already reported as stalled
+        self._loop_thread: int | None = None
+        self._task: asyncio.Task | None = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = asyncio.create_task(self._heartbeat(), name="loop-watchdog")
+        threading.Thread(target=self._watch, name="loop-watchdog", daemon=True).start()
+        logger.info("Loop watchdog armed (threshold %.0f ms)", self.threshold * 1000)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    # ─── Loop side ──────────────────────────────────────────────────────────────
+    async def _heartbeat(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            loop_lag_seconds.observe(lag)
+            if self._reported_beat is not None:
+                logger.warning(
+                    "⏱️ Event loop recovered after a %.2fs stall", now - self._reported_beat - self.interval
+                )
+                self._reported_beat = None
+            self._beat = now
+
+    # ─── Watcher thread ─────────────────────────────────────────────────────────
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            beat = self._beat
+            blocked = time.monotonic() - beat - self.interval
+            if blocked < self.threshold or self._reported_beat == beat:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if self._beat != beat:
+                continue   # the loop came back while we were looking
+            self._reported_beat = beat
+            self.stalls += 1
+            loop_stalls.inc()
+            stack = "".join(traceback.format_stack(frame)[-STACK_LIMIT:]) if frame else "  <no frame>\n"
+            logger.warning(
+                "⏱️ Event loop blocked for %.2fs, currently in:\n%s",
+                blocked, stack.rstrip()
+            )
+
+
+def start_watchdog() -> LoopWatchdog | None:
+    """Arm the watchdog on the running loop if LOOP_WATCHDOG_MS is set."""
+    if LOOP_WATCHDOG_MS <= 0:
+        return None
+    watchdog = LoopWatchdog(LOOP_WATCHDOG_MS / 1000)
+    watchdog.start()
+    return watchdog
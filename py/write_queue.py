@@ -0,0 +1,165 @@
+# py/write_queue.py
+import os, asyncio
+
+from py import db
+from py.snapshot import stats_cache
+from py.log_config import logger
+
+
+# ─── Config ─────────────────────────────────────────────────────────────────────
+WRITE_WINDOW    = float(os.getenv("WRITE_WINDOW", 0.5))   # seconds to collect updates before a flush
+WRITE_QUEUE_MAX = int(os.getenv("WRITE_QUEUE_MAX", 500))  # pending updates before callers are refused
+
+
+class QueueFull(Exception):
+    """Raised when the write queue already holds WRITE_QUEUE_MAX updates."""
+
+
+async def commit_updates(pending: dict[str, dict]) -> tuple[dict[str, dict], dict[str, Exception]]:
+    """
+    Apply partial updates {name: fields} as PATCHes filtered on `name`.
+    Only names with the same fields *and* values share a request (NAME_CHUNK
+    names each), so a batch of distinct values still costs one request per
+    row; the requests run concurrently. A single bulk upsert is not used on
+    purpose: it would have to send whole rows and would re-insert rows that
+    were deleted meanwhile. Only the given fields are sent, so a column
+    written elsewhere meanwhile keeps its value and a deleted row stays
+    deleted.
+
+    Returns (committed rows by name, exception by name for failed requests);
+    names that do not exist are in neither.
+    """
+    groups: dict[tuple, list[str]] = {}
+    for name, fields in pending.items():
+        groups.setdefault(tuple(sorted(fields.items())), []).append(name)
+    jobs = [
+        (dict(key), names[i:i + db.NAME_CHUNK])
+        for key, names in groups.items()
+        for i in range(0, len(names), db.NAME_CHUNK)
+    ]
+    results = await asyncio.gather(
+        *(db.update_stats_many(names, payload) for payload, names in jobs),
+        return_exceptions=True
+    )
+
+    committed, failed = {}, {}
+    for (_, names), result in zip(jobs, results):
+        if isinstance(result, Exception):
+            failed.update(dict.fromkeys(names, result))
+        else:
+            committed.update((r["name"], r) for r in result)
+    logger.info("Flushed %d row updates in %d requests", len(committed), len(jobs))
+    return committed, failed
+
+
+# ─── Write-behind queue ─────────────────────────────────────────────────────────
+class WriteBehindQueue:
+    """
+    Collects row updates for a short window and commits them together.
+
+    Repeated updates to the same name are merged (last write wins per field).
+    A flush sends only the changed fields (see commit_updates); every
+    caller's future resolves with its committed row, None when the name does
+    not exist, or the error of the request that carried it.
+    """
+    def __init__(self, window: float = WRITE_WINDOW, maxsize: int = WRITE_QUEUE_MAX):
+        self.window = window
+        self.maxsize = maxsize
+        self._pending: dict[str, dict] = {}
+        self._waiters: dict[str, list[asyncio.Future]] = {}
+        self._depth = 0
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._closed = False
+        self.batches = self.coalesced = 0
+
+    def __len__(self) -> int:
+        return self._depth
+
+    def submit(self, name: str, payload: dict) -> asyncio.Future:
+        self._admit(1)
+        return self._enqueue(name, payload)
+
+    def submit_many(self, changes: dict[str, dict]) -> dict[str, asyncio.Future]:
+        """
+        Queue a whole batch ({name: fields}, e.g. /bulk_update) for the same
+        flush. It is refused unless it fits or the queue is empty, so a large
+        batch gets in but never piles on top of a backlog.
+        """
+        self._admit(len(changes), whole=True)
+        return {name: self._enqueue(name, payload) for name, payload in changes.items()}
+
+    def _admit(self, count: int, whole: bool = False) -> None:
+        if self._closed:
+            raise QueueFull("write queue is shut down")
+        if self._depth + count > self.maxsize and not (whole and self._depth == 0):
+            raise QueueFull(f"{self._depth} updates already pending")
+
+    def _enqueue(self, name: str, payload: dict) -> asyncio.Future:
+        if name in self._pending:
+            self.coalesced += 1
+        self._pending.setdefault(name, {}).update(payload)
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(name, []).append(fut)
+        self._depth += 1
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        self._wake.set()
+        return fut
+
+    async def update(self, name: str, payload: dict) -> dict | None:
+        return await self.submit(name, payload)
+
+    async def update_many(self, changes: dict[str, dict]) -> tuple[dict[str, dict], dict[str, Exception]]:
+        """(committed rows by name, exception by name); unknown names are in neither."""
+        futures = self.submit_many(changes)
+        results = await asyncio.gather(*futures.values(), return_exceptions=True)
+        committed, failed = {}, {}
+        for name, result in zip(futures, results):
+            if isinstance(result, Exception):
+                failed[name] = result
+            elif result is not None:
+                committed[name] = result
+        return committed, failed
+
+    async def _run(self) -> None:
+        while True:
+            await self._wake.wait()
+            if not self._closed:
+                await asyncio.sleep(self.window)
+            self._wake.clear()
+            await self.flush()
+            if self._closed:
+                return
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        pending, waiters = self._pending, self._waiters
+        self._pending, self._waiters, self._depth = {}, {}, 0
+        self.batches += 1
+        committed, failed = await commit_updates(pending)
+        if failed:
+            exc = next(iter(failed.values()))
+            logger.error("Batched update of %d of %d rows failed: %s", len(failed), len(pending), exc)
+        stats_cache.apply_upsert(list(committed.values()))
+        for name, futs in waiters.items():
+            for fut in futs:
+                if fut.done():
+                    continue
+                if name in failed:
+                    fut.set_exception(failed[name])
+                else:
+                    fut.set_result(committed.get(name))
+
+    async def close(self) -> None:
+        """Stop the background loop and commit whatever is still queued."""
+        self._closed = True
+        self._wake.set()
+        if self._task is not None and not self._task.done():
+            await self._task
+        await self.flush()
+
+
+write_queue = WriteBehindQueue()
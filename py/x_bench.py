@@ -0,0 +1,333 @@
+# py/x_bench.py
+"""
+Offline load test for the stats commands.
+
+For every table size a fresh fake PostgREST (py.x_fake_postgrest) and a
+fresh bot process are spawned, so caches and peak memory never leak from
+one size into the next. The bot process imports the real command modules
+and drives their callbacks with fake Interaction objects from N concurrent
+users:
+
+    load       cold stats_cache fill (rows/s = table rows per second)
+    show       /show_table with random sort column, direction and page
+    paginate   Next ▶ clicks on the view /show_table returned
+    update     /update_table on random rows (rows/s = rows committed per second)
+
+    python -m py.x_bench --rows 100 10000 100000 --users 50 --ops 20 --latency 40
+    python -m py.x_bench --rows 1000000 --json after.json --baseline before.json
+    SHOW_TABLE_MODE=keyset python -m py.x_bench --rows 1000000
+
+Latency is measured from the start of the callback to its return, i.e.
+after the final followup/edit went out.
+"""
+import os, sys, json, time, random, asyncio, argparse, platform, tracemalloc
+import multiprocessing as mp
+from statistics import median
+
+try:
+    import resource
+except ImportError:   # not on Windows
+    resource = None
+
+
+FAKE_KEY = "bench.bench.bench"   # supabase-py only checks that it looks like a JWT
+SCENARIOS = ("load", "show", "paginate", "update")
+USER_ID_BASE = 900_000_000_000_000_000
+
+
+# ─── Fake Discord objects ───────────────────────────────────────────────────────
+class FakeUser:
+    def __init__(self, uid: int):
+        self.id = uid
+        self.name = f"bench{uid}"
+        self.mention = f"<@{uid}>"
+
+
+class FakeMessage:
+    def __init__(self, content=None, view=None):
+        self.id = random.getrandbits(63)
+        self.content = content
+        self.view = view
+
+
+class FakeResponse:
+    def __init__(self, interaction: "FakeInteraction"):
+        self._interaction = interaction
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def defer(self, **kwargs) -> None:
+        self._done = True
+
+    async def send_message(self, content=None, **kwargs) -> None:
+        self._done = True
+        self._interaction.sent.append(FakeMessage(content, kwargs.get("view")))
+
+    async def edit_message(self, content=None, view=None, **kwargs) -> None:
+        self._done = True
+        message = self._interaction.message
+        if content is not None:
+            message.content = content
+        message.view = view
+
+
+class FakeFollowup:
+    def __init__(self, interaction: "FakeInteraction"):
+        self._interaction = interaction
+
+    async def send(self, content=None, view=None, **kwargs) -> FakeMessage:
+        message = FakeMessage(content, view)
+        self._interaction.sent.append(message)
+        return message
+
+    async def edit_message(self, message_id, content=None, view=None, **kwargs) -> FakeMessage:
+        return await self.send(content, view)
+
+
+class FakeInteraction:
+    """The subset of discord.Interaction the command callbacks touch."""
+    def __init__(self, user: FakeUser, command=None, message: FakeMessage | None = None):
+        self.user = user
+        self.command = command
+        self.message = message
+        self.extras: dict = {}
+        self.sent: list[FakeMessage] = []
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+
+    async def edit_original_response(self, content=None, view=None, **kwargs) -> FakeMessage:
+        if content is not None:
+            self.message.content = content
+        self.message.view = view
+        return self.message
+
+
+# ─── Fake PostgREST process ─────────────────────────────────────────────────────
+def _serve(rows: int, editors: list[int], latency: float, jitter: float, conn) -> None:
+    from py.x_fake_postgrest import FakeStore, start, synthetic_rows
+
+    async def run():
+        store = FakeStore(latency, jitter)
+        store.seed("stats", synthetic_rows(rows))
+        store.seed("stats_editors_rights", [{"discord_id": i, "discord_name": f"bench{i}"} for i in editors])
+        _, url = await start(store)
+        conn.send(url)
+        await asyncio.Event().wait()
+
+    asyncio.run(run())
+
+
+# ─── Bot process ────────────────────────────────────────────────────────────────
+def _percentile(samples: list[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _summarize(latencies: list[float], wall: float, rows: int, errors: int) -> dict:
+    return {
+        "ops":     len(latencies),
+        "errors":  errors,
+        "p50_ms":  round(median(latencies) * 1000, 3) if latencies else 0.0,
+        "p99_ms":  round(_percentile(latencies, 0.99) * 1000, 3),
+        "max_ms":  round(max(latencies, default=0.0) * 1000, 3),
+        "ops_s":   round(len(latencies) / wall, 1) if wall else 0.0,
+        "rows_s":  round(rows / wall, 1) if wall else 0.0,
+        "wall_s":  round(wall, 3),
+    }
+
+
+async def _drive(users: list[FakeUser], ops: int, step) -> dict:
+    """Run `step(user, i)` `ops` times per user, all users concurrently."""
+    latencies: list[float] = []
+    counters = {"rows": 0, "errors": 0}
+
+    async def user_loop(user: FakeUser):
+        for i in range(ops):
+            started = time.perf_counter()
+            try:
+                rows = await step(user, i)
+            except Exception:
+                counters["errors"] += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            counters["rows"] += rows
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user_loop(u) for u in users))
+    return _summarize(latencies, time.perf_counter() - started, counters["rows"], counters["errors"])
+
+
+async def _bench(rows: int, users: int, ops: int, scenarios: tuple) -> dict:
+    # Imported only now: py.helpers creates the Supabase clients from the env at import time
+    from py.helpers import SORT_COLUMNS
+    from py.snapshot import stats_cache
+    from py.render import page_cache
+    from py.write_queue import write_queue
+    from py.edit_scheduler import edit_scheduler
+    from commands.show_table import show_table
+    from commands.update_table import update_table
+
+    crowd = [FakeUser(USER_ID_BASE + i) for i in range(users)]
+    rnd = random.Random(rows)
+    results = {}
+
+    started = time.perf_counter()
+    snapshot = await stats_cache.get()
+    wall = time.perf_counter() - started
+    if "load" in scenarios:
+        results["load"] = _summarize([wall], wall, rows, 0)
+    per_page = page_cache.layout(snapshot).per_page
+    pages = snapshot.page_count(per_page)
+
+    async def show(user, i):
+        interaction = FakeInteraction(user, show_table)
+        await show_table.callback(
+            interaction,
+            sort_by=rnd.choice((None,) + SORT_COLUMNS),
+            sort_desc=rnd.random() < 0.5,
+            page=rnd.randint(1, pages)
+        )
+        return per_page if interaction.sent and interaction.sent[-1].view else 0
+
+    if "show" in scenarios:
+        results["show"] = await _drive(crowd, ops, show)
+
+    if "paginate" in scenarios:
+        # The fake Discord has no rate limits: measure rendering, not the edit budget
+        edit_scheduler.rate, edit_scheduler.burst = 1e9, 1
+        views = {}
+        for user in crowd:
+            opener = FakeInteraction(user, show_table)
+            await show_table.callback(opener, sort_by=rnd.choice(SORT_COLUMNS), sort_desc=True, page=1)
+            views[user.id] = opener.sent[-1]
+
+        async def click(user, i):
+            message = views[user.id]
+            if message.view.next_button.item.disabled:
+                return 0
+            await message.view.next_button.callback(FakeInteraction(user, message=message))
+            # A click only schedules the edit; time it until the page is on screen
+            await edit_scheduler.drain(message.id)
+            return per_page
+
+        results["paginate"] = await _drive(crowd, ops, click)
+
+    if "update" in scenarios:
+        async def update(user, i):
+            interaction = FakeInteraction(user, update_table)
+            await update_table.callback(
+                interaction,
+                name=f"member{rnd.randrange(rows):07d}",
+                sing=rnd.randint(0, 600),
+                dance=rnd.randint(0, 600),
+                rally=round(rnd.uniform(0, 20), 2)
+            )
+            return 1 if interaction.sent and interaction.sent[-1].content.startswith("✅") else 0
+
+        results["update"] = await _drive(crowd, ops, update)
+        await write_queue.close()
+
+    return results
+
+
+def _worker(url: str, rows: int, users: int, ops: int, scenarios: tuple, trace: bool, conn) -> None:
+    # LOG_FILE="": a benchmark run must not append to the bot's discord_bot.log
+    os.environ.update(SUPABASE_URL=url, SUPABASE_ANON_KEY=FAKE_KEY, SUPABASE_SERVICE_ROLE_KEY=FAKE_KEY, LOG_FILE="")
+    import logging
+    from py.log_config import root
+    root.setLevel(logging.WARNING)   # one log line per op would dominate the numbers
+
+    if trace:
+        tracemalloc.start()
+    results = asyncio.run(_bench(rows, users, ops, scenarios))
+    memory = {}
+    if trace:
+        memory["tracemalloc_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+    if resource is not None:
+        memory["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    conn.send({"scenarios": results, "memory": memory})
+
+
+def run_size(rows: int, args) -> dict:
+    ctx = mp.get_context("spawn")
+    editors = [USER_ID_BASE + i for i in range(args.users)]
+
+    server_end, server_conn = ctx.Pipe()
+    server = ctx.Process(
+        target=_serve, args=(rows, editors, args.latency / 1000, args.jitter / 1000, server_conn), daemon=True
+    )
+    server.start()
+    try:
+        url = server_end.recv()
+        bot_end, bot_conn = ctx.Pipe()
+        bot = ctx.Process(
+            target=_worker,
+            args=(url, rows, args.users, args.ops, tuple(args.scenario), args.memory, bot_conn)
+        )
+        bot.start()
+        result = bot_end.recv()
+        bot.join()
+        return result
+    finally:
+        server.terminate()
+        server.join()
+
+
+# ─── Report ─────────────────────────────────────────────────────────────────────
+def _print_table(results: dict, baseline: dict | None) -> None:
+    print(f"{'rows':>9} {'scenario':<9} {'ops':>6} {'err':>4} {'p50 ms':>9} {'p99 ms':>9} "
+          f"{'ops/s':>9} {'rows/s':>11} {'Δp99':>7}")
+    for size, result in results.items():
+        for name, s in result["scenarios"].items():
+            delta = ""
+            base = (baseline or {}).get(size, {}).get("scenarios", {}).get(name)
+            if base and base["p99_ms"]:
+                delta = f"{(s['p99_ms'] / base['p99_ms'] - 1) * 100:+.0f}%"
+            print(f"{size:>9} {name:<9} {s['ops']:>6} {s['errors']:>4} {s['p50_ms']:>9.2f} "
+                  f"{s['p99_ms']:>9.2f} {s['ops_s']:>9.1f} {s['rows_s']:>11,.0f} {delta:>7}")
+        mem = ", ".join(f"{k}={v}" for k, v in result["memory"].items())
+        print(f"{'':>9} memory    {mem}")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Offline benchmark of the stats commands")
+    ap.add_argument("--rows", type=int, nargs="+", default=[100, 10_000, 100_000], help="table sizes")
+    ap.add_argument("--users", type=int, default=20, help="concurrent fake users")
+    ap.add_argument("--ops", type=int, default=10, help="operations per user and scenario")
+    ap.add_argument("--scenario", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    ap.add_argument("--latency", type=float, default=20.0, help="fake PostgREST latency per request (ms)")
+    ap.add_argument("--jitter", type=float, default=10.0, help="random extra latency up to (ms)")
+    ap.add_argument("--memory", action="store_true", help="also track the tracemalloc peak (slower)")
+    ap.add_argument("--json", help="write results to this file")
+    ap.add_argument("--baseline", help="earlier --json output to compare p99 against")
+    args = ap.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+    results = {}
+    for rows in args.rows:
+        print(f"… {rows:,} rows", file=sys.stderr, flush=True)
+        results[str(rows)] = run_size(rows, args)
+
+    _print_table(results, baseline)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "config": {k: v for k, v in vars(args).items() if k not in ("json", "baseline")},
+                "python": platform.python_version(),
+                "mode": os.getenv("SHOW_TABLE_MODE", "snapshot"),
+                "results": results,
+            }, f, indent=2)
+        print(f"📄 Results written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
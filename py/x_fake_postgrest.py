@@ -0,0 +1,318 @@
+# py/x_fake_postgrest.py
+"""
+In-memory stand-in for the PostgREST API behind Supabase (`/rest/v1/<table>`).
+
+Implements just what the bot and its tools use: select with column lists,
+eq/neq/gt/gte/lt/lte/in/is filters, or=/and= groups, order, limit/offset,
+Prefer count=exact (incl. HEAD), insert, upsert (on_conflict), update and
+delete with return=representation. `updated_at` is maintained like the
+trigger on the real table, so delta sync can be exercised locally.
+
+    python -m py.x_fake_postgrest --port 54321 --seed stats.json --latency 40
+    SUPABASE_URL=http://127.0.0.1:54321 SUPABASE_ANON_KEY=x.y.z \\
+    SUPABASE_SERVICE_ROLE_KEY=x.y.z python bot.py
+"""
+import re, json, random, asyncio, argparse
+from datetime import datetime, timezone
+from aiohttp import web
+
+
+PRIMARY_KEYS = {"stats": "name", "stats_editors_rights": "discord_id"}
+RESERVED = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# ─── Filter parsing ─────────────────────────────────────────────────────────────
+def _split_top(text: str) -> list[str]:
+    """Split on commas that are not inside parentheses or double quotes."""
+    parts, depth, quoted, escaped, cur = [], 0, False, False, ""
+    for ch in text:
+        if escaped:
+            escaped = False
+        elif quoted and ch == "\\":
+            escaped = True
+        elif ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and ch == ",":
+            parts.append(cur)
+            cur = ""
+            continue
+        cur += ch
+    parts.append(cur)
+    return parts
+
+
+def _unquote(text: str) -> str:
+    if len(text) >= 2 and text[0] == text[-1] == '"':
+        return re.sub(r"\\(.)", r"\1", text[1:-1])
+    return text
+
+
+def _is_timestamp(text) -> bool:
+    return isinstance(text, str) and len(text) >= 19 and text[4] == "-" and text[:4].isdigit()
+
+
+def _coerce(sample, raw: str):
+    if raw == "null":
+        return None
+    if _is_timestamp(sample) and _is_timestamp(raw):
+        return datetime.fromisoformat(raw)
+    if isinstance(sample, bool):
+        return raw == "true"
+    if isinstance(sample, (int, float)):
+        try:
+            return type(sample)(raw) if "." not in raw else float(raw)
+        except ValueError:
+            return raw
+    return raw
+
+
+def _compare(value, op: str, raw: str) -> bool:
+    if op == "is":
+        return value is None if raw == "null" else value == (raw == "true")
+    if op == "in":
+        wanted = [_unquote(v) for v in _split_top(raw.strip("()"))]
+        return value is not None and any(value == _coerce(value, w) for w in wanted)
+    if value is None:
+        return False
+    other = _coerce(value, _unquote(raw))
+    if other is None:
+        return False
+    if isinstance(other, datetime):
+        value = datetime.fromisoformat(value)
+    try:
+        return {
+            "eq":  value == other, "neq": value != other,
+            "gt":  value > other,  "gte": value >= other,
+            "lt":  value < other,  "lte": value <= other,
+        }[op]
+    except (KeyError, TypeError):
+        return False
+
+
+def _condition(expr: str):
+    """Compile one `col.op.value`, `and(...)`/`or(...)` or `not.` expression."""
+    if expr.startswith(("and(", "or(")):
+        kind, inner = expr.split("(", 1)
+        subs = [_condition(p) for p in _split_top(inner[:-1])]
+        combine = all if kind == "and" else any
+        return lambda row: combine(f(row) for f in subs)
+    column, rest = expr.split(".", 1)
+    return _filter(column, rest)
+
+
+def _filter(column: str, spec: str):
+    negate = spec.startswith("not.")
+    if negate:
+        spec = spec[4:]
+    op, _, raw = spec.partition(".")
+    return lambda row: _compare(row.get(column), op, raw) != negate
+
+
+def _order_key(spec: str):
+    keys = []
+    for part in spec.split(","):
+        bits = part.split(".")
+        col = bits[0]
+        desc = "desc" in bits[1:]
+        nulls_first = "nullsfirst" in bits[1:] or ("nullslast" not in bits[1:] and desc)
+        keys.append((col, desc, nulls_first))
+    return keys
+
+
+def _sort(rows: list[dict], spec: str) -> list[dict]:
+    for col, desc, nulls_first in reversed(_order_key(spec)):
+        present = [r for r in rows if r.get(col) is not None]
+        missing = [r for r in rows if r.get(col) is None]
+        present.sort(key=lambda r: r[col], reverse=desc)
+        rows = missing + present if nulls_first else present + missing
+    return rows
+
+
+# ─── Store ──────────────────────────────────────────────────────────────────────
+class FakeStore:
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0):
+        self.tables: dict[str, list[dict]] = {"stats": [], "stats_editors_rights": []}
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+
+    def seed(self, table: str, rows) -> None:
+        stamp = _now()
+        self.tables[table] = [self._stamp(table, dict(r), stamp) for r in rows]
+
+    def _stamp(self, table: str, row: dict, stamp: str) -> dict:
+        if table == "stats":
+            row["updated_at"] = stamp
+        elif table == "stats_editors_rights":
+            row.setdefault("added_at", stamp)
+        return row
+
+    def matching(self, table: str, query) -> list[dict]:
+        conds = []
+        for key, value in query.items():
+            if key in RESERVED:
+                continue
+            if key in ("or", "and"):
+                conds.append(_condition(f"{key}{value}"))
+            else:
+                conds.append(_filter(key, value))
+        return [r for r in self.tables[table] if all(c(r) for c in conds)]
+
+
+def _project(rows: list[dict], select: str) -> list[dict]:
+    cols = [c.strip() for c in select.split(",") if c.strip()]
+    if not cols or "*" in cols:
+        return [dict(r) for r in rows]
+    return [{c: r.get(c) for c in cols} for r in rows]
+
+
+def _prefers(request: web.Request) -> set[str]:
+    return {p.strip() for p in request.headers.get("Prefer", "").split(",") if p.strip()}
+
+
+# ─── Handlers ───────────────────────────────────────────────────────────────────
+def make_app(store: FakeStore) -> web.Application:
+    async def handle(request: web.Request) -> web.StreamResponse:
+        store.requests += 1
+        if store.latency or store.jitter:
+            await asyncio.sleep(store.latency + random.random() * store.jitter)
+
+        table = request.match_info["table"]
+        if table not in store.tables:
+            return web.json_response(
+                {"code": "42P01", "message": f'relation "public.{table}" does not exist'},
+                status=404
+            )
+        query = request.query
+        prefer = _prefers(request)
+        pk = PRIMARY_KEYS.get(table, "id")
+        rows = store.tables[table]
+        headers = {}
+
+        if request.method in ("GET", "HEAD"):
+            result = store.matching(table, query)
+            total = len(result)
+            if "order" in query:
+                result = _sort(result, query["order"])
+            offset = int(query.get("offset", 0))
+            limit = int(query["limit"]) if "limit" in query else None
+            result = result[offset: None if limit is None else offset + limit]
+            if "count=exact" in prefer:
+                end = offset + len(result) - 1
+                headers["Content-Range"] = f"{offset}-{end}/{total}" if result else f"*/{total}"
+            if request.method == "HEAD":
+                return web.Response(status=200, headers=headers)
+            return web.json_response(_project(result, query.get("select", "*")), headers=headers)
+
+        if request.method == "POST":
+            body = await request.json()
+            incoming = body if isinstance(body, list) else [body]
+            on_conflict = query.get("on_conflict", pk)
+            merge = "resolution=merge-duplicates" in prefer
+            ignore = "resolution=ignore-duplicates" in prefer
+            stamp = _now()
+            index = {r.get(on_conflict): r for r in rows}
+            written = []
+            for new in incoming:
+                existing = index.get(new.get(on_conflict))
+                if existing is not None:
+                    if ignore:
+                        continue
+                    if not merge:
+                        return web.json_response({
+                            "code": "23505",
+                            "message": f'duplicate key value violates unique constraint "{table}_{on_conflict}_key"'
+                        }, status=409)
+                    existing.update(new)
+                    written.append(store._stamp(table, existing, stamp))
+                else:
+                    row = store._stamp(table, dict(new), stamp)
+                    rows.append(row)
+                    index[row.get(on_conflict)] = row
+                    written.append(row)
+            status = 201
+        elif request.method == "PATCH":
+            body = await request.json()
+            stamp = _now()
+            written = store.matching(table, query)
+            for row in written:
+                row.update(body)
+                store._stamp(table, row, stamp)
+            status = 200
+        elif request.method == "DELETE":
+            written = store.matching(table, query)
+            gone = {id(r) for r in written}
+            store.tables[table] = [r for r in rows if id(r) not in gone]
+            status = 200
+        else:
+            return web.Response(status=405)
+
+        if "return=representation" in prefer:
+            return web.json_response(_project(written, query.get("select", "*")), status=status)
+        return web.Response(status=204 if status == 200 else status)
+
+    app = web.Application()
+    app.router.add_route("*", "/rest/v1/{table}", handle)
+    return app
+
+
+async def start(store: FakeStore, host: str = "127.0.0.1", port: int = 0) -> tuple[web.AppRunner, str]:
+    """Start the fake server in the running loop; returns (runner, base URL)."""
+    runner = web.AppRunner(make_app(store))
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{bound}"
+
+
+def synthetic_rows(n: int, seed: int = 0) -> list[dict]:
+    rnd = random.Random(seed)
+    return [
+        {
+            "name": f"member{i:07d}",
+            "sing": rnd.randint(0, 600),
+            "dance": rnd.randint(0, 600),
+            "rally": round(rnd.uniform(0, 20), 2)
+        }
+        for i in range(n)
+    ]
+
+
+# ─── CLI ────────────────────────────────────────────────────────────────────────
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Fake PostgREST for local runs")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=54321)
+    ap.add_argument("--seed", help="JSON array of stats rows to preload")
+    ap.add_argument("--rows", type=int, default=0, help="generate N synthetic stats rows")
+    ap.add_argument("--editor", type=int, action="append", default=[], help="Discord ID with editor rights")
+    ap.add_argument("--latency", type=float, default=0.0, help="added latency per request (ms)")
+    ap.add_argument("--jitter", type=float, default=0.0, help="random extra latency up to (ms)")
+    args = ap.parse_args()
+
+    store = FakeStore(args.latency / 1000, args.jitter / 1000)
+    if args.seed:
+        with open(args.seed, "r", encoding="utf-8") as f:
+            store.seed("stats", json.load(f))
+    elif args.rows:
+        store.seed("stats", synthetic_rows(args.rows))
+    store.seed("stats_editors_rights", [
+        {"discord_id": i, "discord_name": f"editor{i}"} for i in args.editor
+    ])
+
+    print(f"Fake PostgREST on http://{args.host}:{args.port}/rest/v1 "
+          f"({len(store.tables['stats'])} stats rows)")
+    web.run_app(make_app(store), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
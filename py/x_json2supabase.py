@@ -1,32 +1,173 @@
-import json
-import os
+# py/x_json2supabase.py
+"""
+Bulk-import stats rows into Supabase.
+
+Streams a JSON array or JSON Lines file, sends chunked bulk upserts
+(conflicts on `name` are merged) over a pooled session with a bounded number
+of requests in flight, and records progress in a checkpoint file so an
+interrupted import resumes where it stopped.
+
+    python -m py.x_json2supabase stats.json --chunk 500 --concurrency 4
+    python -m py.x_json2supabase export.jsonl --restart
+"""
+import os, sys, json, time, random, argparse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from py.rowstream import iter_json_rows
+
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY") or os.getenv("SUPABASE_KEY")
+
+RETRIES = 4
+
+
+# ─── Checkpoint ─────────────────────────────────────────────────────────────────
+def _fingerprint(path: str) -> dict:
+    st = os.stat(path)
+    return {"source": os.path.abspath(path), "size": st.st_size, "mtime": st.st_mtime_ns}
+
+
+def load_checkpoint(path: str, source: str) -> int:
+    """Rows already committed for this exact source file (0 if none or stale)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            ckpt = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return 0
+    if {k: ckpt.get(k) for k in ("source", "size", "mtime")} != _fingerprint(source):
+        print("⚠️ Checkpoint belongs to another version of the input, starting over")
+        return 0
+    return int(ckpt.get("rows_done", 0))
+
+
+def save_checkpoint(path: str, source: str, rows_done: int) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({**_fingerprint(source), "rows_done": rows_done}, f)
+    os.replace(tmp, path)
+
+
+# ─── Upload ─────────────────────────────────────────────────────────────────────
+class Uploader:
+    def __init__(self, url: str, key: str, table: str, on_conflict: str, concurrency: int):
+        self.endpoint = f"{url.rstrip('/')}/rest/v1/{table}"
+        self.on_conflict = on_conflict
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "apikey": key,
+            "Authorization": f"Bearer {key}",
+            "Content-Type": "application/json",
+            # merge on conflict, keep column defaults for keys a row lacks
+            "Prefer": "resolution=merge-duplicates,missing=default,return=minimal",
+        })
+
+    def upsert(self, rows: list[dict]) -> None:
+        rows = [r for r in rows if isinstance(r, dict) and r.get(self.on_conflict) is not None]
+        if not rows:
+            return
+        columns = sorted({k for r in rows for k in r})
+        params = {"on_conflict": self.on_conflict, "columns": ",".join(columns)}
+        for attempt in range(RETRIES + 1):
+            try:
+                resp = self.session.post(self.endpoint, params=params, json=rows, timeout=30)
+            except requests.RequestException as exc:
+                error = str(exc)
+            else:
+                if resp.status_code in (200, 201, 204):
+                    return
+                error = f"HTTP {resp.status_code}: {resp.text[:300]}"
+                if resp.status_code < 500 and resp.status_code != 429:
+                    break  # bad data, retrying won't help
+            if attempt < RETRIES:
+                time.sleep(min(8.0, 0.5 * 2 ** attempt) * (0.5 + random.random()))
+        raise RuntimeError(error)
+
+
+def chunks(rows, size: int):
+    it = iter(rows)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+def run_import(args) -> int:
+    uploader = Uploader(SUPABASE_URL, SUPABASE_KEY, args.table, args.on_conflict, args.concurrency)
+    ckpt_path = args.checkpoint or args.input + ".ckpt"
+    skip = 0 if args.restart else load_checkpoint(ckpt_path, args.input)
+    if skip:
+        print(f"↪️ Resuming after {skip} committed rows")
+
+    started = time.perf_counter()
+    sent = 0
+    done_upto = skip            # rows committed contiguously from the start
+    finished: dict[int, int] = {}   # chunk start offset -> end offset, committed out of order
+    inflight = {}
+
+    def settle(futures) -> None:
+        nonlocal sent, done_upto
+        for fut in futures:
+            start, end = inflight.pop(fut)
+            fut.result()    # re-raise the chunk's error
+            sent += end - start
+            finished[start] = end
+        while done_upto in finished:
+            done_upto = finished.pop(done_upto)
+        save_checkpoint(ckpt_path, args.input, done_upto)
+        rate = sent / max(time.perf_counter() - started, 1e-9)
+        print(f"… {done_upto} rows committed ({rate:,.0f} rows/s)", end="\r", flush=True)
 
+    with open(args.input, "r", encoding="utf-8") as f, \
+         ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        rows = islice(iter_json_rows(f), skip, None)
+        offset = skip
+        try:
+            for batch in chunks(rows, args.chunk):
+                if len(inflight) >= args.concurrency:
+                    done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                    settle(done)
+                fut = pool.submit(uploader.upsert, batch)
+                inflight[fut] = (offset, offset + len(batch))
+                offset += len(batch)
+            if inflight:
+                settle(wait(inflight).done)
+        except (Exception, KeyboardInterrupt) as exc:
+            if inflight:
+                done, _ = wait(inflight)
+                settle([fut for fut in done if fut.exception() is None])
+            print(f"\n❌ Import stopped at {done_upto} rows: {exc or type(exc).__name__}")
+            print(f"   Re-run the same command to resume from {ckpt_path}")
+            return 1
 
-# SUPABASE_URL = os.getenv("SUPABASE_URL")
-# SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+    elapsed = time.perf_counter() - started
+    print(f"\n✅ Imported {sent} rows in {elapsed:.1f}s ({sent / max(elapsed, 1e-9):,.0f} rows/s)")
+    if os.path.exists(ckpt_path):
+        os.remove(ckpt_path)
+    return 0
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    print("❌ Missing SUPABASE_URL or SUPABASE_KEY")
-    exit(1)
 
-# Load local JSON data
-with open("stats.json", "r", encoding="utf-8") as f:
-    data = json.load(f)
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Stream JSON/JSONL rows into a Supabase table")
+    ap.add_argument("input", nargs="?", default="stats.json", help="JSON array or JSON Lines file")
+    ap.add_argument("--table", default="stats")
+    ap.add_argument("--on-conflict", default="name", help="unique column used to merge duplicates")
+    ap.add_argument("--chunk", type=int, default=500, help="rows per upsert request")
+    ap.add_argument("--concurrency", type=int, default=4, help="requests in flight")
+    ap.add_argument("--checkpoint", help="progress file (default: <input>.ckpt)")
+    ap.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    args = ap.parse_args()
 
-headers = {
-    "apikey": SUPABASE_KEY,
-    "Authorization": f"Bearer {SUPABASE_KEY}",
-    "Content-Type": "application/json",
-}
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        print("❌ Missing SUPABASE_URL or SUPABASE_SERVICE_ROLE_KEY")
+        return 1
+    return run_import(args)
 
-url = f"{SUPABASE_URL}/rest/v1/stats"
 
-for row in data:
-    response = requests.post(url, headers=headers, json=row)
-    if response.status_code in [200, 201, 204]:
-        print(f"✅ Inserted: {row['name']}")
-    elif response.status_code == 409:
-        print(f"⚠️ Already exists: {row['name']}")
-    else:
-        print(f"❌ Error inserting {row['name']}: {response.text}")
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+# tests/conftest.py
+"""
+Shared fixtures. Run with `pytest` from the repo root (`python -m pytest`
+would put the repo first on sys.path before pytest imports its own `py`).
+
+Supabase is replaced by py/x_fake_postgrest.py on a free local port; the
+environment points the clients in py/helpers.py at it before anything from
+py/ is imported, so no test can reach a real project.
+"""
+import os, sys, socket, asyncio, threading
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# pytest's pylib shim is also called `py` and shadows this repo's package
+if not hasattr(sys.modules.get("py"), "__path__"):
+    sys.modules.pop("py", None)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+FAKE_PORT = _free_port()
+os.environ.update(
+    SUPABASE_URL=f"http://127.0.0.1:{FAKE_PORT}",
+    SUPABASE_ANON_KEY="test.anon.key",
+    SUPABASE_SERVICE_ROLE_KEY="test.service.key",
+    LOG_FILE="",
+)
+
+
+# ─── Fake PostgREST ─────────────────────────────────────────────────────────────
+@pytest.fixture(scope="session")
+def fake_server():
+    """The fake server, running on its own loop in a background thread."""
+    from py.x_fake_postgrest import FakeStore, start
+
+    store = FakeStore()
+    loop = asyncio.new_event_loop()
+    runner, _ = loop.run_until_complete(start(store, port=FAKE_PORT))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield store
+    asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+
+
+@pytest.fixture
+def store(fake_server):
+    """The fake server's tables, emptied for each test."""
+    fake_server.seed("stats", [])
+    fake_server.seed("stats_editors_rights", [])
+    return fake_server
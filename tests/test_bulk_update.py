@@ -0,0 +1,23 @@
+# tests/test_bulk_update.py
+import pytest
+
+from commands.bulk_update import plan_changes
+from py.snapshot import StatsSnapshot
+
+SNAP = StatsSnapshot([{"name": "a", "sing": 1, "dance": 2, "rally": 1.5}])
+
+
+def test_only_changed_fields_are_planned():
+    changes, diff, problems, unchanged = plan_changes(
+        [{"name": "a", "sing": "1", "rally": "2.25"}, {"name": "a", "dance": 2}], SNAP
+    )
+    assert changes == {"a": {"rally": 2.25}} and unchanged == 1 and not problems
+    assert diff == ["a: rally 1.5→2.25"]
+
+
+@pytest.mark.parametrize("value", ["nan", "NaN", "inf", "-inf", "Infinity", float("nan"), float("inf")])
+@pytest.mark.parametrize("field", ["sing", "rally"])
+def test_non_finite_numbers_are_rejected(field, value):
+    changes, diff, problems, _ = plan_changes([{"name": "a", field: value}], SNAP)
+    assert not changes and not diff
+    assert problems == ["row 1: invalid number for `a`"]
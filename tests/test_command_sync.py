@@ -0,0 +1,71 @@
+# tests/test_command_sync.py
+import asyncio
+
+import discord
+import pytest
+from discord import app_commands
+
+from py import command_sync
+from py.command_sync import sync_commands, tree_hash
+
+
+def _tree(*names: str) -> app_commands.CommandTree:
+    tree = app_commands.CommandTree(discord.Client(intents=discord.Intents.none()))
+    for name in names:
+        async def cb(interaction: discord.Interaction, value: int = 1):
+            pass
+        tree.add_command(app_commands.Command(name=name, description=f"{name} command", callback=cb))
+    return tree
+
+
+@pytest.fixture
+def synced(monkeypatch, tmp_path):
+    """Hash file in tmp_path; returns the list of trees tree.sync() was called for."""
+    monkeypatch.setattr(command_sync, "COMMAND_HASH_FILE", str(tmp_path / "hashes.json"))
+    monkeypatch.setattr(command_sync, "COMMAND_SYNC", "auto")
+    calls = []
+
+    async def fake_sync(self, *, guild=None):
+        calls.append(self)
+        return self.get_commands(guild=guild)
+
+    monkeypatch.setattr(app_commands.CommandTree, "sync", fake_sync)
+    return calls
+
+
+def _sync(tree) -> bool:
+    return asyncio.run(sync_commands(tree.client, tree))
+
+
+def test_hash_ignores_registration_order():
+    assert tree_hash(_tree("a", "b")) == tree_hash(_tree("b", "a"))
+    assert tree_hash(_tree("a", "b")) != tree_hash(_tree("a", "c"))
+
+
+def test_unchanged_tree_skips_the_sync(synced):
+    assert _sync(_tree("ping", "show")) is True
+    assert _sync(_tree("show", "ping")) is False
+    assert len(synced) == 1
+    assert _sync(_tree("ping", "show", "rank")) is True
+    assert len(synced) == 2
+
+
+def test_modes_and_broken_hash_files(synced, monkeypatch, tmp_path):
+    _sync(_tree("ping"))
+    (tmp_path / "hashes.json").write_text("[1, 2]")
+    assert _sync(_tree("ping")) is True            # unreadable state: sync to be safe
+    monkeypatch.setattr(command_sync, "COMMAND_SYNC", "always")
+    assert _sync(_tree("ping")) is True
+    monkeypatch.setattr(command_sync, "COMMAND_SYNC", "off")
+    assert _sync(_tree("other")) is False
+    assert len(synced) == 3
+
+
+def test_failed_sync_stores_no_hash(synced, monkeypatch, tmp_path):
+    async def failing(self, *, guild=None):
+        raise discord.HTTPException(type("R", (), {"status": 500, "reason": "x"})(), "boom")
+
+    monkeypatch.setattr(app_commands.CommandTree, "sync", failing)
+    with pytest.raises(discord.HTTPException):
+        _sync(_tree("ping"))
+    assert not (tmp_path / "hashes.json").exists()
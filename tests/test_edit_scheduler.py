@@ -0,0 +1,156 @@
+# tests/test_edit_scheduler.py
+import time, asyncio
+from types import SimpleNamespace
+
+import discord
+
+from py.edit_scheduler import EditScheduler, RenderError, RENDER_FAILED
+
+
+class Message:
+    def __init__(self, message_id: int = 1):
+        self.id = message_id
+        self.edits: list[dict] = []
+
+    async def edit(self, **edit):
+        self.edits.append(edit)
+
+
+class Click:
+    """Fake component interaction on `message`; records what reached Discord."""
+    def __init__(self, message: Message, expired: bool = False, fail: list | None = None):
+        self.message = message
+        self.expired = expired
+        self.fail = fail if fail is not None else []   # exceptions raised by the next edits
+        self.followups: list[str] = []
+        self.response = SimpleNamespace(defer=self._defer)
+        self.followup = SimpleNamespace(send=self._send)
+
+    async def _defer(self):
+        if self.expired:
+            raise discord.NotFound(SimpleNamespace(status=404, reason="Not Found"), "Unknown interaction")
+
+    async def _send(self, text, ephemeral=False):
+        assert ephemeral
+        self.followups.append(text)
+
+    async def edit_original_response(self, **edit):
+        if self.fail:
+            raise self.fail.pop(0)
+        self.message.edits.append(edit)
+
+
+def _render(content: str, calls: list | None = None):
+    async def render():
+        if calls is not None:
+            calls.append(content)
+        return {"content": content, "view": None}
+    return render
+
+
+def test_rapid_clicks_coalesce_into_one_render():
+    async def run():
+        sched, msg, calls = EditScheduler(rate=100, burst=3), Message(), []
+        for page in ("1", "2", "3"):
+            await sched.submit(Click(msg), _render(page, calls))
+        await sched.drain()
+        return msg, calls
+
+    msg, calls = asyncio.run(run())
+    assert calls == ["3"] and [e["content"] for e in msg.edits] == ["3"]
+
+
+def test_unchanged_content_is_not_sent_again():
+    async def run():
+        sched, msg = EditScheduler(rate=100, burst=3), Message()
+        for page in ("1", "1", "2", "2"):
+            await sched.submit(Click(msg), _render(page))
+            await sched.drain()
+        return msg
+
+    assert [e["content"] for e in asyncio.run(run()).edits] == ["1", "2"]
+
+
+def test_bucket_spaces_edits_after_the_burst():
+    async def run():
+        sched, msg = EditScheduler(rate=10, burst=1), Message()
+        started = time.monotonic()
+        for page in ("1", "2", "3"):
+            await sched.submit(Click(msg), _render(page))
+            await sched.drain()
+        return msg, time.monotonic() - started
+
+    msg, elapsed = asyncio.run(run())
+    assert len(msg.edits) == 3 and elapsed >= 0.18   # two waits of 1/rate
+
+
+def test_messages_have_separate_buckets():
+    async def run():
+        sched = EditScheduler(rate=0.01, burst=1)
+        a, b = Message(1), Message(2)
+        await sched.submit(Click(a), _render("x"))
+        await sched.submit(Click(b), _render("y"))
+        await asyncio.wait_for(sched.drain(), 1)
+        return a, b
+
+    a, b = asyncio.run(run())
+    assert len(a.edits) == len(b.edits) == 1
+
+
+def test_rate_limited_edit_pauses_and_yields_to_a_newer_click():
+    async def run():
+        sched, msg, calls = EditScheduler(rate=100, burst=3), Message(), []
+        await sched.submit(Click(msg, fail=[discord.RateLimited(0.1)]), _render("1", calls))
+        await asyncio.sleep(0.02)                    # the 429 arrived, the bucket is paused
+        assert msg.edits == []
+        await sched.submit(Click(msg), _render("2", calls))
+        started = time.monotonic()
+        await sched.drain()
+        return msg, calls, time.monotonic() - started
+
+    msg, calls, waited = asyncio.run(run())
+    assert calls == ["1", "2"]                       # the re-queued "1" was replaced
+    assert [e["content"] for e in msg.edits] == ["2"]
+    assert waited >= 0.05
+
+
+def test_rate_limited_edit_is_retried():
+    async def run():
+        sched, msg = EditScheduler(rate=100, burst=3), Message()
+        await sched.submit(Click(msg, fail=[discord.RateLimited(0.05)]), _render("1"))
+        await sched.drain()
+        return msg
+
+    assert [e["content"] for e in asyncio.run(run()).edits] == ["1"]
+
+
+def test_render_errors_are_told_to_the_user():
+    async def boom():
+        raise RenderError("❌ Could not fetch data. Please try again later.")
+
+    async def crash():
+        raise KeyError("bug")
+
+    async def run():
+        sched, msg = EditScheduler(), Message()
+        clicks = [Click(msg), Click(msg), Click(msg, expired=True)]
+        for click, render in zip(clicks, (boom, crash, boom)):
+            await sched.submit(click, render)
+            await sched.drain()
+        return msg, clicks
+
+    msg, clicks = asyncio.run(run())
+    assert clicks[0].followups == ["❌ Could not fetch data. Please try again later."]
+    assert clicks[1].followups == [RENDER_FAILED]
+    assert clicks[2].followups == []                 # no token left to answer with
+    assert msg.edits == []
+
+
+def test_expired_click_edits_the_message_directly():
+    async def run():
+        sched, msg = EditScheduler(), Message()
+        await sched.submit(Click(msg, expired=True), _render("1"))
+        await sched.drain()
+        return msg
+
+    assert [e["content"] for e in asyncio.run(run()).edits] == ["1"]
@@ -0,0 +1,110 @@
+# tests/test_keyset.py
+import asyncio
+
+import pytest
+
+from py import db
+from py.db import _pg_literal, _seek_filter
+from py.edit_scheduler import RenderError
+from py.paginator import KeysetPageButton
+
+ROWS = [
+    {"name": "ann", "sing": 5, "dance": None, "rally": 1.5},
+    {"name": "Bob", "sing": 5, "dance": 2, "rally": None},
+    {"name": 'quote"d', "sing": None, "dance": 2, "rally": 1.5},
+    {"name": "comma,name", "sing": 3, "dance": None, "rally": 0},
+    {"name": "back\\slash", "sing": 5, "dance": 7, "rally": 2},
+    {"name": "(paren)", "sing": None, "dance": 1, "rally": None},
+    {"name": "zed", "sing": 9, "dance": 2, "rally": 1.5},
+]
+
+
+def _expected(column: str, desc: bool) -> list[str]:
+    """The order fetch_stats_page promises: missing values lowest, then name."""
+    if column == "name":
+        return sorted((r["name"] for r in ROWS), reverse=desc)
+    present = sorted((r for r in ROWS if r[column] is not None), key=lambda r: r["name"])
+    present.sort(key=lambda r: r[column], reverse=desc)
+    missing = sorted((r for r in ROWS if r[column] is None), key=lambda r: r["name"])
+    ordered = present + missing if desc else missing + present
+    return [r["name"] for r in ordered]
+
+
+def _key(row: dict, column: str) -> tuple:
+    return (row.get(column) if column != "name" else None, row["name"])
+
+
+def test_pg_literal_quotes_strings_only():
+    assert _pg_literal(12) == "12"
+    assert _pg_literal(1.5) == "1.5"
+    assert _pg_literal('a"b\\c') == '"a\\"b\\\\c"'
+
+
+def test_seek_filter_shapes():
+    assert _seek_filter("name", False, False, False, (None, "bo")) == 'name.gt."bo"'
+    assert _seek_filter("sing", True, True, False, (5, "x")) == (
+        'sing.lt.5,and(sing.eq.5,name.gt."x"),sing.is.null'
+    )
+    assert _seek_filter("sing", False, False, False, (None, "x")) == (
+        'and(sing.is.null,name.gt."x"),sing.not.is.null'
+    )
+
+
+@pytest.mark.parametrize("column", ["name", "sing", "dance", "rally"])
+@pytest.mark.parametrize("desc", [False, True])
+def test_keyset_walk_matches_full_order(store, column, desc):
+    store.seed("stats", ROWS)
+    sort_by = None if column == "name" and not desc else column
+    per_page = 2
+
+    async def walk():
+        forward, key = [], None
+        while True:
+            rows = await db.fetch_stats_page(sort_by, desc, per_page, after=key)
+            forward += [r["name"] for r in rows]
+            if len(rows) < per_page:
+                break
+            key = _key(rows[-1], column)
+
+        backward, key = [], _key(next(r for r in ROWS if r["name"] == forward[-1]), column)
+        backward.insert(0, forward[-1])
+        while True:
+            rows = await db.fetch_stats_page(sort_by, desc, per_page, before=key)
+            backward[:0] = [r["name"] for r in rows]
+            if len(rows) < per_page:
+                break
+            key = _key(rows[0], column)
+        return forward, backward
+
+    forward, backward = asyncio.run(walk())
+    expected = _expected(column, desc if sort_by else False)
+    assert forward == expected
+    assert backward == expected
+
+
+def test_offset_jump_matches_keyset(store):
+    store.seed("stats", ROWS)
+
+    async def run():
+        return await db.fetch_stats_page("sing", True, 3, offset=3)
+
+    assert [r["name"] for r in asyncio.run(run())] == _expected("sing", True)[3:6]
+
+
+def test_next_page_after_deleted_rows_falls_back_to_offset(store):
+    store.seed("stats", ROWS)
+    # The key of a row past the end (deleted since): seeking finds nothing
+    button = KeysetPageButton("n", 2, "name", False, "compact", ("~", "~"))
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("py.paginator.ROWS_PER_PAGE", 3)
+        edit = asyncio.run(button.render())
+    assert all(name in edit["content"] for name in _expected("name", False)[3:6])
+    assert edit["view"].page == 2
+
+
+def test_next_page_of_an_emptied_table_is_reported(store):
+    button = KeysetPageButton("n", 2, "name", False, "compact", ("x", "x"))
+    with pytest.raises(RenderError):
+        asyncio.run(button.render())
+    with pytest.raises(RenderError):
+        asyncio.run(KeysetPageButton("p", 1, "name", False, "compact", None).render())
@@ -0,0 +1,58 @@
+# tests/test_paginator.py
+import asyncio
+
+import pytest
+
+from py.paginator import TablePageButton, KeysetPageButton, CUSTOM_ID_LIMIT
+
+
+def _parse(cls, custom_id: str):
+    """What discord.py does with a click: match the template, rebuild the item."""
+    match = cls.__discord_ui_compiled_template__.fullmatch(custom_id)
+    assert match is not None, custom_id
+    return asyncio.run(cls.from_custom_id(None, None, match))
+
+
+@pytest.mark.parametrize("sort_by, desc, layout", [("sing", True, "compact"), (None, False, "spaced")])
+def test_table_button_round_trip(sort_by, desc, layout):
+    button = TablePageButton("n", 3, sort_by, desc, layout, 42)
+    assert button.custom_id == f"tbl:n:3:{sort_by or ''}:{'d' if desc else 'a'}:{layout}:42"
+    back = _parse(TablePageButton, button.custom_id)
+    assert (back.role, back.page, back.sort_by, back.sort_desc, back.layout, back.version) == \
+           ("n", 3, sort_by, desc, layout, 42)
+
+
+def test_unknown_sort_and_layout_fall_back_to_defaults():
+    back = _parse(TablePageButton, "tbl:p:1:evil:d:weird:7")
+    assert back.sort_by is None and back.layout == "compact"
+
+
+@pytest.mark.parametrize("key", [
+    (5, "ann"), (None, "Bob"), (1.5, 'quo"te:with:colons'), ("x", "ünï ✨"), (0, ""),
+])
+def test_keyset_button_round_trip(key):
+    button = KeysetPageButton("p", 2, "sing", False, "compact", key)
+    assert len(button.custom_id) <= CUSTOM_ID_LIMIT
+    back = _parse(KeysetPageButton, button.custom_id)
+    assert (back.role, back.page, back.sort_by, back.sort_desc) == ("p", 2, "sing", False)
+    assert back.key == key
+
+
+def test_keyset_key_too_long_for_custom_id_is_dropped():
+    key = (1, "n" * 90)
+    button = KeysetPageButton("n", 4, "rally", True, "spaced", key)
+    assert len(button.custom_id) <= CUSTOM_ID_LIMIT
+    assert button.key is None
+    back = _parse(KeysetPageButton, button.custom_id)
+    assert back.key is None and back.page == 4   # served by OFFSET instead
+
+
+def test_keyset_key_at_the_limit_is_kept():
+    prefix = len("ks:n:4:rally:d:compact:")
+    name = "n" * (CUSTOM_ID_LIMIT - prefix - len('[1,""]'))
+    button = KeysetPageButton("n", 4, "rally", True, "compact", (1, name))
+    assert len(button.custom_id) == CUSTOM_ID_LIMIT and button.key == (1, name)
+
+
+def test_garbled_key_reads_as_no_key():
+    assert _parse(KeysetPageButton, "ks:n:2:sing:a:compact:[not json").key is None
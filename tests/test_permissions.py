@@ -0,0 +1,146 @@
+# tests/test_permissions.py
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from py import db, permissions
+from py.permissions import PermissionCache
+from py.resilience import CircuitOpenError
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeEditors:
+    """Stands in for db.editor_exists / db.fetch_editors."""
+    def __init__(self, editors=()):
+        self.editors = set(editors)
+        self.lookups: list[int] = []
+        self.error: Exception | None = None
+
+    async def exists(self, user_id: int) -> bool:
+        self.lookups.append(user_id)
+        await asyncio.sleep(0)
+        if self.error is not None:
+            raise self.error
+        return user_id in self.editors
+
+    async def fetch(self, columns: str = "") -> list[dict]:
+        if self.error is not None:
+            raise self.error
+        return [{"discord_id": i} for i in self.editors]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(permissions, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+@pytest.fixture
+def editors(monkeypatch):
+    fake = FakeEditors({1})
+    monkeypatch.setattr(db, "editor_exists", fake.exists)
+    monkeypatch.setattr(db, "fetch_editors", fake.fetch)
+    return fake
+
+
+def _check(cache: PermissionCache, user_id: int) -> bool:
+    return asyncio.run(cache.is_editor(user_id))
+
+
+def test_grants_and_denials_have_their_own_ttl(clock, editors):
+    cache = PermissionCache(ttl=300, deny_ttl=60)
+    assert _check(cache, 1) is True and _check(cache, 2) is False
+    assert editors.lookups == [1, 2]
+    clock.now += 59
+    assert _check(cache, 1) and not _check(cache, 2)
+    assert editors.lookups == [1, 2] and cache.hits == 2
+    clock.now += 2                                   # the denial expired, the grant did not
+    assert _check(cache, 1) and not _check(cache, 2)
+    assert editors.lookups == [1, 2, 2]
+    clock.now += 300
+    _check(cache, 1)
+    assert editors.lookups == [1, 2, 2, 1]
+
+
+def test_concurrent_checks_share_one_lookup(clock, editors):
+    cache = PermissionCache()
+
+    async def run():
+        return await asyncio.gather(*(cache.is_editor(1) for _ in range(5)))
+
+    assert asyncio.run(run()) == [True] * 5
+    assert editors.lookups == [1]
+
+
+def test_failed_lookup_is_not_cached(clock, editors):
+    cache = PermissionCache()
+    editors.error = ConnectionError("down")
+    assert _check(cache, 1) is False
+    editors.error = None
+    assert _check(cache, 1) is True
+    assert editors.lookups == [1, 1]
+
+
+def test_complete_list_denies_unknown_ids_for_deny_ttl(clock, editors):
+    cache = PermissionCache(ttl=300, deny_ttl=60)
+    asyncio.run(cache.warm())
+    assert _check(cache, 1) and not _check(cache, 2)
+    assert editors.lookups == []                     # both answered from the list
+    clock.now += 61
+    assert not _check(cache, 2)
+    assert editors.lookups == [2]                    # the list no longer proves absence
+
+
+def test_failed_warm_keeps_asking(clock, editors):
+    cache = PermissionCache()
+    editors.error = ConnectionError("down")
+    asyncio.run(cache.warm())
+    editors.error = None
+    assert not _check(cache, 2) and editors.lookups == [2]
+
+
+def test_seed_is_complete_only_for_deny_ttl(clock, editors):
+    cache = PermissionCache(ttl=300, deny_ttl=60)
+    cache.seed([5])
+    assert _check(cache, 5) and not _check(cache, 6) and editors.lookups == []
+    clock.now += 61
+    _check(cache, 6)
+    assert editors.lookups == [6]
+
+
+@pytest.mark.parametrize("error", [ConnectionError("down"), CircuitOpenError("open")])
+def test_expired_entry_is_served_for_one_more_ttl_when_supabase_fails(clock, editors, error):
+    cache = PermissionCache(ttl=300, deny_ttl=60)
+    assert _check(cache, 1) and not _check(cache, 2)
+    editors.error = error
+    editors.editors.clear()                          # would be revoked, if we could ask
+    clock.now += 300 + 59
+    assert _check(cache, 1) is True                  # expired 59s ago: still trusted
+    clock.now += 2
+    assert _check(cache, 1) is True                  # 61s: within one grant TTL
+    assert _check(cache, 2) is False
+    clock.now += 300
+    assert _check(cache, 1) is False                 # more than one TTL past expiry
+    assert cache.editor_ids() == [1]                 # a failure never overwrites the entry
+
+
+def test_grant_revoke_and_invalidate(clock, editors):
+    cache = PermissionCache()
+    published = []
+    cache.subscribe(lambda: published.append(1))
+    cache.grant(7)
+    assert _check(cache, 7)
+    cache.revoke(7)
+    assert not _check(cache, 7) and editors.lookups == []
+    cache.invalidate(7)
+    assert not _check(cache, 7) and editors.lookups == [7]
+    assert len(published) == 2
@@ -0,0 +1,72 @@
+# tests/test_ranking.py
+import random
+from array import array
+
+import pytest
+
+from py import ranking
+from py.ranking import SortedValues, RankIndex
+from py.snapshot import StatsSnapshot
+
+
+@pytest.fixture
+def small_buckets(monkeypatch):
+    """Buckets of 4 values, so a few dozen operations split and empty them."""
+    monkeypatch.setattr(ranking, "BUCKET_SIZE", 4)
+
+
+def _check(values: SortedValues, model: list[float]) -> None:
+    assert len(values) == len(model)
+    for probe in sorted(set(model)) + [-1.0, 0.5, 1e9]:
+        assert values.count_greater(probe) == sum(v > probe for v in model), probe
+
+
+def test_sorted_values_match_a_plain_list(small_buckets):
+    rnd = random.Random(5)
+    model = sorted(float(rnd.randint(0, 20)) for _ in range(30))
+    values = SortedValues(array("d", model))
+    _check(values, model)
+    for _ in range(400):
+        if model and rnd.random() < 0.45:
+            v = rnd.choice(model)
+            model.remove(v)
+            assert values.remove(v)
+        else:
+            v = float(rnd.randint(-5, 25))
+            model.append(v)
+            values.add(v)
+        _check(values, model)
+
+
+def test_remove_missing_value_is_a_no_op(small_buckets):
+    values = SortedValues(array("d", [1.0, 2.0, 2.0, 3.0]))
+    assert not values.remove(2.5)
+    assert not values.remove(9.0)
+    assert values.remove(2.0) and values.count_greater(1.0) == 2
+
+
+def test_empty_multiset():
+    values = SortedValues()
+    assert len(values) == 0 and values.count_greater(0.0) == 0
+    values.add(1.5)
+    assert values.count_greater(1.0) == 1 and values.count_greater(1.5) == 0
+
+
+def test_rank_index_follows_patches(small_buckets):
+    rows = [{"name": f"m{i}", "sing": i % 7, "dance": None if i % 3 == 0 else i, "rally": 1} for i in range(40)]
+    index = RankIndex()
+    snap = StatsSnapshot(rows)
+    index.rebuild(snap)
+
+    patched = snap.with_upserts([{"name": "m1", "sing": 100}, {"name": "new", "sing": 3, "dance": 1}])
+    index.on_change(snap, patched, "upsert", [{"name": "m1"}, {"name": "new"}])
+    smaller = patched.without(["m2", "m3"])
+    index.on_change(patched, smaller, "delete", ["m2", "m3"])
+    assert index.version == smaller.version and index.rebuilds == 1
+
+    fresh = RankIndex()
+    for name in ("m1", "new", "m4", "m9"):
+        assert index.rank(smaller, name) == fresh.rank(smaller, name)
+    assert index.rank(smaller, "m1")["sing"] == (1, len(smaller))
+    assert "dance" not in index.rank(smaller, "m9")   # NULL is not ranked
+    assert index.rank(smaller, "m2") is None
@@ -0,0 +1,59 @@
+# tests/test_render.py
+import pytest
+
+from py.render import PageLayout, PageCache, MESSAGE_LIMIT, NAME_MAX_WIDTH, LABELS
+from py.snapshot import StatsSnapshot
+
+
+def _snapshot(n: int, name_len: int = 8) -> StatsSnapshot:
+    return StatsSnapshot([
+        {"name": f"m{i:0{name_len - 1}d}", "sing": i * 7919 % 100000, "dance": None if i % 5 else i,
+         "rally": round(i / 7, 2)}
+        for i in range(n)
+    ])
+
+
+@pytest.mark.parametrize("spaced", [False, True])
+@pytest.mark.parametrize("name_len", [1, 8, 60])
+def test_full_pages_fit_the_message_limit(spaced, name_len):
+    snap = _snapshot(500, name_len)
+    layout = PageLayout.for_snapshot(snap, "spaced" if spaced else "compact")
+    for page in range(1, snap.page_count(layout.per_page) + 1):
+        block = layout.block(snap.page_rows("sing", True, page, layout.per_page))
+        assert len(block) <= MESSAGE_LIMIT
+        assert block.startswith("```") and block.endswith("```")
+    # Packing is tight: one more row would not be guaranteed to fit
+    worst = len(layout.sep) + 1 + (1 if spaced else 0)
+    assert len(layout.block([])) + (layout.per_page + 1) * worst > MESSAGE_LIMIT
+
+
+def test_long_names_are_cut_to_the_column():
+    layout = PageLayout({"name": 100, "sing": 3, "dance": 1, "rally": 4})
+    assert layout.widths["name"] == NAME_MAX_WIDTH
+    line = layout.line({"name": "x" * 100, "sing": 1, "dance": None, "rally": 2.5})
+    assert line.split(" | ")[0] == "x" * (NAME_MAX_WIDTH - 1) + "…"
+
+
+def test_columns_are_at_least_as_wide_as_their_labels():
+    layout = PageLayout({})
+    assert all(layout.widths[c] == len(label) for c, label in LABELS.items())
+    assert layout.header.split(" | ")[1].strip() == LABELS["sing"]
+
+
+def test_for_rows_fits_given_rows():
+    rows = [{"name": "alpha", "sing": 123456, "dance": 1.25, "rally": None}]
+    layout = PageLayout.for_rows(rows)
+    assert layout.widths["sing"] == len(LABELS["sing"]) and layout.widths["dance"] == len(LABELS["dance"])
+    assert "123456" in layout.block(rows) and "1.25" in layout.block(rows)
+
+
+def test_page_cache_serves_hits_and_drops_old_versions():
+    cache = PageCache(maxsize=4)
+    snap = _snapshot(100)
+    first = cache.render(snap, "sing", True, 1)
+    assert cache.render(snap, "sing", True, 1) is first and cache.hits == 1
+    assert cache.render(snap, "sing", True, 99) is None
+
+    newer = snap.with_upserts([{"name": snap.name(0), "sing": 1}])
+    cache.render(newer, "sing", True, 1)
+    assert len(cache) == 1
@@ -0,0 +1,164 @@
+# tests/test_resilience.py
+import time, asyncio
+
+import httpx
+import pytest
+from postgrest.exceptions import APIError
+
+from py import db
+from py.resilience import (
+    CircuitBreaker, CircuitOpenError, HedgeBudget, LatencyWindow, is_transient, LATENCY_MIN
+)
+
+
+def _api(code: str) -> APIError:
+    return APIError({"code": code, "message": "x"})
+
+
+# ─── is_transient ───────────────────────────────────────────────────────────────
+@pytest.mark.parametrize("exc", [
+    asyncio.TimeoutError(), ConnectionResetError(), OSError("no route"),
+    httpx.ConnectError("refused"), httpx.ReadTimeout("slow"),
+    _api("500"), _api("503"), _api("429"),
+    _api("08006"), _api("53300"), _api("57014"),
+    _api("PGRST000"), _api("PGRST001"), _api("PGRST002"), _api("PGRST003"),
+])
+def test_transient_errors(exc):
+    assert is_transient(exc)
+
+
+@pytest.mark.parametrize("exc", [
+    _api("400"), _api("401"), _api("404"), _api("409"),
+    _api("23505"), _api("42P01"), _api("22P02"), _api("PGRST116"), _api("PGRST204"),
+    APIError({"message": "no code"}), ValueError("bad"), KeyError("name"),
+])
+def test_permanent_errors(exc):
+    assert not is_transient(exc)
+
+
+# ─── CircuitBreaker ─────────────────────────────────────────────────────────────
+def _open(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.failures):
+        breaker.before()
+        breaker.failure(asyncio.TimeoutError())
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failures=3, cooldown=60)
+    breaker.failure(asyncio.TimeoutError())
+    breaker.failure(asyncio.TimeoutError())
+    breaker.success()                       # the streak starts over
+    breaker.failure(asyncio.TimeoutError())
+    breaker.failure(asyncio.TimeoutError())
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.failure(asyncio.TimeoutError())
+    assert breaker.state == CircuitBreaker.OPEN and breaker.opened == 1
+    with pytest.raises(CircuitOpenError):
+        breaker.before()
+    assert breaker.rejected == 1
+
+
+def test_permanent_errors_do_not_open_it():
+    breaker = CircuitBreaker(failures=2, cooldown=60)
+    for _ in range(5):
+        breaker.failure(_api("23505"))
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker(failures=1, cooldown=0)
+    _open(breaker)
+    breaker.before()                        # cooldown over: the probe
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before()                    # only one at a time
+    breaker.success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before()
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker(failures=3, cooldown=0.05)
+    _open(breaker)
+    time.sleep(0.06)
+    breaker.before()
+    breaker.failure(asyncio.TimeoutError())  # one failure is enough while half-open
+    assert breaker.state == CircuitBreaker.OPEN and breaker.opened == 2
+    with pytest.raises(CircuitOpenError):
+        breaker.before()
+
+
+def test_probe_answered_with_a_permanent_error_closes():
+    breaker = CircuitBreaker(failures=1, cooldown=0)
+    _open(breaker)
+    breaker.before()
+    breaker.failure(_api("42P01"))           # the server answered
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_cancelled_probe_frees_the_slot():
+    breaker = CircuitBreaker(failures=1, cooldown=0)
+    _open(breaker)
+    breaker.before()
+    breaker.release()
+    breaker.before()                         # another probe may go
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+# ─── Hedging ────────────────────────────────────────────────────────────────────
+def test_hedge_budget_allows_a_share_of_reads():
+    budget = HedgeBudget(ratio=0.05, burst=10)
+    granted = 0
+    for _ in range(1000):
+        budget.read()
+        granted += budget.take()
+    assert granted == 50 and budget.denied == 950
+
+
+def test_hedge_budget_saves_up_to_burst():
+    budget = HedgeBudget(ratio=0.5, burst=2)
+    for _ in range(100):
+        budget.read()
+    assert [budget.take() for _ in range(3)] == [True, True, False]
+
+
+class _Query:
+    """Stands in for a supabase query builder: blocks its pool thread."""
+    def __init__(self, delays: list[float]):
+        self.delays = delays
+
+    def execute(self):
+        time.sleep(self.delays.pop(0))
+        return "ok"
+
+
+def test_abandoned_requests_still_count(monkeypatch):
+    window = LatencyWindow()
+    monkeypatch.setattr(db, "latency", window)
+    monkeypatch.setattr(db, "hedge_budget", HedgeBudget(ratio=1, burst=1))
+    for _ in range(LATENCY_MIN):
+        window.observe(("t", "select"), 0.01)
+
+    async def run():
+        # The first request is slow; the hedge wins and the first is abandoned
+        res = await db._hedged(_Query([0.3, 0.01]), "t", "select", 2.0)
+        busy = db._jobs
+        await asyncio.sleep(0.4)
+        return res, busy
+
+    res, busy = asyncio.run(run())
+    assert res == "ok" and busy == 1          # the loser still holds its thread
+    assert db._jobs == 0
+    assert window.p95(("t", "select")) is not None
+    assert max(window._samples[("t", "select")]) >= 0.3   # the slow loser was observed
+
+
+def test_no_hedge_without_budget(monkeypatch):
+    window = LatencyWindow()
+    monkeypatch.setattr(db, "latency", window)
+    monkeypatch.setattr(db, "hedge_budget", HedgeBudget(ratio=0))
+    for _ in range(LATENCY_MIN):
+        window.observe(("t", "select"), 0.01)
+    query = _Query([0.1, 0.01])
+    assert asyncio.run(db._hedged(query, "t", "select", 2.0)) == "ok"
+    assert query.delays == [0.01] and db.hedge_budget.denied == 1
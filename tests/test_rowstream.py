@@ -0,0 +1,52 @@
+# tests/test_rowstream.py
+import io, json
+
+import pytest
+
+from py.rowstream import iter_json_rows, iter_csv_rows, iter_rows
+
+ROWS = [
+    {"name": "alice", "sing": 12, "dance": None, "rally": 1.25},
+    {"name": "b[o]b, \"the\" {brace}", "sing": -3, "dance": 1e3, "rally": 0},
+    {"name": "ünïcødé ✨", "sing": 123456789, "dance": 7, "rally": 2.5},
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64, 65536])
+def test_json_array_across_chunk_boundaries(chunk_size):
+    text = "  \n" + json.dumps(ROWS, indent=1)
+    assert list(iter_json_rows(io.StringIO(text), chunk_size)) == ROWS
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 65536])
+def test_json_lines(chunk_size):
+    text = "\n".join(json.dumps(r) for r in ROWS) + "\n\n"
+    assert list(iter_json_rows(io.StringIO(text), chunk_size)) == ROWS
+
+
+def test_number_cut_at_chunk_end_is_read_whole():
+    # The array elements are bare numbers: each one ends exactly on a chunk edge
+    assert list(iter_json_rows(io.StringIO("[12345,678]"), chunk_size=4)) == [12345, 678]
+
+
+def test_empty_inputs():
+    assert list(iter_json_rows(io.StringIO("[]"))) == []
+    assert list(iter_json_rows(io.StringIO("   "))) == []
+
+
+def test_unterminated_array_raises():
+    with pytest.raises(ValueError):
+        list(iter_json_rows(io.StringIO('[{"name": "a"}, {"name"'), chunk_size=4))
+
+
+def test_csv_normalises_headers_and_values():
+    text = " Name ,SING,dance , Rally\n alice , 12,, 1.5 \nbob,3,4,5\n"
+    assert list(iter_csv_rows(io.StringIO(text))) == [
+        {"name": "alice", "sing": "12", "dance": "", "rally": "1.5"},
+        {"name": "bob", "sing": "3", "dance": "4", "rally": "5"},
+    ]
+
+
+def test_iter_rows_picks_format_by_extension():
+    assert list(iter_rows(io.StringIO("name,sing\na,1\n"), "Upload.CSV")) == [{"name": "a", "sing": "1"}]
+    assert list(iter_rows(io.StringIO('{"name": "a"}\n'), "rows.jsonl")) == [{"name": "a"}]
@@ -0,0 +1,123 @@
+# tests/test_shared_snapshot.py
+import asyncio
+
+from py.permissions import PermissionCache
+from py.snapshot import StatsSnapshot
+from py.warm_start import SharedSnapshotLoader, encode
+from py import warm_start
+
+
+def _publish(path, rows, editors=()):
+    """What the supervisor does: replace the shared file."""
+    tmp = path.with_suffix(".tmp")
+    tmp.write_bytes(encode(StatsSnapshot(rows), list(editors)))
+    tmp.replace(path)
+
+
+def test_local_writes_survive_older_shared_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(warm_start, "editor_cache", PermissionCache())
+    path = tmp_path / "shared.bin"
+    base = [{"name": "a", "sing": 1}, {"name": "b", "sing": 2}, {"name": "c", "sing": 3}]
+    _publish(path, base)
+    loader = SharedSnapshotLoader(str(path))
+
+    async def run():
+        snap = await loader(None)
+        # Local writes, as stats_cache would report them
+        patched = snap.with_upserts([{"name": "a", "sing": 10}]).without(["b"])
+        loader.on_change(snap, patched, "upsert", [{"name": "a", "sing": 10, "dance": None}])
+        loader.on_change(snap, patched, "delete", ["b"])
+
+        # The supervisor publishes a refresh taken before those writes
+        _publish(path, base + [{"name": "d", "sing": 4}])
+        newer = await loader(patched)
+        assert newer.get("a")["sing"] == 10 and newer.get("b") is None and newer.get("d") is not None
+
+        # Once the file shows the writes, nothing is pinned any more
+        _publish(path, [{"name": "a", "sing": 10}, {"name": "c", "sing": 3}])
+        await loader(newer)
+        assert loader._pinned == []
+
+    asyncio.run(run())
+
+
+def test_later_write_replaces_earlier_pin(tmp_path, monkeypatch):
+    monkeypatch.setattr(warm_start, "editor_cache", PermissionCache())
+    path = tmp_path / "shared.bin"
+    _publish(path, [{"name": "a", "sing": 1}])
+    loader = SharedSnapshotLoader(str(path))
+
+    async def run():
+        snap = await loader(None)
+        loader.on_change(snap, snap, "delete", ["a"])
+        loader.on_change(snap, snap, "upsert", [{"name": "a", "sing": 5}])
+        _publish(path, [{"name": "a", "sing": 1}, {"name": "z", "sing": 0}])
+        assert (await loader(snap)).get("a")["sing"] == 5
+
+    asyncio.run(run())
+
+
+def test_expired_pins_give_way_to_the_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(warm_start, "editor_cache", PermissionCache())
+    path = tmp_path / "shared.bin"
+    _publish(path, [{"name": "a", "sing": 1}])
+    loader = SharedSnapshotLoader(str(path), pin_ttl=0)
+
+    async def run():
+        snap = await loader(None)
+        loader.on_change(snap, snap, "upsert", [{"name": "a", "sing": 9}])
+        _publish(path, [{"name": "a", "sing": 7}, {"name": "z", "sing": 0}])
+        assert (await loader(snap)).get("a")["sing"] == 7
+
+    asyncio.run(run())
+
+
+def test_published_editor_lists_are_adopted(tmp_path, monkeypatch):
+    cache = PermissionCache()
+    monkeypatch.setattr(warm_start, "editor_cache", cache)
+    path = tmp_path / "shared.bin"
+    _publish(path, [], editors=[1, 2])
+    loader = SharedSnapshotLoader(str(path))
+
+    async def run():
+        snap = await loader(None)
+        assert sorted(cache.editor_ids()) == [1, 2]
+        cache.revoke(3)            # decided locally, newer than any list
+        cache.grant(4)
+        _publish(path, [{"name": "x"}], editors=[2, 3])
+        await loader(snap)
+        assert sorted(cache.editor_ids()) == [2, 4]
+        assert await cache.is_editor(1) is False   # dropped, and the list is complete
+
+    asyncio.run(run())
+
+
+def test_worker_waits_for_the_file_then_falls_back(tmp_path, monkeypatch):
+    monkeypatch.setattr(warm_start, "editor_cache", PermissionCache())
+    fetched = []
+
+    async def load_full(current):
+        fetched.append(current)
+        return StatsSnapshot([{"name": "db", "sing": 1}])
+
+    monkeypatch.setattr(warm_start, "load_full", load_full)
+    path = tmp_path / "shared.bin"
+
+    async def run():
+        # The file shows up while the worker is waiting: no Supabase read
+        loader = SharedSnapshotLoader(str(path), wait=2)
+        waiting = asyncio.ensure_future(loader(None))
+        await asyncio.sleep(0.15)
+        _publish(path, [{"name": "file", "sing": 2}])
+        assert (await waiting).get("file") is not None and fetched == []
+
+        # No file at all: Supabase, then the file once it appears
+        path.unlink()
+        loader = SharedSnapshotLoader(str(path), wait=0.2)
+        snap = await loader(None)
+        assert snap.get("db") is not None and loader.fallbacks == 1
+        assert await loader(snap) is snap           # still no file: keep what we have
+        _publish(path, [{"name": "file", "sing": 2}])
+        assert (await loader(snap)).get("file") is not None
+
+    asyncio.run(run())
@@ -0,0 +1,121 @@
+# tests/test_snapshot.py
+import random
+
+import pytest
+
+from py.snapshot import StatsSnapshot, NAME_FOLDED, VALUE_COLUMNS
+
+ORDER_KEYS = [("name", False), ("name", True), (NAME_FOLDED, False),
+              ("sing", False), ("sing", True), ("rally", True)]
+
+
+def _rows(n: int, seed: int = 1) -> list[dict]:
+    rnd = random.Random(seed)
+    names = [f"{rnd.choice(['a', 'B', 'é', 'Z'])}member{i}" for i in range(n)]
+    return [
+        {
+            "name": name,
+            "sing": rnd.choice([None, rnd.randint(0, 5)]),
+            "dance": rnd.randint(0, 10),
+            "rally": rnd.choice([None, round(rnd.uniform(0, 3), 2)]),
+        }
+        for name in names
+    ]
+
+
+def _assert_same(snap: StatsSnapshot, rows: list[dict]) -> None:
+    """`snap` holds exactly `rows` and every sort order equals a fresh sort."""
+    fresh = StatsSnapshot(rows)
+    assert sorted(snap.names()) == sorted(fresh.names())
+    for r in rows:
+        assert snap.get(r["name"]) == fresh.get(r["name"])
+    for column, desc in ORDER_KEYS:
+        got = [snap.row(i) for i in snap.order(column, desc)]
+        want = [fresh.row(i) for i in fresh.order(column, desc)]
+        if column in VALUE_COLUMNS:
+            # ties keep table order, which differs after appends; compare the values
+            got, want = [r[column] for r in got], [r[column] for r in want]
+        assert got == want, (column, desc)
+
+
+def test_row_roundtrip_keeps_nulls_and_ints():
+    snap = StatsSnapshot([{"name": "a", "sing": 3, "dance": None, "rally": 1.5, "extra": 1}])
+    assert snap.get("a") == {"name": "a", "sing": 3, "dance": None, "rally": 1.5}
+    assert snap.get("missing") is None
+
+
+def test_with_upserts_patches_values_and_appends():
+    rows = _rows(60)
+    snap = StatsSnapshot(rows)
+    for key in ORDER_KEYS:
+        snap.order(*key)
+
+    changed = [
+        {"name": rows[3]["name"], "sing": 99},
+        {"name": rows[7]["name"], "rally": None},
+        {"name": "Ärger", "sing": 1, "dance": 2, "rally": 3},
+        {"name": "aardvark", "sing": None, "dance": 0, "rally": 0.5},
+        {"name": "Ärger", "dance": 5},
+    ]
+    patched = snap.with_upserts(changed)
+    assert patched.version > snap.version
+    assert snap.get(rows[3]["name"])["sing"] == rows[3]["sing"]   # the old snapshot is untouched
+
+    expected = {r["name"]: dict(r) for r in rows}
+    for c in changed:
+        expected.setdefault(c["name"], {"name": c["name"], "sing": None, "dance": None, "rally": None})
+        expected[c["name"]].update(c)
+    _assert_same(patched, list(expected.values()))
+    assert patched.widths()["sing"] >= 2
+
+
+def test_without_drops_rows_and_keeps_orders():
+    rows = _rows(80, seed=2)
+    snap = StatsSnapshot(rows)
+    for key in ORDER_KEYS:
+        snap.order(*key)
+
+    gone = {rows[0]["name"], rows[41]["name"], rows[-1]["name"], "not-there"}
+    smaller = snap.without(gone)
+    assert len(smaller) == len(rows) - 3
+    # Orders are carried over, not rebuilt on first use
+    assert set(ORDER_KEYS) <= set(smaller._orders)
+    _assert_same(smaller, [r for r in rows if r["name"] not in gone])
+
+
+def test_without_then_upsert_readds_a_name():
+    snap = StatsSnapshot(_rows(10, seed=3))
+    name = snap.name(4)
+    again = snap.without([name]).with_upserts([{"name": name, "sing": 7}])
+    assert again.get(name) == {"name": name, "sing": 7, "dance": None, "rally": None}
+    assert len(again) == len(snap)
+
+
+@pytest.mark.parametrize("page", [1, 2, 4])
+def test_page_rows_follow_order(page):
+    snap = StatsSnapshot(_rows(35, seed=4))
+    ordered = [snap.row(i) for i in snap.order("dance", True)]
+    assert snap.page_rows("dance", True, page, 10) == ordered[(page - 1) * 10:page * 10]
+    assert snap.page_count(10) == 4
+
+
+@pytest.mark.parametrize("append", [False, True])
+def test_with_upserts_moves_rows_in_value_orders(append):
+    rows = _rows(70, seed=5)
+    snap = StatsSnapshot(rows)
+    for key in ORDER_KEYS:
+        snap.order(*key)
+    changed = [
+        {"name": rows[0]["name"], "sing": 3, "rally": None},
+        {"name": rows[9]["name"], "sing": None, "rally": 2.5},
+        {"name": rows[20]["name"], "sing": -1},
+        {"name": rows[33]["name"], "dance": 4},   # no value order cached for dance
+    ]
+    if append:
+        changed += [{"name": "new1", "sing": 3, "rally": 0}, {"name": "new2"}]
+    patched = snap.with_upserts(changed)
+    # Carried over, and identical to a fresh sort (ties in table order included)
+    for column, desc in ORDER_KEYS:
+        if column in VALUE_COLUMNS:
+            assert (column, desc) in patched._orders
+            assert patched._orders[(column, desc)] == patched._argsort(column, desc), (column, desc)
@@ -0,0 +1,134 @@
+# tests/test_snapshot_cache.py
+import asyncio
+
+import pytest
+
+from py.snapshot import SnapshotCache, StatsSnapshot
+
+ROWS = [{"name": "a", "sing": 1}, {"name": "b", "sing": 2}]
+
+
+class GatedLoader:
+    """Loader that blocks until released, counting its calls."""
+    def __init__(self, rows=ROWS):
+        self.rows = rows
+        self.calls = 0
+        self.gate = asyncio.Event()
+        self.error: Exception | None = None
+
+    async def __call__(self, current):
+        self.calls += 1
+        await self.gate.wait()
+        self.gate.clear()
+        if self.error is not None:
+            raise self.error
+        return StatsSnapshot(self.rows)
+
+
+async def _loaded(cache: SnapshotCache, loader: GatedLoader) -> StatsSnapshot:
+    first = asyncio.ensure_future(cache.get())
+    await asyncio.sleep(0)
+    loader.gate.set()
+    return await first
+
+
+def test_concurrent_misses_share_one_load():
+    async def run():
+        loader = GatedLoader()
+        cache = SnapshotCache(loader, ttl=60)
+        waiters = [asyncio.ensure_future(cache.get()) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        assert not any(w.done() for w in waiters)
+        loader.gate.set()
+        snaps = await asyncio.gather(*waiters)
+        assert loader.calls == 1 and cache.misses == 5
+        assert all(s is snaps[0] for s in snaps)
+        assert await cache.get() is snaps[0] and cache.hits == 1
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_load():
+    async def run():
+        loader = GatedLoader()
+        cache = SnapshotCache(loader, ttl=60)
+        impatient = asyncio.ensure_future(cache.get())
+        patient = asyncio.ensure_future(cache.get())
+        await asyncio.sleep(0)
+        impatient.cancel()
+        loader.gate.set()
+        assert len(await patient) == 2 and loader.calls == 1
+
+    asyncio.run(run())
+
+
+def test_stale_snapshot_is_served_at_once_and_refreshed_behind():
+    async def run():
+        loader = GatedLoader()
+        cache = SnapshotCache(loader, ttl=0, max_stale=60)
+        old = await _loaded(cache, loader)
+        # Stale: answered without waiting for the (blocked) refresh
+        assert await asyncio.wait_for(cache.get(), 0.1) is old
+        assert await asyncio.wait_for(cache.get(), 0.1) is old
+        assert cache.stale_hits == 2 and loader.calls == 2   # one background refresh
+        loader.rows = ROWS + [{"name": "c", "sing": 3}]
+        loader.gate.set()
+        await cache._inflight
+        assert len(cache.current) == 3
+
+    asyncio.run(run())
+
+
+def test_writes_during_a_refresh_survive_it():
+    async def run():
+        loader = GatedLoader()
+        cache = SnapshotCache(loader, ttl=0, max_stale=60)
+        await _loaded(cache, loader)
+        await cache.get()                       # starts the refresh, which blocks
+        cache.apply_upsert([{"name": "a", "sing": 10}, {"name": "new", "sing": 4}])
+        cache.apply_delete(["b"])
+        assert cache.current.get("a")["sing"] == 10
+        loader.gate.set()                       # the loader read the table before those writes
+        snap = await cache._inflight
+        assert snap is cache.current
+        assert snap.get("a")["sing"] == 10 and snap.get("new")["sing"] == 4
+        assert snap.get("b") is None
+        assert cache._journal is None
+
+    asyncio.run(run())
+
+
+def test_failed_refresh_serves_the_expired_snapshot():
+    async def run():
+        loader = GatedLoader()
+        cache = SnapshotCache(loader, ttl=0, max_stale=0)
+        old = await _loaded(cache, loader)
+        loader.error = ConnectionError("down")
+        pending = asyncio.ensure_future(cache.get())
+        await asyncio.sleep(0)
+        loader.gate.set()
+        assert await pending is old
+
+        empty = SnapshotCache(loader, ttl=60)
+        pending = asyncio.ensure_future(empty.get())
+        await asyncio.sleep(0)
+        loader.gate.set()
+        with pytest.raises(ConnectionError):
+            await pending
+
+    asyncio.run(run())
+
+
+def test_subscribers_see_every_swap():
+    async def run():
+        seen = []
+        loader = GatedLoader()
+        cache = SnapshotCache(loader, ttl=60)
+        cache.subscribe(lambda old, new, op, arg: seen.append(op))
+        await _loaded(cache, loader)
+        cache.apply_upsert([{"name": "a", "sing": 5}])
+        cache.apply_delete(["b"])
+        cache.apply_upsert([])
+        assert seen == ["load", "upsert", "delete"]
+
+    asyncio.run(run())
@@ -0,0 +1,101 @@
+# tests/test_warm_start.py
+import time, struct, asyncio
+
+import pytest
+
+from py import db
+from py.permissions import editor_cache
+from py.snapshot import StatsSnapshot, stats_cache, VALUE_COLUMNS
+from py.warm_start import encode, decode, WarmStartFile, WarmStartError, HEADER
+
+ROWS = [
+    {"name": "alice", "sing": 1, "dance": None, "rally": 2.5},
+    {"name": "ünï ✨", "sing": 123456789, "dance": 0, "rally": None},
+    {"name": "", "sing": None, "dance": None, "rally": None},
+    {"name": "z" * 300, "sing": -4, "dance": 7, "rally": 0.01},
+]
+EDITORS = [1, 2 ** 63 + 5, 42]
+
+
+def _same(a: StatsSnapshot, b: StatsSnapshot) -> bool:
+    return a.names() == b.names() and all(a.row(i) == b.row(i) for i in range(len(a)))
+
+
+@pytest.mark.parametrize("copy", [True, False])
+def test_round_trip(copy):
+    snap = StatsSnapshot(ROWS)
+    data = encode(snap, EDITORS, saved_at=123.5)
+    back, editors, saved_at = decode(data, copy=copy)
+    assert _same(back, snap)
+    assert editors == EDITORS and saved_at == 123.5
+    assert back.version != snap.version
+    assert back.get("alice")["rally"] == 2.5
+    # Without copying, the value columns are views into the buffer itself
+    assert isinstance(back.columns["sing"], memoryview) != copy
+
+
+def test_empty_snapshot_round_trip():
+    back, editors, _ = decode(encode(StatsSnapshot([]), []))
+    assert len(back) == 0 and editors == []
+    assert all(len(back.columns[c]) == 0 for c in VALUE_COLUMNS)
+
+
+def test_corrupt_files_are_rejected():
+    data = bytearray(encode(StatsSnapshot(ROWS), EDITORS))
+    with pytest.raises(WarmStartError):
+        decode(data[:HEADER.size - 1])
+    with pytest.raises(WarmStartError):
+        decode(data[:-3])
+    flipped = bytearray(data)
+    flipped[-1] ^= 0xFF
+    with pytest.raises(WarmStartError):
+        decode(flipped)
+    other_format = bytearray(data)
+    struct.pack_into("<I", other_format, 8, 99)
+    with pytest.raises(WarmStartError):
+        decode(other_format)
+
+
+def test_restore_seeds_caches(tmp_path):
+    path = tmp_path / "warm.bin"
+    path.write_bytes(encode(StatsSnapshot(ROWS), [777]))
+    editor_cache.invalidate()
+    assert WarmStartFile(str(path)).restore()
+    assert _same(stats_cache.current, StatsSnapshot(ROWS))
+    assert 777 in editor_cache.editor_ids()
+
+
+def test_restore_drops_editor_grants_from_an_old_file(tmp_path):
+    path = tmp_path / "warm.bin"
+    path.write_bytes(encode(StatsSnapshot(ROWS), [888], saved_at=time.time() - 2 * editor_cache.ttl))
+    editor_cache.invalidate()
+    assert WarmStartFile(str(path)).restore()
+    assert 888 not in editor_cache.editor_ids()
+    assert stats_cache.current.get("alice") is not None
+
+
+def test_old_file_does_not_deny_editors_unasked(tmp_path, monkeypatch):
+    asked = []
+
+    async def editor_exists(user_id):
+        asked.append(user_id)
+        return True
+
+    monkeypatch.setattr(db, "editor_exists", editor_exists)
+    path = tmp_path / "warm.bin"
+    path.write_bytes(encode(StatsSnapshot(ROWS), [888], saved_at=time.time() - 3600))
+    editor_cache.invalidate()
+    assert WarmStartFile(str(path)).restore()
+    assert asyncio.run(editor_cache.is_editor(888)) is True
+    assert asked == [888]
+
+
+def test_restore_ignores_missing_or_broken_files(tmp_path):
+    assert not WarmStartFile(str(tmp_path / "nothing.bin")).restore()
+    empty = tmp_path / "empty.bin"
+    empty.write_bytes(b"")
+    assert not WarmStartFile(str(empty)).restore()
+    junk = tmp_path / "junk.bin"
+    junk.write_bytes(b"x" * 100)
+    assert not WarmStartFile(str(junk)).restore()
+    assert not WarmStartFile("").restore()
@@ -0,0 +1,89 @@
+# tests/test_write_queue.py
+import asyncio
+
+import pytest
+
+from py import db
+from py.write_queue import commit_updates, WriteBehindQueue, QueueFull
+
+
+def _row(store, name: str) -> dict | None:
+    return next((r for r in store.tables["stats"] if r["name"] == name), None)
+
+
+def test_commit_sends_only_changed_fields(store):
+    store.seed("stats", [
+        {"name": "a", "sing": 1, "dance": 1, "rally": 1},
+        {"name": "b", "sing": 2, "dance": 2, "rally": 2},
+        {"name": "c,d", "sing": 3, "dance": 3, "rally": 3},
+    ])
+    # A write from elsewhere after the caller read its values
+    _row(store, "a")["dance"] = 50
+
+    committed, failed = asyncio.run(commit_updates({
+        "a": {"sing": 9}, "b": {"sing": 9}, "c,d": {"rally": 0.5}
+    }))
+    assert not failed
+    assert set(committed) == {"a", "b", "c,d"}
+    assert _row(store, "a")["dance"] == 50 and _row(store, "a")["sing"] == 9
+    assert _row(store, "c,d")["rally"] == 0.5 and _row(store, "c,d")["sing"] == 3
+
+
+def test_commit_quotes_awkward_names(store):
+    names = ['say "hi"', "back\\slash", "a,b", "(paren)", 'both\\ "x", (y)']
+    store.seed("stats", [{"name": n, "sing": 1, "dance": 1, "rally": 1} for n in names + ["other"]])
+    committed, failed = asyncio.run(commit_updates({n: {"sing": 5} for n in names}))
+    assert not failed and set(committed) == set(names)
+    assert all(_row(store, n)["sing"] == 5 for n in names)
+    assert _row(store, "other")["sing"] == 1
+
+
+def test_commit_never_resurrects_deleted_rows(store):
+    store.seed("stats", [{"name": "a", "sing": 1, "dance": 1, "rally": 1}])
+    committed, failed = asyncio.run(commit_updates({"a": {"sing": 2}, "gone": {"sing": 2}}))
+    assert set(committed) == {"a"} and not failed
+    assert _row(store, "gone") is None
+
+
+def test_commit_chunks_long_name_lists(store, monkeypatch):
+    monkeypatch.setattr(db, "NAME_CHUNK", 3)
+    store.seed("stats", [{"name": f"m{i}", "sing": 0, "dance": 0, "rally": 0} for i in range(10)])
+    before = store.requests
+    committed, _ = asyncio.run(commit_updates({f"m{i}": {"sing": 1} for i in range(10)}))
+    assert len(committed) == 10
+    assert store.requests - before == 4
+
+
+def test_queue_coalesces_and_resolves_callers(store):
+    store.seed("stats", [{"name": "a", "sing": 1, "dance": 1, "rally": 1}])
+
+    async def run():
+        queue = WriteBehindQueue(window=0.01)
+        results = await asyncio.gather(
+            queue.update("a", {"sing": 5}),
+            queue.update("a", {"dance": 6}),
+            queue.update("missing", {"sing": 1}),
+        )
+        await queue.close()
+        return queue, results
+
+    queue, (first, second, missing) = asyncio.run(run())
+    assert first == second and first["sing"] == 5 and first["dance"] == 6
+    assert missing is None
+    assert queue.batches == 1 and queue.coalesced == 1
+
+
+def test_update_many_admits_a_large_batch_only_into_an_empty_queue(store):
+    store.seed("stats", [{"name": f"m{i}", "sing": 0, "dance": 0, "rally": 0} for i in range(5)])
+
+    async def run():
+        queue = WriteBehindQueue(window=0.01, maxsize=3)
+        committed, failed = await queue.update_many({f"m{i}": {"sing": i} for i in range(5)})
+        assert len(committed) == 5 and not failed
+
+        queue.submit("m0", {"dance": 1})
+        with pytest.raises(QueueFull):
+            queue.submit_many({"m1": {"dance": 1}, "m2": {"dance": 1}, "m3": {"dance": 1}})
+        await queue.close()
+
+    asyncio.run(run())